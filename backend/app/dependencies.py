@@ -1 +1,185 @@
 # Dependency injection (DB, Clients)
+import os
+import time
+import atexit
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+
+from backend.indexing.vector_store import VectorDBClient
+from backend.models.embedding_client import embed_queries, embed_sparse, get_query_batcher
+from backend.models.reranker_service import RemoteReranker, RerankerService
+from backend.retrieval.rerank_policy import get_rerank_policy
+
+
+class RetrievalServices:
+    """
+    Process-wide registry for the retrieval stack.
+
+    The VectorDB client (Qdrant/Postgres connection + cross-encoder) and the
+    embedding models are created lazily on first use and then reused by every
+    graph step, script and test harness in the process.
+
+    State machine: cold -> warming -> ready | failed, and closed after shutdown().
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients: Dict[str, VectorDBClient] = {}
+        self._async_clients: Dict[str, Any] = {}
+        self._async_lock: Optional[asyncio.Lock] = None
+        self.state = "cold"
+        self.last_error: Optional[str] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def _default_provider(self) -> str:
+        return os.getenv("VECTOR_DB_PROVIDER", "qdrant").lower()
+
+    def get_vector_db(self, provider: str = None) -> VectorDBClient:
+        """
+        Returns the shared VectorDBClient for `provider` (defaults to VECTOR_DB_PROVIDER).
+        The first call opens the connection and loads the reranker; later calls are free.
+        """
+        provider = (provider or self._default_provider()).lower()
+        client = self._clients.get(provider)
+        if client is not None:
+            return client
+
+        with self._lock:
+            # Double-checked: another thread may have built it while we waited
+            client = self._clients.get(provider)
+            if client is None:
+                client = VectorDBClient(provider=provider)
+                self._clients[provider] = client
+                if self.state in ("cold", "closed"):
+                    self.state = "ready"
+            return client
+
+    async def get_async_vector_db(self, provider: str = None):
+        """
+        Returns the shared AsyncVectorDBClient for `provider`, connected on first use.
+        Async clients are bound to the event loop that created them.
+        """
+        # Imported lazily: the async drivers are only needed by app.ainvoke() callers
+        from backend.indexing.async_vector_store import AsyncVectorDBClient
+
+        provider = (provider or self._default_provider()).lower()
+        client = self._async_clients.get(provider)
+        if client is not None:
+            return client
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            client = self._async_clients.get(provider)
+            if client is None:
+                client = AsyncVectorDBClient(provider=provider)
+                await client.connect()
+                self._async_clients[provider] = client
+                if self.state in ("cold", "closed"):
+                    self.state = "ready"
+            return client
+
+    def warmup(self, provider: str = None) -> Dict[str, Any]:
+        """
+        Eagerly builds the DB client and runs one dummy pass through the
+        dense encoder, sparse encoder and reranker so the first real query
+        does not pay the model-loading cost.
+        """
+        with self._lock:
+            self.state = "warming"
+            start = time.time()
+            try:
+                client = self.get_vector_db(provider)
+                embed_queries(["warmup"])
+                embed_sparse(["warmup"], use_cache=False)
+                client.client.reranker.predict([("warmup", "warmup")])
+                self.warmup_seconds = round(time.time() - start, 2)
+                self.state = "ready"
+                self.last_error = None
+                print(f"🔥 Retrieval services warm ({client.provider.upper()}) in {self.warmup_seconds}s")
+            except Exception as e:
+                self.state = "failed"
+                self.last_error = str(e)
+                print(f"⚠️ Retrieval warmup failed: {e}")
+            return self.health()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Reports the registry state and pings every open DB handle.
+        """
+        providers = {}
+        for name, client in list(self._clients.items()):
+            try:
+                providers[name] = {"connected": bool(client.ping())}
+            except Exception as e:
+                providers[name] = {"connected": False, "error": str(e)}
+            if client.result_cache is not None:
+                providers[name]["result_cache"] = client.result_cache.stats()
+            reranker = getattr(client.client, "reranker", None)
+            if isinstance(reranker, (RerankerService, RemoteReranker)):
+                providers[name]["reranker_service"] = reranker.stats()
+
+        query_batcher = get_query_batcher()
+        return {
+            "state": self.state,
+            "providers": providers,
+            "warmup_seconds": self.warmup_seconds,
+            "rerank": get_rerank_policy().metrics.summary(),
+            "query_batcher": query_batcher.stats() if query_batcher else None,
+            "error": self.last_error,
+        }
+
+    def shutdown(self):
+        """
+        Closes every DB handle. Safe to call more than once (also registered with atexit).
+        """
+        with self._lock:
+            for name, client in list(self._clients.items()):
+                try:
+                    client.close()
+                    print(f"🔌 Closed {name.upper()} connection.")
+                except Exception as e:
+                    print(f"⚠️ Failed to close {name} client: {e}")
+            self._clients.clear()
+            if self.state != "cold":
+                self.state = "closed"
+
+    async def ashutdown(self):
+        """
+        Closes the async DB handles (must run on their event loop), then the sync ones.
+        """
+        for name, client in list(self._async_clients.items()):
+            try:
+                await client.close()
+                print(f"🔌 Closed async {name.upper()} connection.")
+            except Exception as e:
+                print(f"⚠️ Failed to close async {name} client: {e}")
+        self._async_clients.clear()
+        self._async_lock = None
+        self.shutdown()
+
+
+# Global registry (one per process)
+services = RetrievalServices()
+atexit.register(services.shutdown)
+
+
+def get_vector_db(provider: str = None) -> VectorDBClient:
+    """Shortcut for services.get_vector_db()."""
+    return services.get_vector_db(provider)
+
+
+async def get_async_vector_db(provider: str = None):
+    """Shortcut for services.get_async_vector_db()."""
+    return await services.get_async_vector_db(provider)
+
+
+if __name__ == "__main__":
+    print("--- TEST: RetrievalServices ---")
+    print(services.warmup())
+    first = get_vector_db()
+    second = get_vector_db()
+    print(f"✅ Same instance reused: {first is second}")
+    services.shutdown()
+    print(services.health())
@@ -18,12 +18,72 @@ class LLMConfig(BaseModel):
     base_url: Optional[str] = None
     api_key: Optional[str] = None
 
+class CollectionProfile(BaseModel):
+    """Storage layout of the Qdrant dense vectors (retrieval.vector_store.profiles.<name>)."""
+    quantization: Optional[str] = None  # None | scalar | product | binary
+    compression: str = "x16"  # product quantization only: x4 | x8 | x16 | x32 | x64
+    quantile: float = 0.99  # scalar quantization only
+    always_ram: bool = True  # Keep the quantized vectors in RAM
+    on_disk: bool = False  # Keep the float32 originals on disk (mmap)
+    rescore: bool = True  # Re-score the quantized top candidates with the originals
+    oversampling: float = 2.0  # Quantized candidates fetched per final candidate before rescoring
+    hnsw_m: Optional[int] = None  # None = Qdrant default (16)
+    hnsw_ef_construct: Optional[int] = None  # None = Qdrant default (100)
+    hnsw_on_disk: bool = False
+
 class RetrievalConfig(BaseModel):
     embedder_model: str = Field(alias="embedder_name")
+    embedder_backend: str = "cuda"
+    reranker_model: str = "BAAI/bge-reranker-v2-m3"
+    reranker_backend: str = "cuda"
+    inference_threads: int = 0
+    inference_workers: int = 2
+
+    # On-disk embedding cache (ingestion)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "data/cache/embeddings"
+    embedding_cache_max_mb: int = 2048
+
+    # In-memory query-embedding + search-result cache (LRU + TTL)
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 1024
+    search_cache_ttl_seconds: int = 600
+
+    # Query-encoder micro-batching (embedding_client.get_query_batcher)
+    query_batching_enabled: bool = True
+    query_batching_max_batch_size: int = 32
+    query_batching_max_wait_ms: float = 2.0
+    query_batching_max_queue: int = 256
+    query_batching_max_padding: float = 0.3
+
+    # Reranking policy (backend/retrieval/rerank_policy.py)
+    rerank_budgets: Dict[str, int] = {"short": 10, "default": 15, "long": 25}
+    rerank_short_query_words: int = 4
+    rerank_long_query_words: int = 30
+    rerank_early_exit_gap: float = 0.0  # Relative fused-score gap top-1 vs top-2 that skips reranking; 0 = off
+    rerank_batch_size: int = 32
+    rerank_chars_per_token: float = 3.5
+    rerank_metrics_window: int = 1000
+
+    # Shared reranker service (backend/models/reranker_service.py): off | thread | process
+    reranker_service_mode: str = "off"
+    reranker_service_max_batch_pairs: int = 128
+    reranker_service_max_wait_ms: float = 3.0
+    reranker_service_address: str = "127.0.0.1:6390"
+    reranker_service_allow_remote: bool = False  # Worker binds to loopback only unless set
+
+    # Two-stage dense search: ANN on the first N dims (renormalized), rescored with all 1024. 0 = off
+    dense_prefetch_dims: int = 0
+    dense_prefetch_limit: int = 100
     vector_store_host: str
     vector_store_port: int
     vector_store_collection: str
     vector_store_api_key: Optional[str] = None
+    # Extra Qdrant payload indexes {field: keyword|integer|float|bool|datetime|text|uuid}
+    vector_store_payload_indexes: Dict[str, str] = {}
+    # Active collection profile (see CollectionProfile); migrate with backend.indexing.qdrant_collections
+    vector_store_profile: str = "default"
+    vector_store_profiles: Dict[str, CollectionProfile] = {}
     
     # Postgres Config
     postgres_host: str = "localhost"
@@ -31,21 +91,79 @@ class RetrievalConfig(BaseModel):
     postgres_db: str = "postgres"
     postgres_user: str = "postgres"
     postgres_password: Optional[str] = None
+    postgres_pool_min: int = 1
+    postgres_pool_max: int = 10
+
+    # pgvector HNSW parameters (m / ef_construction are build-time, ef_search is per session)
+    postgres_hnsw_m: int = 16
+    postgres_hnsw_ef_construction: int = 64
+    postgres_hnsw_ef_search: int = 40
+    postgres_build_indexes: bool = True
     
     # Phase 1.5 & Phase 4 flags
     enable_late_interaction: bool = False
     enable_graph: bool = False
 
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recursively merges `override` into `base` (override wins on conflicts).
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+class IngestionConfig(BaseModel):
+    chunk_size: int = 512  # Characters ("chars" unit)
+    chunk_overlap: int = 100
+    chunk_unit: str = "tokens"  # "tokens" (TokenChunker) | "chars" (RecursiveCharacterTextSplitter)
+    chunk_tokenizer: str = "BAAI/bge-m3"
+    token_chunk_size: int = 256
+    token_chunk_overlap: int = 48
+    enrichment_enabled: bool = True
+    enrichment_window: int = 3  # Neighbour chunks before/after shown to the enrichment LLM
+    enrichment_model: str = "qwen3:4b"
+    enrichment_base_url: str = "http://localhost:11434"
+    enrichment_concurrency: int = 8  # LLM calls kept in flight
+    enrichment_timeout_seconds: float = 120.0
+    enrichment_max_retries: int = 3
+    enrichment_retry_backoff_seconds: float = 2.0
+    enrichment_cache_enabled: bool = True
+    enrichment_cache_path: str = "data/cache/enrichment.sqlite"
+    enrichment_mode: str = "window"  # "window" | "prefix" | "summary" (see contextual_enrichment.py)
+    enrichment_section_chars: int = 4000  # Section size shared as the prompt prefix ("prefix" / "summary")
+    enrichment_num_ctx: int = 4096  # Fixed: changing num_ctx reloads the model and drops its KV cache
+    enrichment_keep_alive: str = "15m"
+
+    # PDF extraction (backend/ingestion/loaders/pdf_loader.py)
+    load_workers: int = 0  # Extraction processes (0: all cores, 1: serial in-process PDFLoader)
+    load_pages_per_task: int = 32  # Large PDFs are split into page ranges of this size
+    load_max_pending: int = 0  # Page ranges in flight/buffered (0: 2 x workers)
+
+    # Streaming pipeline (backend/ingestion/pipeline/streaming.py)
+    queue_size: int = 4  # Items buffered between two stages (documents / chunk batches)
+    embed_batch_size: int = 64  # Chunks per embedding pass and per DB write
+
+    # Incremental re-ingestion (backend/ingestion/pipeline/manifest.py)
+    manifest_enabled: bool = True
+    manifest_path: str = "data/cache/ingestion_manifest.sqlite"
+
+
 class AppConfig(BaseModel):
     project_name: str
     fast_llm: LLMConfig
     smart_llm: LLMConfig
     retrieval: RetrievalConfig
+    ingestion: IngestionConfig = IngestionConfig()
     
     @classmethod
-    def load(cls, config_path: str = "configs/base.yaml") -> "AppConfig":
+    def load(cls, config_path: str = "configs/base.yaml", hardware_path: str = "configs/hardware.yaml") -> "AppConfig":
         """
         Loads the YAML config and injects environment variables.
+        If present, the hardware profile written by benchmark_hardware.py is merged on top.
         """
         path = Path(config_path)
         if not path.exists():
@@ -54,6 +172,11 @@ class AppConfig(BaseModel):
         with open(path, "r") as f:
             raw_config = yaml.safe_load(f)
 
+        hw_path = Path(hardware_path)
+        if hw_path.exists():
+            with open(hw_path, "r") as f:
+                raw_config = _deep_merge(raw_config, yaml.safe_load(f) or {})
+
         # 1. Extract Project Info
         project_name = raw_config.get("project", {}).get("name", "SLM_RAG")
 
@@ -81,13 +204,50 @@ class AppConfig(BaseModel):
         ret_section = raw_config.get("retrieval", {})
         qdrant_section = ret_section.get("vector_store", {})
         pg_section = ret_section.get("postgres", {})
+        reranker_section = ret_section.get("reranker", {})
         
         retrieval_conf = RetrievalConfig(
             embedder_name=ret_section["embedder"]["model_name"],
+            embedder_backend=os.getenv("EMBEDDER_BACKEND", ret_section["embedder"].get("backend", "cuda")),
+            reranker_model=reranker_section.get("model_name", "BAAI/bge-reranker-v2-m3"),
+            reranker_backend=os.getenv("RERANKER_BACKEND", reranker_section.get("backend", "cuda")),
+            inference_threads=ret_section.get("inference", {}).get("num_threads", 0),
+            inference_workers=ret_section.get("inference", {}).get("max_workers", 2),
+            embedding_cache_enabled=ret_section.get("embedding_cache", {}).get("enabled", True),
+            embedding_cache_path=ret_section.get("embedding_cache", {}).get("path", "data/cache/embeddings"),
+            embedding_cache_max_mb=ret_section.get("embedding_cache", {}).get("max_size_mb", 2048),
+            search_cache_enabled=ret_section.get("search_cache", {}).get("enabled", True),
+            search_cache_max_entries=ret_section.get("search_cache", {}).get("max_entries", 1024),
+            search_cache_ttl_seconds=ret_section.get("search_cache", {}).get("ttl_seconds", 600),
+            query_batching_enabled=ret_section.get("query_batching", {}).get("enabled", True),
+            query_batching_max_batch_size=ret_section.get("query_batching", {}).get("max_batch_size", 32),
+            query_batching_max_wait_ms=ret_section.get("query_batching", {}).get("max_wait_ms", 2.0),
+            query_batching_max_queue=ret_section.get("query_batching", {}).get("max_queue", 256),
+            query_batching_max_padding=ret_section.get("query_batching", {}).get("max_padding", 0.3),
+            rerank_budgets=ret_section.get("rerank_policy", {}).get("budgets", {"short": 10, "default": 15, "long": 25}),
+            rerank_short_query_words=ret_section.get("rerank_policy", {}).get("short_query_words", 4),
+            rerank_long_query_words=ret_section.get("rerank_policy", {}).get("long_query_words", 30),
+            rerank_early_exit_gap=ret_section.get("rerank_policy", {}).get("early_exit_gap", 0.0),
+            rerank_batch_size=ret_section.get("rerank_policy", {}).get("batch_size", 32),
+            rerank_chars_per_token=ret_section.get("rerank_policy", {}).get("chars_per_token", 3.5),
+            rerank_metrics_window=ret_section.get("rerank_policy", {}).get("metrics_window", 1000),
+            reranker_service_mode=os.getenv("RERANKER_SERVICE_MODE", ret_section.get("reranker_service", {}).get("mode", "off")),
+            reranker_service_max_batch_pairs=ret_section.get("reranker_service", {}).get("max_batch_pairs", 128),
+            reranker_service_max_wait_ms=ret_section.get("reranker_service", {}).get("max_wait_ms", 3.0),
+            reranker_service_address=ret_section.get("reranker_service", {}).get("address", "127.0.0.1:6390"),
+            reranker_service_allow_remote=ret_section.get("reranker_service", {}).get("allow_remote", False),
+            dense_prefetch_dims=ret_section.get("dense_prefetch", {}).get("dims", 0),
+            dense_prefetch_limit=ret_section.get("dense_prefetch", {}).get("limit", 100),
             vector_store_host=qdrant_section["host"],
             vector_store_port=qdrant_section["port"],
             vector_store_collection=qdrant_section["collection"],
             vector_store_api_key=os.getenv("QDRANT_API_KEY"), # INJECTED FROM ENV
+            vector_store_payload_indexes=qdrant_section.get("payload_indexes") or {},
+            vector_store_profile=qdrant_section.get("profile", "default"),
+            vector_store_profiles={
+                name: CollectionProfile(**(profile or {}))
+                for name, profile in (qdrant_section.get("profiles") or {}).items()
+            },
             
             # Postgres
             postgres_host=pg_section.get("host", "localhost"),
@@ -95,16 +255,61 @@ class AppConfig(BaseModel):
             postgres_db=pg_section.get("dbname", "postgres"),
             postgres_user=pg_section.get("user", "postgres"),
             postgres_password=os.getenv("POSTGRES_PASSWORD"),
+            postgres_pool_min=pg_section.get("pool", {}).get("min_size", 1),
+            postgres_pool_max=pg_section.get("pool", {}).get("max_size", 10),
+            postgres_hnsw_m=pg_section.get("index", {}).get("m", 16),
+            postgres_hnsw_ef_construction=pg_section.get("index", {}).get("ef_construction", 64),
+            postgres_hnsw_ef_search=pg_section.get("index", {}).get("ef_search", 40),
+            postgres_build_indexes=pg_section.get("index", {}).get("build_on_startup", True),
             
             enable_late_interaction=ret_section.get("late_interaction", {}).get("enabled", False),
             enable_graph=ret_section.get("graph", {}).get("enabled", False)
         )
 
+        # 4. Extract Ingestion Config
+        pipe_section = raw_config.get("data_pipeline", {})
+        chunking_section = pipe_section.get("chunking", {})
+        enrichment_section = pipe_section.get("contextual_retrieval", {})
+        streaming_section = pipe_section.get("streaming", {})
+        loading_section = pipe_section.get("loading", {})
+        manifest_section = pipe_section.get("manifest", {})
+
+        ingestion_conf = IngestionConfig(
+            chunk_size=chunking_section.get("chunk_size", 512),
+            chunk_overlap=chunking_section.get("chunk_overlap", 100),
+            chunk_unit=chunking_section.get("unit", "tokens"),
+            chunk_tokenizer=chunking_section.get("tokenizer", "BAAI/bge-m3"),
+            token_chunk_size=chunking_section.get("token_chunk_size", 256),
+            token_chunk_overlap=chunking_section.get("token_chunk_overlap", 48),
+            enrichment_enabled=enrichment_section.get("enabled", True),
+            enrichment_window=enrichment_section.get("window_size", 3),
+            enrichment_model=enrichment_section.get("model_name", "qwen3:4b"),
+            enrichment_base_url=enrichment_section.get("base_url", "http://localhost:11434"),
+            enrichment_concurrency=enrichment_section.get("max_concurrency", 8),
+            enrichment_timeout_seconds=enrichment_section.get("timeout_seconds", 120.0),
+            enrichment_max_retries=enrichment_section.get("max_retries", 3),
+            enrichment_retry_backoff_seconds=enrichment_section.get("retry_backoff_seconds", 2.0),
+            enrichment_cache_enabled=enrichment_section.get("cache", {}).get("enabled", True),
+            enrichment_cache_path=enrichment_section.get("cache", {}).get("path", "data/cache/enrichment.sqlite"),
+            enrichment_mode=enrichment_section.get("mode", "window"),
+            enrichment_section_chars=enrichment_section.get("section_chars", 4000),
+            enrichment_num_ctx=enrichment_section.get("num_ctx", 4096),
+            enrichment_keep_alive=enrichment_section.get("keep_alive", "15m"),
+            load_workers=loading_section.get("workers", 0),
+            load_pages_per_task=loading_section.get("pages_per_task", 32),
+            load_max_pending=loading_section.get("max_pending", 0),
+            queue_size=streaming_section.get("queue_size", 4),
+            embed_batch_size=streaming_section.get("embed_batch_size", 64),
+            manifest_enabled=manifest_section.get("enabled", True),
+            manifest_path=manifest_section.get("path", "data/cache/ingestion_manifest.sqlite"),
+        )
+
         return cls(
             project_name=project_name,
             fast_llm=fast_conf,
             smart_llm=smart_conf,
-            retrieval=retrieval_conf
+            retrieval=retrieval_conf,
+            ingestion=ingestion_conf,
         )
 
 # Global Config Object
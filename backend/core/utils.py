@@ -1 +1,80 @@
 # Async helpers, decorators
+import time
+import asyncio
+import functools
+import threading
+import uuid
+from concurrent.futures import Executor
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def chunk_uid(source: str, chunk_index) -> str:
+    """Deterministic chunk id (uuid5 of source + chunk index), shared by every vector store."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{source}_{chunk_index}"))
+
+
+def normalize_query(text: str) -> str:
+    """Collapses whitespace so trivially different spellings of a query share cache entries."""
+    return " ".join(text.split())
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+    Bounded by `max_entries`; the least recently used entry is dropped first.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+async def run_blocking(executor: Optional[Executor], fn: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking call on `executor` (None = loop default) without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,155 @@
+import time
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from backend.core.config_loader import settings
+from backend.core.utils import run_blocking
+from backend.indexing.postgres_client import (
+    MERGE_STAGING_SQL,
+    STAGE_COLUMNS,
+    STAGING_TABLE_SQL,
+    SearchResult,
+    build_filter_clause,
+    chunk_position,
+    create_table_sql,
+    format_dense,
+    format_sparse,
+    hybrid_search_args,
+    hybrid_search_sql,
+    point_uid,
+)
+from backend.models.embedding_client import aembed_query_batch, sparse_to_lists
+from backend.models.reranker_service import get_rerank_scorer
+from backend.retrieval.rerank_policy import get_rerank_policy
+from backend.models.runtime import get_inference_executor
+
+class AsyncPostgresVectorDB:
+    def __init__(self):
+        """
+        asyncio-native twin of PostgresVectorDB on psycopg 3, backed by an
+        AsyncConnectionPool. Shares the SQL (filters, hybrid RRF query, DDL) with the
+        sync backend. Encoders and the reranker run on the bounded inference executor.
+        Call `await connect()` before the first search.
+        """
+        if not settings:
+            raise ValueError("❌ Settings not loaded. Check config_loader.py")
+
+        self.host = settings.retrieval.postgres_host
+        self.port = str(settings.retrieval.postgres_port)
+        self.table_name = settings.retrieval.vector_store_collection
+
+        conninfo = make_conninfo(
+            host=self.host,
+            port=self.port,
+            user=settings.retrieval.postgres_user,
+            password=settings.retrieval.postgres_password or "mysecretpassword",
+            dbname=settings.retrieval.postgres_db,
+            options=f"-c hnsw.ef_search={settings.retrieval.postgres_hnsw_ef_search}",
+        )
+        self.pool = AsyncConnectionPool(
+            conninfo,
+            min_size=settings.retrieval.postgres_pool_min,
+            max_size=settings.retrieval.postgres_pool_max,
+            kwargs={"autocommit": True},
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        self.prefetch_dims = settings.retrieval.dense_prefetch_dims
+        self.prefetch_limit = settings.retrieval.dense_prefetch_limit
+        self.reranker = get_rerank_scorer(max_length=2048)
+        self.rerank_policy = get_rerank_policy()
+        self.executor = get_inference_executor()
+
+    async def connect(self):
+        print(f"🔌 Connecting (async pool) to Postgres at {self.host}:{self.port}...")
+        await self.pool.open()
+        async with self.pool.connection() as conn:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+            await conn.execute(create_table_sql(self.table_name, sql_module=sql, prefetch_dims=self.prefetch_dims))
+
+    async def ping(self) -> bool:
+        async with self.pool.connection() as conn:
+            cur = await conn.execute("SELECT 1;")
+            return (await cur.fetchone())[0] == 1
+
+    async def close(self):
+        await self.pool.close()
+
+    async def upsert(self, points: list):
+        """
+        Same semantics as PostgresVectorDB.upsert(): rows are COPY'd into a temp staging table
+        (last write per chunk_uid wins) and merged with the shared ON CONFLICT statement, in one
+        transaction. Stale tails are left to IngestionPipeline.sync() (delete_document).
+        """
+        rows = {}
+        for p in points:
+            payload = p.payload if hasattr(p, "payload") else p.get("payload", {})
+            vector = p.vector if hasattr(p, "payload") else p.get("vector", {})
+            sparse_obj = vector["sparse"]
+            if isinstance(sparse_obj, dict):
+                indices, values = sparse_obj["indices"], sparse_obj["values"]
+            else:
+                indices, values = sparse_obj.indices, sparse_obj.values
+
+            content = payload.get("search_content") or payload.get("text", "")
+            uid = point_uid(p, payload)
+            doc_id, chunk_index, total_chunks = chunk_position(payload)
+            rows[uid] = (
+                uid, doc_id, chunk_index, total_chunks, content, Jsonb(payload),
+                format_dense(vector["dense"]), format_sparse(indices, values)
+            )
+        if not rows:
+            return
+
+        table, stage = sql.Identifier(self.table_name), sql.Identifier("vector_upsert_stage")
+        copy_sql = sql.SQL("COPY {stage} (" + STAGE_COLUMNS + ") FROM STDIN").format(stage=stage)
+
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    await cur.execute(sql.SQL(STAGING_TABLE_SQL).format(stage=stage))
+                    async with cur.copy(copy_sql) as copy:
+                        for row in rows.values():
+                            await copy.write_row(row)
+                    await cur.execute(sql.SQL(MERGE_STAGING_SQL).format(table=table, stage=stage))
+
+    async def search(self, query_text: str, limit: int = 5, filter: dict = None):
+        return (await self.search_many([query_text], limit=limit, filters=filter))[0]
+
+    async def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """Async PostgresVectorDB.search_many(): one embedding batch, one SQL statement, one rerank call."""
+        if not queries:
+            return []
+
+        # 0. Embed Queries (off the event loop)
+        query_vecs = await aembed_query_batch(queries, self.executor)
+        dense_strs = [format_dense(v["dense"]) for v in query_vecs]
+        sparse_strs = [format_sparse(*sparse_to_lists(v["sparse"])) for v in query_vecs]
+
+        # 1. Hybrid Search SQL
+        where_sql, filter_args = build_filter_clause(filters, sql_module=sql)
+        initial_limit = self.rerank_policy.candidate_limit(queries)
+        query_sql = hybrid_search_sql(self.table_name, where_sql, sql_module=sql, prefetch_dims=self.prefetch_dims)
+        full_args = hybrid_search_args(
+            dense_strs, sparse_strs, filter_args, initial_limit,
+            prefetch_limit=self.prefetch_limit if self.prefetch_dims else None
+        )
+
+        candidate_lists = [[] for _ in queries]
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(query_sql, full_args)
+            for row in await cur.fetchall():
+                candidate_lists[row[0] - 1].append(SearchResult(
+                    id=row[1],
+                    payload=row[3],
+                    score=row[4],
+                    doc_id=row[5],
+                    chunk_index=row[6]
+                ))
+
+        # 2. Re-Ranking (off the event loop)
+        start_rerank = time.time()
+        results = await run_blocking(self.executor, self.rerank_policy.rerank, self.reranker, queries, candidate_lists, limit)
+        print(f"📊 Re-ranking took {time.time() - start_rerank:.4f}s")
+        return results
@@ -0,0 +1,120 @@
+from qdrant_client import AsyncQdrantClient
+from backend.core.config_loader import settings
+from backend.core.utils import run_blocking
+from backend.indexing.qdrant_client import (
+    add_prefetch_vector,
+    collection_config,
+    hybrid_request,
+    payload_index_fields,
+    prefetch_vector_name,
+    qdrant_filter,
+    search_params,
+)
+from backend.models.embedding_client import aembed_query_batch
+from backend.models.reranker_service import get_rerank_scorer
+from backend.retrieval.rerank_policy import get_rerank_policy
+from backend.models.runtime import get_inference_executor
+
+async def aresolve_collection(client, name: str):
+    """Async resolve_collection(): the physical collection behind an alias or collection name, or None."""
+    for alias in (await client.get_aliases()).aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name if await client.collection_exists(name) else None
+
+class AsyncQdrantVectorDB:
+    def __init__(self):
+        """
+        asyncio-native twin of QdrantVectorDB (same collection, same ranking).
+        Network calls are awaited; the encoders and the reranker run on the
+        bounded inference executor so the event loop is never blocked.
+        Call `await connect()` before the first search.
+        """
+        if not settings:
+            raise ValueError("❌ Settings not loaded. Check config_loader.py")
+
+        print(f"🔌 Connecting (async) to Qdrant at {settings.retrieval.vector_store_host}:{settings.retrieval.vector_store_port}...")
+
+        self.client = AsyncQdrantClient(
+            host=settings.retrieval.vector_store_host,
+            port=settings.retrieval.vector_store_port,
+            api_key=settings.retrieval.vector_store_api_key,
+            https=False,
+        )
+        self.collection_name = f"{settings.retrieval.vector_store_collection}_large"
+        self.vector_size = 1024
+        self.reranker = get_rerank_scorer(max_length=512)
+        self.rerank_policy = get_rerank_policy()
+        self.dense_params = search_params()
+        self.prefetch_dims = 0  # Set by connect() once the collection layout is known
+        self.prefetch_limit = settings.retrieval.dense_prefetch_limit
+        self.executor = get_inference_executor()
+
+    async def connect(self):
+        if await aresolve_collection(self.client, self.collection_name) is None:
+            print(f"📦 Collection '{self.collection_name}' not found. Creating...")
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                **collection_config(self.vector_size)
+            )
+            print(f"✅ Collection '{self.collection_name}' created successfully.")
+
+        physical = await aresolve_collection(self.client, self.collection_name)
+        existing = (await self.client.get_collection(physical)).payload_schema or {}
+        for field, schema in payload_index_fields().items():
+            if field not in existing:
+                await self.client.create_payload_index(
+                    collection_name=physical,
+                    field_name=field,
+                    field_schema=schema,
+                )
+                print(f"🗂️ Created payload index on '{field}'")
+
+        dims = settings.retrieval.dense_prefetch_dims
+        vectors = (await self.client.get_collection(physical)).config.params.vectors
+        if dims and prefetch_vector_name(dims) not in vectors:
+            print(f"⚠️ '{self.collection_name}' has no '{prefetch_vector_name(dims)}' vector: two-stage dense search disabled.")
+            dims = 0
+        self.prefetch_dims = dims
+
+    async def ping(self) -> bool:
+        return await aresolve_collection(self.client, self.collection_name) is not None
+
+    async def close(self):
+        await self.client.close()
+
+    async def upsert(self, points: list):
+        if self.prefetch_dims:
+            points = [add_prefetch_vector(p, self.prefetch_dims) for p in points]
+        await self.client.upsert(
+            collection_name=self.collection_name,
+            points=points
+        )
+
+    async def search(self, query_text: str, limit: int = 5, filter: dict = None):
+        return (await self.search_many([query_text], limit=limit, filters=filter))[0]
+
+    async def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """Async QdrantVectorDB.search_many(): one embedding batch, one batched query, one rerank call."""
+        if not queries:
+            return []
+        query_filter = qdrant_filter(filters)
+
+        # 0. GENERATE EMBEDDINGS (off the event loop)
+        query_vecs = await aembed_query_batch(queries, self.executor)
+
+        # 1. RETRIEVE CANDIDATES
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                hybrid_request(
+                    v, self.rerank_policy.budget(q), query_filter,
+                    self.dense_params, self.prefetch_dims, self.prefetch_limit
+                )
+                for q, v in zip(queries, query_vecs)
+            ],
+        )
+        candidate_lists = [r.points for r in responses]
+
+        # 2. RE-RANKING (off the event loop)
+        return await run_blocking(self.executor, self.rerank_policy.rerank, self.reranker, queries, candidate_lists, limit)
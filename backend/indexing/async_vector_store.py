@@ -0,0 +1,64 @@
+import os
+from backend.indexing.vector_store import build_result_cache, result_key
+from backend.indexing.async_qdrant_client import AsyncQdrantVectorDB
+from backend.indexing.async_postgres_client import AsyncPostgresVectorDB
+
+class AsyncVectorDBClient:
+    def __init__(self, provider: str = None):
+        """
+        asyncio counterpart of VectorDBClient, used by app.ainvoke().
+        Prefer `await backend.app.dependencies.get_async_vector_db()`, which
+        builds it once per process and runs connect().
+        """
+        self.provider = (provider or os.getenv("VECTOR_DB_PROVIDER", "qdrant")).lower()
+        print(f"🚀 Initializing Async Vector DB Provider: {self.provider.upper()}")
+
+        if self.provider == "postgres":
+            self.client = AsyncPostgresVectorDB()
+        else:
+            self.client = AsyncQdrantVectorDB()
+
+        self.collection_version = 0
+        self.result_cache = build_result_cache()
+
+    async def connect(self):
+        await self.client.connect()
+
+    def _result_key(self, query_text: str, limit: int, filter: dict = None) -> tuple:
+        return result_key(query_text, limit, filter, self.collection_version)
+
+    def invalidate_cache(self):
+        self.collection_version += 1
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    async def upsert(self, points: list):
+        result = await self.client.upsert(points)
+        self.invalidate_cache()
+        return result
+
+    async def search(self, query_text: str, limit: int = 5, filter: dict = None):
+        return (await self.search_many([query_text], limit=limit, filters=filter))[0]
+
+    async def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """Same contract and result cache semantics as VectorDBClient.search_many()."""
+        if self.result_cache is None:
+            return await self.client.search_many(queries, limit=limit, filters=filters)
+
+        keys = [self._result_key(q, limit, filters) for q in queries]
+        results = [self.result_cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+
+        if missing:
+            fresh = await self.client.search_many([queries[i] for i in missing], limit=limit, filters=filters)
+            for i, hits in zip(missing, fresh):
+                self.result_cache.set(keys[i], list(hits))
+                results[i] = hits
+
+        return [list(r) for r in results]
+
+    async def ping(self) -> bool:
+        return await self.client.ping()
+
+    async def close(self):
+        return await self.client.close()
@@ -1,7 +1,7 @@
 # BGE-M3 embedding logic
 import time
 from typing import List, Dict, Any
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 from backend.models.embedding_client import embed_documents
 from qdrant_client.http import models
 import uuid
@@ -10,10 +10,10 @@ import uuid
 class DenseIndexer:
     def __init__(self):
         """
-        Initialize the Database Client.
+        Initialize the Database Client (shared process-wide via the service registry).
         The Embedding Model is now handled by the shared embedding_client.
         """
-        self.db_client = VectorDBClient()
+        self.db_client = get_vector_db()
 
     def index_chunks(self, chunks: List[Dict[str, Any]]):
         """
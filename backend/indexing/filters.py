@@ -0,0 +1,49 @@
+# Backend-neutral metadata filters
+"""
+Filters are plain dicts over the chunk metadata (chunk["metadata"] from the chunker):
+
+    {"source": "loi_2024.pdf"}                 equality
+    {"source": ["a.pdf", "b.pdf"]}             any of
+    {"chunk_index": {"gte": 2, "lt": 10}}      range (gt / gte / lt / lte)
+    {"page": 3}, {"metadata": {"page": 3}}     same field: a leading "metadata" key is optional
+    {"lang": {"code": "fr"}}                   nested keys, any depth, same three forms
+
+All conditions are AND-ed. Paths are resolved once here (resolve_path), then each backend
+maps the resolved path to where it stores that field: PostgresVectorDB via
+build_filter_clause() (columns, or the "metadata" object of the JSONB payload),
+QdrantVectorDB via qdrant_filter() (flat payload, dotted keys).
+"""
+from typing import Any, Iterator, Tuple
+
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+def is_range(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(k in RANGE_OPERATORS for k in value)
+
+
+def resolve_path(path: tuple) -> tuple:
+    """Chunk-metadata path of a DSL path: ("metadata", "page") and ("page",) are the same field."""
+    return path[1:] if len(path) > 1 and path[0] == "metadata" else path
+
+
+def flatten_filters(filters: dict, prefix: tuple = ()) -> Iterator[Tuple[tuple, str, Any]]:
+    """
+    Yields (path, op, value) conditions, `path` being the tuple of nested keys
+    (already resolved, see resolve_path) and `op` one of "eq", "in", "range".
+    Empty lists are skipped (no constraint).
+    """
+    for key, value in (filters or {}).items():
+        path = prefix + (key,)
+
+        if isinstance(value, list):
+            if value:
+                yield resolve_path(path), "in", value
+        elif is_range(value):
+            yield resolve_path(path), "range", value
+        elif isinstance(value, dict):
+            yield from flatten_filters(value, path)
+        elif isinstance(value, (str, int, float, bool)):
+            yield resolve_path(path), "eq", value
+        else:
+            raise ValueError(f"❌ Unsupported filter value for '{'.'.join(path)}': {value!r}")
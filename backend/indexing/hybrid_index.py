@@ -1 +1,113 @@
 # Hybrid index (dense + sparse)
+import time
+from typing import List, Dict, Any
+
+from qdrant_client.http import models
+
+from backend.app.dependencies import get_vector_db
+from backend.core.utils import chunk_uid
+from backend.models.embedding_client import embed_hybrid, sparse_to_lists
+
+
+def qdrant_points(chunks: List[Dict[str, Any]], vectors: Dict[str, Any]) -> List[models.PointStruct]:
+    """
+    Qdrant points (deterministic ids) for chunks + their embed_hybrid() output.
+    The payload is flat: the chunk metadata at the top level, so a filter path resolves to
+    the same field here and in Postgres (see backend.indexing.filters).
+    """
+    points = []
+    for i, chunk in enumerate(chunks):
+        # Same deterministic ID scheme as DenseIndexer (Source + Chunk Index)
+        source = chunk["metadata"].get("source", "unknown")
+        index = chunk["metadata"].get("chunk_index", i)
+        point_id = chunk_uid(source, index)
+
+        payload = {
+            **chunk["metadata"],
+            "text": chunk.get("display_content", chunk["text"]),
+            "source": source,
+            "chunk_index": chunk["metadata"].get("chunk_index"),
+            "start_char": chunk["metadata"].get("start_char"),
+            "end_char": chunk["metadata"].get("end_char"),
+            "page": chunk["metadata"].get("page"),
+            "context_summary": chunk.get("search_content", "")[:200]
+        }
+
+        sp_indices, sp_values = sparse_to_lists(vectors["sparse"][i])
+        points.append(models.PointStruct(
+            id=point_id,
+            vector={
+                "dense": vectors["dense"][i],
+                "sparse": models.SparseVector(indices=sp_indices, values=sp_values),
+            },
+            payload=payload
+        ))
+    return points
+
+
+def postgres_points(chunks: List[Dict[str, Any]], vectors: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """PostgresVectorDB.upsert() points: the whole chunk (text, search_content, metadata) as payload."""
+    points = []
+    for i, chunk in enumerate(chunks):
+        # Deterministic ID (Source + Index) -> re-runs update rows in place
+        point_id = chunk_uid(chunk["metadata"]["source"], chunk["metadata"]["chunk_index"])
+        sp_indices, sp_values = sparse_to_lists(vectors["sparse"][i])
+        points.append({
+            "id": point_id,
+            "payload": {**chunk, "id": point_id},
+            "vector": {
+                "dense": vectors["dense"][i],
+                "sparse": {"indices": sp_indices, "values": sp_values}
+            }
+        })
+    return points
+
+
+class HybridIndexer:
+    def __init__(self):
+        """
+        Indexes dense + sparse vectors in a single upsert.
+        Both vectors come from ONE BGE-M3 forward pass (embed_hybrid), instead of
+        DenseIndexer + SparseIndexer encoding every chunk twice.
+        """
+        self.db_client = get_vector_db()
+
+    def index_chunks(self, chunks: List[Dict[str, Any]]):
+        if not chunks:
+            print("⚠️ No chunks to index.")
+            return
+
+        print(f"🚀 Embedding {len(chunks)} chunks (dense + sparse, single pass)...")
+        start_time = time.time()
+
+        # 1. Extract the text we want to SEARCH (The Enriched Content)
+        search_texts = [c.get("search_content", c["text"]) for c in chunks]
+
+        # 2. Generate Vectors
+        vectors = embed_hybrid(search_texts)
+
+        # 3. Prepare Points
+        points = qdrant_points(chunks, vectors)
+
+        # 4. Upload
+        print(f"📤 Uploading {len(points)} hybrid points...")
+        self.db_client.upsert(points)
+
+        print(f"✅ Hybrid Indexing Complete! Time taken: {time.time() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    indexer = HybridIndexer()
+    dummy_chunks = [
+        {
+            "text": "The price of the pro plan is $20.",
+            "search_content": "Context: Pricing. Content: The price of the pro plan is $20.",
+            "metadata": {"source": "test", "chunk_index": 0}
+        },
+        {
+            "text": "To reset password, click settings.",
+            "search_content": "Context: Security. Content: To reset password, click settings.",
+            "metadata": {"source": "test", "chunk_index": 1}
+        }
+    ]
+    indexer.index_chunks(dummy_chunks)
@@ -0,0 +1,110 @@
+# Binary COPY encoder for the Postgres vector table (pgvector wire formats, built with NumPy)
+import io
+import struct
+import uuid
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+
+_NULL = struct.pack(">i", -1)
+
+
+def _field(data: Optional[bytes]) -> bytes:
+    if data is None:
+        return _NULL
+    return struct.pack(">i", len(data)) + data
+
+
+def encode_uuid(value: str) -> bytes:
+    return uuid.UUID(str(value)).bytes
+
+
+def encode_text(value: str) -> bytes:
+    return value.encode("utf-8")
+
+
+def encode_jsonb(json_text: str) -> bytes:
+    # jsonb binary format: version byte (1) + JSON text
+    return b"\x01" + json_text.encode("utf-8")
+
+
+def encode_int(value: int) -> bytes:
+    return struct.pack(">i", int(value))
+
+
+def encode_vector(values) -> bytes:
+    """pgvector `vector` recv format: int16 dim, int16 unused, dim x float4 (big-endian)."""
+    arr = np.asarray(values, dtype=">f4").ravel()
+    return struct.pack(">hh", arr.shape[0], 0) + arr.tobytes()
+
+
+def encode_sparsevec(indices: Sequence[int], values: Sequence[float], dim: int = 250002) -> bytes:
+    """
+    pgvector `sparsevec` recv format: int32 dim, int32 nnz, int32 unused,
+    nnz x int32 0-based indices (ascending), nnz x float4 values.
+
+    `indices` are the same 1-based positions the text format ('{i:v}/dim') uses,
+    so rows written via COPY and via text literals are identical.
+    """
+    idx = np.asarray(indices, dtype=np.int64)
+    val = np.asarray(values, dtype=np.float32)
+
+    keep = val != 0
+    idx, val = idx[keep], val[keep]
+    order = np.argsort(idx, kind="stable")
+    idx, val = idx[order] - 1, val[order]
+
+    return (
+        struct.pack(">iii", dim, idx.shape[0], 0)
+        + idx.astype(">i4").tobytes()
+        + val.astype(">f4").tobytes()
+    )
+
+
+def encode_row(fields: Sequence[Optional[bytes]]) -> bytes:
+    return struct.pack(">h", len(fields)) + b"".join(_field(f) for f in fields)
+
+
+class CopyStream(io.RawIOBase):
+    """
+    File-like wrapper around an iterator of encoded rows, for cursor.copy_expert().
+    Rows are encoded lazily as psycopg2 reads, so memory stays bounded by the read size,
+    not by the number of rows.
+    """
+
+    def __init__(self, rows: Iterable[bytes]):
+        self._rows = iter(rows)
+        self._buffer = bytearray()
+        self._header_sent = False
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes:
+        if not self._header_sent:
+            self._header_sent = True
+            return COPY_HEADER
+        try:
+            return next(self._rows)
+        except StopIteration:
+            if self._done:
+                return b""
+            self._done = True
+            return COPY_TRAILER
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer.extend(chunk)
+
+        if size < 0:
+            size = len(self._buffer)
+        out = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return out
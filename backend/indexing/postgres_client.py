@@ -1,19 +1,498 @@
 import os
+import re
 import time
 import json
+import uuid
+import hashlib
+import threading
+import weakref
+from contextlib import contextmanager
 import psycopg2
-from psycopg2 import sql
+from psycopg2 import errors, sql
+from psycopg2.pool import ThreadedConnectionPool
 import torch
-from psycopg2.extras import execute_values, Json
-from backend.models.embedding_client import embed_queries, embed_sparse
-from sentence_transformers import CrossEncoder
+from backend.core.utils import chunk_uid
+from backend.indexing.filters import flatten_filters
+from backend.indexing.pg_copy import (
+    CopyStream,
+    encode_int,
+    encode_jsonb,
+    encode_row,
+    encode_sparsevec,
+    encode_text,
+    encode_uuid,
+    encode_vector,
+)
+from backend.models.embedding_client import embed_hybrid, embed_query_batch, sparse_to_lists
+from backend.models.reranker_service import get_rerank_scorer
+from backend.retrieval.rerank_policy import get_rerank_policy
 from backend.core.config_loader import settings
 
+
+# --- Filter Logic (DSL: backend.indexing.filters) ---
+# Top-level filter keys that are real (btree-indexed) columns, not only JSONB keys
+COLUMN_FIELDS = {"source": "doc_id", "chunk_index": "chunk_index"}
+# The payload column holds the whole chunk: its metadata (what filters address) is nested here
+PAYLOAD_METADATA_KEY = "metadata"
+
+RANGE_SQL = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _nest(path: tuple, value):
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+def filter_field(path: tuple) -> tuple:
+    """(column, None) for a column-backed filter path, else (None, JSONB path inside `metadata`)."""
+    column = COLUMN_FIELDS.get(path[0]) if len(path) == 1 else None
+    return (column, None) if column else (None, (PAYLOAD_METADATA_KEY,) + path)
+
+
+def build_filter_clause(filters: dict, sql_module=sql):
+    """
+    Builds the WHERE clause for the filter DSL of backend.indexing.filters.
+    `sql_module` is psycopg2.sql or psycopg.sql (same composition API), so the
+    sync and async backends share one implementation.
+    - equality: JSONB containment (metadata @> ...), served by the GIN index
+    - any-of: ?| for strings (also matches inside arrays), = ANY(jsonb[]) otherwise
+    - range: numeric comparison on the extracted key
+    `source` / `chunk_index` hit the doc_id / chunk_index columns instead, other
+    fields are looked up in the chunk metadata object of the payload (filter_field).
+    Returns: (sql_snippet, list_of_params)
+    """
+    conditions = []
+    args = []
+
+    for path, op, value in flatten_filters(filters):
+        column, path = filter_field(path)
+
+        if column:
+            col = sql_module.Identifier(column)
+            if op == "eq":
+                conditions.append(sql_module.SQL("{} = %s").format(col))
+                args.append(value)
+            elif op == "in":
+                conditions.append(sql_module.SQL("{} = ANY(%s)").format(col))
+                args.append(value)
+            else:
+                for name, bound in value.items():
+                    conditions.append(sql_module.SQL("{} " + RANGE_SQL[name] + " %s").format(col))
+                    args.append(bound)
+
+        elif op == "eq":
+            conditions.append(sql_module.SQL("metadata @> %s::jsonb"))
+            args.append(json.dumps(_nest(path, value)))
+
+        elif op == "in":
+            if all(isinstance(v, str) for v in value):
+                conditions.append(sql_module.SQL("metadata #> %s ?| %s"))
+                args.extend([list(path), value])
+            else:
+                conditions.append(sql_module.SQL("metadata #> %s = ANY(%s::jsonb[])"))
+                args.extend([list(path), [json.dumps(v) for v in value]])
+
+        else:
+            for name, bound in value.items():
+                conditions.append(sql_module.SQL("(metadata #>> %s)::numeric " + RANGE_SQL[name] + " %s"))
+                args.extend([list(path), bound])
+
+    if not conditions:
+        return sql_module.SQL("TRUE"), []
+
+    return sql_module.SQL(" AND ").join(conditions), args
+
+
+# Each query is ranked independently inside the LATERAL subquery;
+# 'qid' is the 1-based position of the query in the input list.
+# Each leg is a plain `ORDER BY <distance> LIMIT k` so the planner can walk the HNSW index,
+# ranks are assigned to the k survivors only, and content/metadata are fetched for the final ids only.
+# RRF: a doc missing from one leg contributes nothing for that leg.
+# Params: [dense texts, sparse texts] + [filter args, limit] (dense) + [filter args, limit] (sparse) + [final limit]
+# (two-stage dense leg: [filter args, prefetch limit, limit])
+HYBRID_SEARCH_SQL = """
+    SELECT
+        q.qid,
+        doc.id,
+        doc.content,
+        doc.metadata,
+        r.rrf_score,
+        doc.doc_id,
+        doc.chunk_index
+    FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS qt(dense_txt, sparse_txt, qid)
+    CROSS JOIN LATERAL (
+        SELECT qt.qid, qt.dense_txt::vector AS dense, qt.sparse_txt::sparsevec AS sparse{query_prefix}
+    ) q
+    CROSS JOIN LATERAL (
+        SELECT fused.id, SUM(1.0 / (60 + fused.rank)) AS rrf_score
+        FROM ({dense_leg}
+            UNION ALL
+            SELECT id, ROW_NUMBER() OVER (ORDER BY dist) AS rank
+            FROM (
+                SELECT id, sparse_vector <#> q.sparse AS dist
+                FROM {table}
+                WHERE {where_clause}
+                ORDER BY sparse_vector <#> q.sparse
+                LIMIT %s
+            ) sparse_top
+        ) fused
+        GROUP BY fused.id
+        ORDER BY rrf_score DESC
+        LIMIT %s
+    ) r
+    JOIN {table} doc ON doc.id = r.id
+    ORDER BY q.qid, r.rrf_score DESC;
+"""
+
+
+# Dense leg, single stage: HNSW on the full 1024-d vector
+DENSE_LEG_SQL = """
+            SELECT id, ROW_NUMBER() OVER (ORDER BY dist) AS rank
+            FROM (
+                SELECT id, dense_vector <=> q.dense AS dist
+                FROM {table}
+                WHERE {where_clause}
+                ORDER BY dense_vector <=> q.dense
+                LIMIT %s
+            ) dense_top"""
+
+# Dense leg, two stages: HNSW on the halfvec prefix column for the prefetch limit,
+# then exact rescoring of those candidates with the full vector
+DENSE_LEG_TWO_STAGE_SQL = """
+            SELECT id, ROW_NUMBER() OVER (ORDER BY dist) AS rank
+            FROM (
+                SELECT c.id, c.dense_vector <=> q.dense AS dist
+                FROM (
+                    SELECT id, dense_vector
+                    FROM {table}
+                    WHERE {where_clause}
+                    ORDER BY {prefix_col} <=> q.dense_prefix
+                    LIMIT %s
+                ) c
+                ORDER BY dist
+                LIMIT %s
+            ) dense_top"""
+
+
+def prefix_column(dims: int) -> str:
+    """Generated halfvec column holding the truncated, renormalized dense vector."""
+    return f"dense_{dims}"
+
+
+def prefix_expression(source, dims: int, sql_module=sql):
+    """SQL for the first `dims` components of a vector expression, renormalized, as halfvec."""
+    return sql_module.SQL("l2_normalize(subvector({src}, 1, {n}))::halfvec({n})").format(
+        src=source, n=sql_module.Literal(dims)
+    )
+
+
+def hybrid_search_sql(table_name: str, where_sql, sql_module=sql, prefetch_dims: int = 0):
+    table = sql_module.Identifier(table_name)
+    if prefetch_dims:
+        dense_leg = sql_module.SQL(DENSE_LEG_TWO_STAGE_SQL).format(
+            table=table, where_clause=where_sql, prefix_col=sql_module.Identifier(prefix_column(prefetch_dims))
+        )
+        query_prefix = sql_module.SQL(", {} AS dense_prefix").format(
+            prefix_expression(sql_module.SQL("qt.dense_txt::vector"), prefetch_dims, sql_module)
+        )
+    else:
+        dense_leg = sql_module.SQL(DENSE_LEG_SQL).format(table=table, where_clause=where_sql)
+        query_prefix = sql_module.SQL("")
+
+    return sql_module.SQL(HYBRID_SEARCH_SQL).format(
+        table=table,
+        where_clause=where_sql,
+        dense_leg=dense_leg,
+        query_prefix=query_prefix,
+    )
+
+
+def hybrid_search_args(dense_strs: list, sparse_strs: list, filter_args: list, initial_limit: int,
+                       prefetch_limit: int = None) -> list:
+    # [Query Vecs] + [Filter Args, (Prefetch Limit,) Limit] (dense) + [Filter Args, Limit] (sparse) + [Final Limit]
+    dense_limits = [prefetch_limit, initial_limit] if prefetch_limit else [initial_limit]
+    return (
+        [dense_strs, sparse_strs]
+        + filter_args + dense_limits
+        + filter_args + [initial_limit]
+        + [initial_limit]
+    )
+
+
+def create_table_sql(table_name: str, sql_module=sql, prefetch_dims: int = 0):
+    # chunk_uid is the deterministic chunk id (upsert key); (doc_id, chunk_index) orders chunks
+    # inside a document, so neighbour lookups are an index range scan.
+    # The ALTERs migrate tables created before these columns existed.
+    statement = sql_module.SQL("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id bigserial PRIMARY KEY,
+            chunk_uid uuid,
+            doc_id text,
+            chunk_index integer,
+            total_chunks integer,
+            content text,
+            metadata jsonb,
+            dense_vector vector(1024),
+            sparse_vector sparsevec(250002)
+        );
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS chunk_uid uuid;
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS doc_id text;
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS chunk_index integer;
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS total_chunks integer;
+        CREATE UNIQUE INDEX IF NOT EXISTS {uid_idx} ON {table} (chunk_uid);
+        CREATE UNIQUE INDEX IF NOT EXISTS {pos_idx} ON {table} (doc_id, chunk_index);
+    """).format(
+        table=sql_module.Identifier(table_name),
+        uid_idx=sql_module.Identifier(f"{table_name}_chunk_uid_key"),
+        pos_idx=sql_module.Identifier(f"{table_name}_doc_chunk_key"),
+    )
+    if not prefetch_dims:
+        return statement
+
+    # Two-stage dense search: a generated column, so every write path (COPY merge, executemany)
+    # fills it and adding it backfills existing rows (one table rewrite). Needs pgvector >= 0.7.
+    return statement + sql_module.SQL("""
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} halfvec({n}) GENERATED ALWAYS AS ({expr}) STORED;
+    """).format(
+        table=sql_module.Identifier(table_name),
+        col=sql_module.Identifier(prefix_column(prefetch_dims)),
+        n=sql_module.Literal(prefetch_dims),
+        expr=prefix_expression(sql_module.Identifier("dense_vector"), prefetch_dims, sql_module),
+    )
+
+
+# Rows are COPYed into a per-transaction staging table, then merged on chunk_uid
+STAGING_TABLE_SQL = """
+    CREATE TEMP TABLE {stage} (
+        chunk_uid uuid,
+        doc_id text,
+        chunk_index integer,
+        total_chunks integer,
+        content text,
+        metadata jsonb,
+        dense_vector vector(1024),
+        sparse_vector sparsevec(250002)
+    ) ON COMMIT DROP;
+"""
+
+STAGE_COLUMNS = "chunk_uid, doc_id, chunk_index, total_chunks, content, metadata, dense_vector, sparse_vector"
+
+MERGE_STAGING_SQL = """
+    INSERT INTO {table} (chunk_uid, doc_id, chunk_index, total_chunks, content, metadata, dense_vector, sparse_vector)
+    SELECT chunk_uid, doc_id, chunk_index, total_chunks, content, metadata, dense_vector, sparse_vector FROM {stage}
+    ON CONFLICT (chunk_uid) DO UPDATE SET
+        doc_id = EXCLUDED.doc_id,
+        chunk_index = EXCLUDED.chunk_index,
+        total_chunks = EXCLUDED.total_chunks,
+        content = EXCLUDED.content,
+        metadata = EXCLUDED.metadata,
+        dense_vector = EXCLUDED.dense_vector,
+        sparse_vector = EXCLUDED.sparse_vector;
+"""
+
+
+def index_definitions(table_name: str, m: int, ef_construction: int, sql_module=sql, prefetch_dims: int = 0) -> dict:
+    """
+    Managed indexes: {index name: CREATE INDEX statement}.
+    - HNSW (cosine) on dense_vector, matching the <=> operator used by search
+    - HNSW (inner product) on sparse_vector, matching <#> (pgvector: <= 1000 non-zeros per vector)
+    - GIN on metadata for the ?| / containment filters
+    - HNSW (cosine, halfvec) on the dense prefix column, when two-stage dense search is on
+    """
+    table = sql_module.Identifier(table_name)
+    hnsw_params = sql_module.SQL("WITH (m = {}, ef_construction = {})").format(
+        sql_module.Literal(m), sql_module.Literal(ef_construction)
+    )
+    definitions = {
+        f"{table_name}_dense_hnsw": sql_module.SQL(
+            "CREATE INDEX IF NOT EXISTS {idx} ON {table} USING hnsw (dense_vector vector_cosine_ops) {params}"
+        ).format(idx=sql_module.Identifier(f"{table_name}_dense_hnsw"), table=table, params=hnsw_params),
+        f"{table_name}_sparse_hnsw": sql_module.SQL(
+            "CREATE INDEX IF NOT EXISTS {idx} ON {table} USING hnsw (sparse_vector sparsevec_ip_ops) {params}"
+        ).format(idx=sql_module.Identifier(f"{table_name}_sparse_hnsw"), table=table, params=hnsw_params),
+        f"{table_name}_metadata_gin": sql_module.SQL(
+            "CREATE INDEX IF NOT EXISTS {idx} ON {table} USING gin (metadata)"
+        ).format(idx=sql_module.Identifier(f"{table_name}_metadata_gin"), table=table),
+    }
+    if prefetch_dims:
+        name = f"{table_name}_{prefix_column(prefetch_dims)}_hnsw"
+        definitions[name] = sql_module.SQL(
+            "CREATE INDEX IF NOT EXISTS {idx} ON {table} USING hnsw ({col} halfvec_cosine_ops) {params}"
+        ).format(
+            idx=sql_module.Identifier(name),
+            table=table,
+            col=sql_module.Identifier(prefix_column(prefetch_dims)),
+            params=hnsw_params,
+        )
+    return definitions
+
+
+def point_uid(point, payload: dict) -> str:
+    """
+    Upsert key: the point id if it has one, else uuid5(source, chunk_index),
+    else a content hash. Never random, so re-ingesting updates rows in place.
+    """
+    uid = point.id if hasattr(point, 'payload') else (point.get('id') or payload.get('id'))
+    if uid is None:
+        source, index, _ = chunk_position(payload)
+        if source is not None and index is not None:
+            return chunk_uid(source, index)
+        uid = payload.get("search_content") or payload.get("text", "")
+    try:
+        return str(uuid.UUID(str(uid)))
+    except ValueError:
+        return str(uuid.uuid5(uuid.NAMESPACE_DNS, str(uid)))
+
+
+def chunk_position(payload: dict) -> tuple:
+    """(doc_id, chunk_index, total_chunks) from a chunk payload (top-level or nested 'metadata')."""
+    meta = payload.get("metadata") or {}
+    doc_id = payload.get("source") or meta.get("source")
+    chunk_index = payload.get("chunk_index", meta.get("chunk_index"))
+    total_chunks = payload.get("total_chunks", meta.get("total_chunks"))
+    return doc_id, chunk_index, total_chunks
+
+
+def format_sparse(indices, values, dim=250002) -> str:
+    elements = [f"{i}:{v}" for i, v in zip(indices, values)]
+    return "{" + ",".join(elements) + "}/" + str(dim)
+
+
+def format_dense(vector) -> str:
+    return "[" + ",".join(str(float(x)) for x in vector) + "]"
+
+
+COPY_BUFFER_BYTES = 1 << 20  # Bytes handed to libpq per COPY write
+
+# One (doc_id, lo, hi) window per row of the unnest; each is a range scan on the (doc_id, chunk_index) index.
+# 'wid' is the 1-based position of the window in the input list.
+# Returns the raw chunk text (not the enriched search content) and its start offset, for stitching.
+WINDOW_FETCH_SQL = """
+    SELECT w.wid, t.id, t.chunk_index, t.text, t.start_char
+    FROM unnest(%s::text[], %s::int[], %s::int[]) WITH ORDINALITY AS w(doc_id, lo, hi, wid)
+    JOIN LATERAL (
+        SELECT
+            id,
+            chunk_index,
+            COALESCE(metadata->>'text', content) AS text,
+            COALESCE(metadata->>'start_char', metadata->'metadata'->>'start_char')::int AS start_char
+        FROM {table}
+        WHERE doc_id = w.doc_id AND chunk_index BETWEEN w.lo AND w.hi
+    ) t ON TRUE
+    ORDER BY w.wid, t.chunk_index;
+"""
+
+
+class PostgresConnectionPool:
+    """
+    Thread-safe pool of autocommit psycopg2 connections.
+
+    - getconn() blocks (instead of raising PoolError) once `max_size` connections are checked out.
+    - Broken connections are dropped and the operation is retried once on a fresh one.
+    - Server-side prepared statements are tracked per connection, so each statement is
+      planned once per connection instead of once per call. The tracking is keyed by the
+      connection object itself (weakly) and dropped whenever a connection is closed, so a new
+      connection never inherits the statement names of a closed one.
+    """
+
+    _RETRYABLE = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+    def __init__(self, min_size: int, max_size: int, **conn_kwargs):
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = ThreadedConnectionPool(min_size, max_size, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._prepared = weakref.WeakKeyDictionary()  # conn -> set of statement names
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._pool.getconn()
+            if conn.closed:
+                self._discard(conn)
+                conn = self._pool.getconn()
+            conn.autocommit = True
+            yield conn
+        except self._RETRYABLE:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._pool.putconn(conn)
+                if conn.closed:  # Connections beyond min_size are closed on return
+                    self._forget(conn)
+            self._slots.release()
+
+    def _forget(self, conn):
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+    def _discard(self, conn):
+        self._forget(conn)
+        self._pool.putconn(conn, close=True)
+
+    def run(self, fn):
+        """
+        Runs fn(conn) on a pooled connection; reconnects and retries once if the
+        connection turns out to be dead (server restart, idle timeout, network blip).
+        """
+        try:
+            with self.connection() as conn:
+                return fn(conn)
+        except self._RETRYABLE as e:
+            print(f"⚠️ Postgres connection lost ({e.__class__.__name__}). Reconnecting...")
+            with self.connection() as conn:
+                return fn(conn)
+
+    def execute_prepared(self, conn, name: str, statement: str, args: list):
+        """
+        EXECUTEs `statement` (psycopg2 %s placeholders) as the prepared statement `name`,
+        PREPAREing it first if this connection has not seen it yet. Returns all rows.
+        If the server does not know the statement after all (session reset behind our back),
+        it is PREPAREd again and executed once more.
+        """
+        counter = iter(range(1, statement.count("%s") + 1))
+        body = re.sub(r"%s", lambda _: f"${next(counter)}", statement)
+        placeholders = ", ".join(["%s"] * len(args))
+        execute = f"EXECUTE {name} ({placeholders})" if args else f"EXECUTE {name}"
+
+        with conn.cursor() as cur:
+            with self._lock:
+                known = self._prepared.setdefault(conn, set())
+                needs_prepare = name not in known
+            if needs_prepare:
+                cur.execute(f"PREPARE {name} AS {body}")
+                with self._lock:
+                    known.add(name)
+
+            try:
+                cur.execute(execute, args)
+            except errors.InvalidSqlStatementName:
+                cur.execute(f"PREPARE {name} AS {body}")
+                cur.execute(execute, args)
+            return cur.fetchall()
+
+    def close(self):
+        self._pool.closeall()
+
+
+def statement_name(prefix: str, statement: str) -> str:
+    return f"{prefix}_{hashlib.sha1(statement.encode('utf-8')).hexdigest()[:12]}"
+
+
 class SearchResult:
-    def __init__(self, id, payload, score):
+    def __init__(self, id, payload, score, doc_id=None, chunk_index=None):
         self.id = id
         self.payload = payload
         self.score = score
+        self.doc_id = doc_id
+        self.chunk_index = chunk_index
 
 class PostgresVectorDB:
     def __init__(self):
@@ -26,190 +505,334 @@ class PostgresVectorDB:
         self.dbname = settings.retrieval.postgres_db
         self.port = str(settings.retrieval.postgres_port)
         
-        print(f"🔌 Connecting to Postgres at {self.host}:{self.port}...")
-        self.conn = psycopg2.connect(
-            host=self.host, user=self.user, password=self.password, dbname=self.dbname, port=self.port
+        print(f"🔌 Connecting to Postgres at {self.host}:{self.port} "
+              f"(pool {settings.retrieval.postgres_pool_min}-{settings.retrieval.postgres_pool_max})...")
+        self.hnsw_m = settings.retrieval.postgres_hnsw_m
+        self.hnsw_ef_construction = settings.retrieval.postgres_hnsw_ef_construction
+        self.hnsw_ef_search = settings.retrieval.postgres_hnsw_ef_search
+        self.prefetch_dims = settings.retrieval.dense_prefetch_dims
+        self.prefetch_limit = settings.retrieval.dense_prefetch_limit
+        if self.prefetch_dims and self.prefetch_limit > self.hnsw_ef_search:
+            print(f"⚠️ dense_prefetch.limit ({self.prefetch_limit}) > hnsw.ef_search ({self.hnsw_ef_search}): "
+                  f"the prefix scan returns at most {self.hnsw_ef_search} candidates.")
+
+        # hnsw.ef_search is a session GUC: set it on every pooled connection at connect time
+        self.pool = PostgresConnectionPool(
+            settings.retrieval.postgres_pool_min,
+            settings.retrieval.postgres_pool_max,
+            host=self.host, user=self.user, password=self.password, dbname=self.dbname, port=self.port,
+            options=f"-c hnsw.ef_search={self.hnsw_ef_search}"
         )
-        self.conn.autocommit = True
         self.table_name = settings.retrieval.vector_store_collection
 
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
 
-        self.reranker = CrossEncoder('BAAI/bge-reranker-v2-m3', max_length=2048, device="cuda")
+        self.reranker = get_rerank_scorer(max_length=2048)
+        self.rerank_policy = get_rerank_policy()
         self._ensure_table_exists()
+        if settings.retrieval.postgres_build_indexes:
+            self.build_indexes()
 
     def _ensure_table_exists(self):
-        with self.conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            
-            query = sql.SQL("""
-                CREATE TABLE IF NOT EXISTS {table} (
-                    id bigserial PRIMARY KEY,
-                    content text,
-                    metadata jsonb,
-                    dense_vector vector(1024),
-                    sparse_vector sparsevec(250002)
-                );
-            """).format(table=sql.Identifier(self.table_name))
-            cur.execute(query)
+        def _create(conn):
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                cur.execute(create_table_sql(self.table_name, prefetch_dims=self.prefetch_dims))
+                cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {table} WHERE chunk_uid IS NULL)").format(
+                    table=sql.Identifier(self.table_name)
+                ))
+                if cur.fetchone()[0]:
+                    print("⚠️ Table has rows without chunk_uid (pre-upsert ingestion). Run migrate_legacy_rows().")
+        self.pool.run(_create)
+
+    # --- Index lifecycle ---
+    def index_status(self) -> dict:
+        """
+        Every index on the table: {name: {"method", "options", "size_mb"}}.
+        'options' holds the HNSW build parameters (m, ef_construction) when present.
+        """
+        def _status(conn):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.relname, am.amname, c.reloptions, pg_relation_size(c.oid)
+                    FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    JOIN pg_class t ON t.oid = i.indrelid
+                    JOIN pg_am am ON am.oid = c.relam
+                    WHERE t.relname = %s AND t.relkind = 'r';
+                """, [self.table_name])
+                return cur.fetchall()
+
+        status = {}
+        for name, method, reloptions, size in self.pool.run(_status):
+            options = dict(opt.split("=", 1) for opt in (reloptions or []))
+            status[name] = {"method": method, "options": options, "size_mb": round(size / 1024 / 1024, 2)}
+        return status
+
+    def _index_is_stale(self, info: dict) -> bool:
+        if info["method"] != "hnsw":
+            return False
+        options = info["options"]
+        return (
+            int(options.get("m", 16)) != self.hnsw_m
+            or int(options.get("ef_construction", 64)) != self.hnsw_ef_construction
+        )
+
+    def build_indexes(self, rebuild: bool = False):
+        """
+        Creates the managed HNSW/GIN indexes if missing. An HNSW index whose build
+        parameters no longer match the config (or every index, with rebuild=True)
+        is dropped and rebuilt.
+        """
+        definitions = index_definitions(self.table_name, self.hnsw_m, self.hnsw_ef_construction, prefetch_dims=self.prefetch_dims)
+        status = self.index_status()
+
+        for name, create_sql in definitions.items():
+            info = status.get(name)
+            if info is not None and not rebuild and not self._index_is_stale(info):
+                continue
+
+            def _build(conn, name=name, create_sql=create_sql, drop=info is not None):
+                with conn.cursor() as cur:
+                    if drop:
+                        cur.execute(sql.SQL("DROP INDEX IF EXISTS {idx}").format(idx=sql.Identifier(name)))
+                    cur.execute(create_sql)
+
+            print(f"🏗️ Building index '{name}'...")
+            start = time.time()
+            self.pool.run(_build)
+            print(f"✅ Index '{name}' ready in {time.time() - start:.2f}s")
+
+    def reindex(self):
+        """
+        Rebuilds every managed index in place (REINDEX CONCURRENTLY: reads and writes keep working),
+        then refreshes planner statistics. Use after large deletes/updates have fragmented the graphs.
+        """
+        existing = self.index_status()
+        for name in index_definitions(self.table_name, self.hnsw_m, self.hnsw_ef_construction, prefetch_dims=self.prefetch_dims):
+            if name not in existing:
+                continue
+
+            def _reindex(conn, name=name):
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("REINDEX INDEX CONCURRENTLY {idx}").format(idx=sql.Identifier(name)))
+
+            print(f"🔁 Reindexing '{name}'...")
+            start = time.time()
+            self.pool.run(_reindex)
+            print(f"✅ '{name}' reindexed in {time.time() - start:.2f}s")
+
+        def _analyze(conn):
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("ANALYZE {table}").format(table=sql.Identifier(self.table_name)))
+        self.pool.run(_analyze)
+
+    def ping(self) -> bool:
+        """Cheap liveness probe used by the service registry."""
+        def _ping(conn):
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                return cur.fetchone()[0] == 1
+        return self.pool.run(_ping)
+
+    def close(self):
+        self.pool.close()
 
     def _format_sparse(self, indices, values, dim=250002):
-        elements = [f"{i}:{v}" for i, v in zip(indices, values)]
-        return "{" + ",".join(elements) + "}/" + str(dim)
+        return format_sparse(indices, values, dim)
+
+    def _sparse_parts(self, sparse_obj):
+        """Accepts {'indices': [...], 'values': [...]} or a Qdrant SparseVector."""
+        if isinstance(sparse_obj, dict):
+            return sparse_obj['indices'], sparse_obj['values']
+        return sparse_obj.indices, sparse_obj.values
 
-    # --- NEW: Filter Logic ported from Target Code ---
     def _build_filter_clause(self, filters: dict):
+        return build_filter_clause(filters)
+
+    def _encode_point(self, point) -> tuple:
+        """(chunk_uid, COPY row bytes) for one point (PointStruct or {'payload', 'vector'} dict)."""
+        if hasattr(point, 'payload'):
+            payload, vector = point.payload, point.vector
+        else:
+            payload, vector = point.get('payload', {}), point.get('vector', {})
+
+        uid = point_uid(point, payload)
+        doc_id, chunk_index, total_chunks = chunk_position(payload)
+        content = payload.get("search_content") or payload.get("text", "")
+        row = encode_row([
+            encode_uuid(uid),
+            encode_text(str(doc_id)) if doc_id is not None else None,
+            encode_int(chunk_index) if chunk_index is not None else None,
+            encode_int(total_chunks) if total_chunks is not None else None,
+            encode_text(content),
+            encode_jsonb(json.dumps(payload, ensure_ascii=False, default=str)),
+            encode_vector(vector['dense']),
+            encode_sparsevec(*self._sparse_parts(vector['sparse'])),
+        ])
+        return uid, row
+
+    def upsert(self, points: list, batch_size: int = 2000):
         """
-        Builds the WHERE clause dynamically based on the target code's logic.
-        Returns: (sql_snippet, list_of_params)
+        Idempotent bulk upsert: each batch is streamed with COPY ... (FORMAT BINARY) into a
+        temp staging table (vectors encoded straight from NumPy, no SQL literals), then merged
+        with INSERT ... ON CONFLICT (chunk_uid) DO UPDATE in the same transaction.
+        Re-ingesting a document updates its rows in place; chunks past its new count are removed by
+        IngestionPipeline.sync() (delete_document) once the whole document made it, like on Qdrant.
         """
-        if not filters:
-            return sql.SQL("TRUE"), []
-
-        conditions = []
-        args = []
-
-        for key, value in filters.items():
-            # 1. Handle Lists (JSONB contains any): field ?| ['a', 'b']
-            if isinstance(value, list):
-                if not value: continue # Skip empty lists
-                conditions.append(sql.SQL("metadata->%s ?| %s"))
-                args.extend([key, value]) # Pass key as string, value as list
-            
-            # 2. Handle Dicts (Nested JSONB): field->key = value
-            elif isinstance(value, dict):
-                sub_conditions = []
-                for sub_key, sub_val in value.items():
-                    if isinstance(sub_val, list):
-                        sub_conditions.append(sql.SQL("metadata->%s->%s ?| %s"))
-                        args.extend([key, sub_key, sub_val])
-                    else:
-                        # Use json.dumps for primitives inside JSONB to ensure correct types
-                        sub_conditions.append(sql.SQL("metadata->%s->%s = %s"))
-                        args.extend([key, sub_key, json.dumps(sub_val)])
-                
-                if sub_conditions:
-                    conditions.append(sql.SQL("(") + sql.SQL(" AND ").join(sub_conditions) + sql.SQL(")"))
-
-            # 3. Handle Primitives (Strings, Ints, Bools)
-            elif isinstance(value, (str, int, float, bool)):
-                conditions.append(sql.SQL("metadata->>%s = %s"))
-                args.extend([key, str(value)]) # ->> operator returns text
-
-        if not conditions:
-             return sql.SQL("TRUE"), []
-
-        return sql.SQL(" AND ").join(conditions), args
-
-    def upsert(self, points: list):
-        data_to_insert = []
-        for p in points:
-            if hasattr(p, 'payload'):
-                payload = p.payload
-                dense = p.vector['dense']
-                sparse_obj = p.vector['sparse']
-                sparse_str = self._format_sparse(sparse_obj['indices'], sparse_obj['values'])
-            else:
-                payload = p.get('payload', {})
-                dense = p.get('vector', {}).get('dense')
-                sparse_obj = p.get('vector', {}).get('sparse')
-                sparse_str = self._format_sparse(sparse_obj['indices'], sparse_obj['values'])
+        stage = sql.Identifier("vector_upsert_stage")
+        create_stage = sql.SQL(STAGING_TABLE_SQL).format(stage=stage)
+        copy_sql = sql.SQL(
+            "COPY {stage} (" + STAGE_COLUMNS + ") FROM STDIN (FORMAT BINARY)"
+        ).format(stage=stage)
+        merge = sql.SQL(MERGE_STAGING_SQL).format(table=sql.Identifier(self.table_name), stage=stage)
+
+        for start in range(0, len(points), batch_size):
+            # Last write wins inside a batch (ON CONFLICT cannot touch the same row twice)
+            rows = dict(self._encode_point(p) for p in points[start:start + batch_size])
 
-            content = payload.get("search_content") or payload.get("text", "")
-            data_to_insert.append((content, Json(payload), dense, sparse_str))
+            def _copy(conn, rows=rows):
+                conn.autocommit = False
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(create_stage)
+                        cur.copy_expert(copy_sql.as_string(conn), CopyStream(rows.values()), size=COPY_BUFFER_BYTES)
+                        cur.execute(merge)
+                    conn.commit()
+                except Exception:
+                    if not conn.closed:
+                        conn.rollback()
+                    raise
+                finally:
+                    if not conn.closed:
+                        conn.autocommit = True
 
-        with self.conn.cursor() as cur:
-            query = sql.SQL("""
-                INSERT INTO {table} (content, metadata, dense_vector, sparse_vector)
-                VALUES %s
-            """).format(table=sql.Identifier(self.table_name))
-            execute_values(cur, query, data_to_insert)
+            self.pool.run(_copy)
+
+    def delete_document(self, doc_id: str, from_index: int = 0):
+        """Deletes the rows of `doc_id` with chunk_index >= from_index (0: the whole document)."""
+        delete_sql = sql.SQL("DELETE FROM {table} WHERE doc_id = %s AND chunk_index >= %s").format(
+            table=sql.Identifier(self.table_name)
+        )
+
+        def _delete(conn):
+            with conn.cursor() as cur:
+                cur.execute(delete_sql, (doc_id, from_index))
+                return cur.rowcount
+
+        return self.pool.run(_delete)
+
+    def _execute_prepared(self, prefix: str, query, args: list):
+        """
+        Renders a composed query once, then runs it as a server-side prepared statement.
+        The statement name is derived from the SQL text, so every filter shape gets its own plan.
+        """
+        def _execute(conn):
+            statement = query.as_string(conn)
+            return self.pool.execute_prepared(conn, statement_name(prefix, statement), statement, args)
+        return self.pool.run(_execute)
+
+    def fetch_windows(self, windows: list) -> list:
+        """
+        Neighbour fetch for window retrieval. `windows` is [(doc_id, lo, hi), ...] (inclusive chunk_index
+        bounds); returns one [(id, chunk_index, text, start_char), ...] list per window, in chunk order.
+        All windows are served by one prepared statement doing index range scans on (doc_id, chunk_index).
+        """
+        if not windows:
+            return []
+        doc_ids, los, his = (list(col) for col in zip(*windows))
+        query = sql.SQL(WINDOW_FETCH_SQL).format(table=sql.Identifier(self.table_name))
+
+        results = [[] for _ in windows]
+        for wid, *row in self._execute_prepared("windows", query, [doc_ids, los, his]):
+            results[wid - 1].append(tuple(row))
+        return results
+
+    def migrate_legacy_rows(self, dry_run: bool = False) -> dict:
+        """
+        One-off cleanup for rows written before the deterministic schema:
+        - backfills doc_id / chunk_index / total_chunks from metadata where chunk_uid is set
+        - deletes rows without chunk_uid (append-only duplicates; re-run ingestion to restore them)
+        """
+        table = sql.Identifier(self.table_name)
+        count_sql = sql.SQL("""
+            SELECT
+                COUNT(*) FILTER (WHERE chunk_uid IS NULL),
+                COUNT(*) FILTER (WHERE chunk_uid IS NOT NULL AND doc_id IS NULL)
+            FROM {table}
+        """).format(table=table)
+        backfill_sql = sql.SQL("""
+            UPDATE {table} SET
+                doc_id = COALESCE(metadata->>'source', metadata->'metadata'->>'source'),
+                chunk_index = COALESCE(metadata->>'chunk_index', metadata->'metadata'->>'chunk_index')::int,
+                total_chunks = COALESCE(metadata->>'total_chunks', metadata->'metadata'->>'total_chunks')::int
+            WHERE chunk_uid IS NOT NULL AND doc_id IS NULL
+        """).format(table=table)
+        delete_sql = sql.SQL("DELETE FROM {table} WHERE chunk_uid IS NULL").format(table=table)
+
+        def _migrate(conn):
+            with conn.cursor() as cur:
+                cur.execute(count_sql)
+                legacy, missing_position = cur.fetchone()
+                if not dry_run:
+                    cur.execute(backfill_sql)
+                    cur.execute(delete_sql)
+                return {"deleted": legacy, "backfilled": missing_position, "dry_run": dry_run}
+
+        report = self.pool.run(_migrate)
+        print(f"🧹 Legacy rows: {report}")
+        return report
+
+    def _format_dense(self, vector) -> str:
+        return format_dense(vector)
 
     # --- UPDATED: Hybrid Search with Filters ---
     def search(self, query_text: str, limit: int = 5, filter: dict = None):
-        # 0. Embed Query
-        query_dense = embed_queries([query_text])[0]
-        sparse_output = embed_sparse([query_text])[0]
-        query_sparse_str = self._format_sparse(
-            list(int(k) for k in sparse_output.keys()), 
-            list(float(v) for v in sparse_output.values())
-        )
+        return self.search_many([query_text], limit=limit, filters=filter)[0]
+
+    def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """
+        Hybrid search + rerank for several queries at once:
+        one BGE-M3 pass for all queries, ONE SQL statement (a LATERAL join over the
+        unnested query vectors), one cross-encoder call over every (query, candidate) pair.
+        `filters` applies to every query. Returns one result list per query, in input order.
+        """
+        if not queries:
+            return []
+
+        # 0. Embed Queries (cached queries skip the encoder)
+        query_vecs = embed_query_batch(queries)
+        dense_strs = [self._format_dense(v["dense"]) for v in query_vecs]
+        sparse_strs = [self._format_sparse(*sparse_to_lists(v["sparse"])) for v in query_vecs]
 
         # 1. Build Dynamic Filter Clause
-        where_sql, filter_args = self._build_filter_clause(filter)
+        where_sql, filter_args = self._build_filter_clause(filters)
 
-        # 2. Hybrid Search SQL
-        # We use a CTE 'filtered_docs' to narrow down candidates FIRST, then rank.
-        initial_limit = 15
-        
-        query_sql = sql.SQL("""
-        WITH filtered_docs AS (
-            SELECT id, dense_vector, sparse_vector, content, metadata
-            FROM {table}
-            WHERE {where_clause}
-        ),
-        dense_search AS (
-            SELECT id, RANK() OVER (ORDER BY dense_vector <=> %s::vector) as dense_rank
-            FROM filtered_docs
-            LIMIT %s
-        ),
-        sparse_search AS (
-            SELECT id, RANK() OVER (ORDER BY sparse_vector <#> %s::sparsevec) as sparse_rank
-            FROM filtered_docs
-            LIMIT %s
+        # 2. Hybrid Search SQL (one statement for the whole batch)
+        # Candidate limit = the largest budget of the batch; RerankPolicy trims each query to its own
+        initial_limit = self.rerank_policy.candidate_limit(queries)
+        query_sql = hybrid_search_sql(self.table_name, where_sql, prefetch_dims=self.prefetch_dims)
+        full_args = hybrid_search_args(
+            dense_strs, sparse_strs, filter_args, initial_limit,
+            prefetch_limit=self.prefetch_limit if self.prefetch_dims else None
         )
-        SELECT 
-            COALESCE(d.id, s.id) as id,
-            doc.content,
-            doc.metadata,
-            (1.0 / (60 + COALESCE(d.dense_rank, 0))) + (1.0 / (60 + COALESCE(s.sparse_rank, 0))) as rrf_score
-        FROM dense_search d
-        FULL OUTER JOIN sparse_search s ON d.id = s.id
-        JOIN filtered_docs doc ON doc.id = COALESCE(d.id, s.id)
-        ORDER BY rrf_score DESC
-        LIMIT %s;
-        """).format(
-            table=sql.Identifier(self.table_name),
-            where_clause=where_sql
-        )
-        
-        # Combine arguments: [Filter Args] + [Dense Vec, Limit] + [Sparse Vec, Limit] + [Final Limit]
-        full_args = filter_args + [query_dense, initial_limit, query_sparse_str, initial_limit, initial_limit]
-
-        candidates = []
-        with self.conn.cursor() as cur:
-            cur.execute(query_sql, full_args)
-            rows = cur.fetchall()
-            
-            for row in rows:
-                candidates.append(SearchResult(
-                    id=row[0],
-                    payload=row[2],
-                    score=row[3]
-                ))
 
-        if not candidates:
-            return []
+        candidate_lists = [[] for _ in queries]
+        for row in self._execute_prepared("hybrid", query_sql, full_args):
+            candidate_lists[row[0] - 1].append(SearchResult(
+                id=row[1],
+                payload=row[3],
+                score=row[4],
+                doc_id=row[5],
+                chunk_index=row[6]
+            ))
 
         # 3. Re-Ranking (Cross-Encoder)
-        pairs = []
-        for hit in candidates:
-            doc_text = hit.payload.get("search_content")
-            if not doc_text:
-                summary = hit.payload.get("context_summary", "")
-                raw_text = hit.payload.get("text", "")
-                doc_text = f"{summary}\n{raw_text}" if summary else raw_text
-            pairs.append([query_text, doc_text])
-
         start_rerank = time.time()
-        scores = self.reranker.predict(pairs)
+        results = self.rerank_policy.rerank(self.reranker, queries, candidate_lists, limit)
         print(f"📊 Re-ranking took {time.time() - start_rerank:.4f}s")
-        for i, hit in enumerate(candidates):
-            hit.score = float(scores[i])
-
-        candidates.sort(key=lambda x: x.score, reverse=True)
-        return candidates[:limit]
+        return results
 
 # --- TEST BLOCK ---
 if __name__ == "__main__":
@@ -221,12 +844,10 @@ if __name__ == "__main__":
         test_text_1 = "Python is great for backend."
         test_text_2 = "Javascript is great for frontend."
         
-        # Embed
-        dense_1 = embed_queries([test_text_1])[0]
-        sparse_1 = embed_sparse([test_text_1])[0]
-        
-        dense_2 = embed_queries([test_text_2])[0]
-        sparse_2 = embed_sparse([test_text_2])[0]
+        # Embed (single pass for both texts)
+        vecs = embed_hybrid([test_text_1, test_text_2])
+        dense_1, dense_2 = vecs["dense"]
+        sparse_1, sparse_2 = vecs["sparse"]
 
         # Upsert
         p1 = {
@@ -1,8 +1,197 @@
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from backend.core.config_loader import settings
-from sentence_transformers import CrossEncoder
-from backend.models.embedding_client import embed_queries, embed_sparse
+from backend.core.config_loader import CollectionProfile, settings
+from backend.indexing.filters import flatten_filters
+from backend.models.embedding_client import embed_hybrid, embed_query_batch, sparse_to_lists, truncate_dense
+from backend.models.reranker_service import get_rerank_scorer
+from backend.retrieval.rerank_policy import get_rerank_policy
+
+
+def collection_profile(name: str = None) -> CollectionProfile:
+    """Named CollectionProfile from config (default: retrieval.vector_store.profile)."""
+    if not settings:
+        return CollectionProfile()
+    name = name or settings.retrieval.vector_store_profile
+    profiles = settings.retrieval.vector_store_profiles
+    if name not in profiles:
+        if name == "default":
+            return CollectionProfile()
+        raise ValueError(f"❌ Unknown collection profile '{name}'. Available: {sorted(profiles)}")
+    return profiles[name]
+
+
+def quantization_config(profile: CollectionProfile):
+    if profile.quantization is None:
+        return None
+    if profile.quantization == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=profile.quantile, always_ram=profile.always_ram
+        ))
+    if profile.quantization == "product":
+        return models.ProductQuantization(product=models.ProductQuantizationConfig(
+            compression=models.CompressionRatio(profile.compression), always_ram=profile.always_ram
+        ))
+    if profile.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=profile.always_ram))
+    raise ValueError(f"❌ Unknown quantization '{profile.quantization}' (scalar | product | binary)")
+
+
+def prefetch_vector_name(dims: int) -> str:
+    """Named vector holding the truncated dense prefix (two-stage dense search)."""
+    return f"dense_{dims}"
+
+
+def collection_config(vector_size: int, profile: CollectionProfile = None, prefetch_dims: int = None) -> dict:
+    """
+    create_collection() kwargs for the hybrid (named dense + sparse) layout, in the given storage profile.
+    With `prefetch_dims` (default: retrieval.dense_prefetch.dims) a truncated dense vector is added.
+    """
+    profile = profile or collection_profile()
+    if prefetch_dims is None:
+        prefetch_dims = settings.retrieval.dense_prefetch_dims if settings else 0
+
+    vectors_config = {
+        "dense": models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=profile.on_disk,
+        )
+    }
+    if prefetch_dims:
+        # Small enough to always stay in RAM: it is what the HNSW graph is walked with
+        vectors_config[prefetch_vector_name(prefetch_dims)] = models.VectorParams(
+            size=prefetch_dims,
+            distance=models.Distance.COSINE,
+        )
+
+    return {
+        "vectors_config": vectors_config,
+        "sparse_vectors_config": {
+            "sparse": models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=True)
+            )
+        },
+        "hnsw_config": models.HnswConfigDiff(
+            m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct, on_disk=profile.hnsw_on_disk
+        ),
+        "quantization_config": quantization_config(profile),
+    }
+
+
+def search_params(profile: CollectionProfile = None):
+    """Dense-leg search params: rescore quantized candidates with the originals (None without quantization)."""
+    profile = profile or collection_profile()
+    if profile.quantization is None:
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=profile.rescore, oversampling=profile.oversampling
+    ))
+
+
+def resolve_collection(client, name: str):
+    """Physical collection behind `name` (an alias after a profile migration, a collection before), or None."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name if client.collection_exists(name) else None
+
+
+# Payload indexes every collection gets; more come from retrieval.vector_store.payload_indexes
+DEFAULT_PAYLOAD_INDEXES = {"source": "keyword", "chunk_index": "integer"}
+
+
+def payload_index_fields() -> dict:
+    """{field (dotted path for nested keys): PayloadSchemaType} to index."""
+    fields = dict(DEFAULT_PAYLOAD_INDEXES)
+    if settings:
+        fields.update(settings.retrieval.vector_store_payload_indexes)
+    return {field: models.PayloadSchemaType(schema) for field, schema in fields.items()}
+
+
+def qdrant_filter(filters: dict):
+    """
+    Filter DSL (backend.indexing.filters) -> models.Filter, or None when there is nothing to filter.
+    The payload is flat (chunk metadata at the top level): a resolved path is the dotted key.
+    """
+    must = []
+    for path, op, value in flatten_filters(filters):
+        key = ".".join(path)
+        if op == "in":
+            must.append(models.FieldCondition(key=key, match=models.MatchAny(any=value)))
+        elif op == "range":
+            must.append(models.FieldCondition(key=key, range=models.Range(**value)))
+        elif isinstance(value, float):
+            # MatchValue only takes keyword / integer / bool
+            must.append(models.FieldCondition(key=key, range=models.Range(gte=value, lte=value)))
+        else:
+            must.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    return models.Filter(must=must) if must else None
+
+
+def add_prefetch_vector(point, dims: int):
+    """Adds the truncated dense vector to a point (PointStruct or dict) that does not carry it yet."""
+    vector = point.vector if hasattr(point, "vector") else point.get("vector", {})
+    name = prefetch_vector_name(dims)
+    if name not in vector:
+        vector[name] = truncate_dense(vector["dense"], dims)
+    return point
+
+
+def dense_prefetch(query_vecs: dict, initial_limit: int, query_filter=None, dense_params=None,
+                   prefetch_dims: int = 0, prefetch_limit: int = 100) -> models.Prefetch:
+    """
+    Dense leg of the hybrid query. Single-stage: HNSW on the full vector.
+    Two-stage (prefetch_dims > 0): HNSW on the truncated vector for `prefetch_limit` candidates,
+    then exact rescoring of those candidates with the full vector.
+    """
+    if not prefetch_dims:
+        return models.Prefetch(
+            query=query_vecs["dense"],
+            using="dense",
+            filter=query_filter,
+            params=dense_params,
+            limit=initial_limit,
+        )
+    return models.Prefetch(
+        prefetch=models.Prefetch(
+            query=truncate_dense(query_vecs["dense"], prefetch_dims),
+            using=prefetch_vector_name(prefetch_dims),
+            filter=query_filter,
+            params=dense_params,
+            limit=prefetch_limit,
+        ),
+        query=query_vecs["dense"],
+        using="dense",
+        limit=initial_limit,
+    )
+
+
+def hybrid_request(query_vecs: dict, initial_limit: int, query_filter=None, dense_params=None,
+                   prefetch_dims: int = 0, prefetch_limit: int = 100) -> models.QueryRequest:
+    """
+    Dense + sparse prefetch fused with RRF, for one embedded query.
+    The filter is applied inside both prefetches, so each leg returns its top
+    `initial_limit` among matching points (filterable HNSW on the payload indexes).
+    `dense_params` are the profile's search_params() (quantization rescoring);
+    `prefetch_dims` / `prefetch_limit` switch the dense leg to two stages (see dense_prefetch()).
+    """
+    sp_indices, sp_values = sparse_to_lists(query_vecs["sparse"])
+    return models.QueryRequest(
+        prefetch=[
+            dense_prefetch(query_vecs, initial_limit, query_filter, dense_params, prefetch_dims, prefetch_limit),
+            models.Prefetch(
+                query=models.SparseVector(indices=sp_indices, values=sp_values),
+                using="sparse",
+                filter=query_filter,
+                limit=initial_limit,
+            ),
+        ],
+        query=models.FusionQuery(fusion=models.Fusion.RRF),
+        filter=query_filter,
+        limit=initial_limit,
+        with_payload=True,
+    )
+
 
 class QdrantVectorDB:
     def __init__(self):
@@ -22,79 +211,144 @@ class QdrantVectorDB:
         )
         self.collection_name = f"{settings.retrieval.vector_store_collection}_large"
         self.vector_size = 1024 
-        self.reranker = CrossEncoder('BAAI/bge-reranker-v2-m3', max_length=512, device="cuda")
+        self.reranker = get_rerank_scorer(max_length=512)
+        self.rerank_policy = get_rerank_policy()
+        self.dense_params = search_params()
+        self.prefetch_limit = settings.retrieval.dense_prefetch_limit
 
         self._ensure_collection_exists()
+        self._ensure_payload_indexes()
+        self.prefetch_dims = self._available_prefetch_dims()
 
     def _ensure_collection_exists(self):
-        if not self.client.collection_exists(self.collection_name):
+        if resolve_collection(self.client, self.collection_name) is None:
             print(f"📦 Collection '{self.collection_name}' not found. Creating...")
             self.client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config={
-                    "dense": models.VectorParams(
-                        size=self.vector_size,
-                        distance=models.Distance.COSINE
-                    )
-                },
-                sparse_vectors_config={
-                    "sparse": models.SparseVectorParams(
-                        index=models.SparseIndexParams(on_disk=True)
-                    )
-                }
+                **collection_config(self.vector_size)
             )
             print(f"✅ Collection '{self.collection_name}' created successfully.")
         else:
             print(f"✅ Connected to existing collection: '{self.collection_name}'")
 
+    def _available_prefetch_dims(self) -> int:
+        """Configured prefetch dims, or 0 if the collection was created without the truncated vector."""
+        dims = settings.retrieval.dense_prefetch_dims
+        if not dims:
+            return 0
+        physical = resolve_collection(self.client, self.collection_name)
+        if prefetch_vector_name(dims) not in self.client.get_collection(physical).config.params.vectors:
+            print(f"⚠️ '{self.collection_name}' has no '{prefetch_vector_name(dims)}' vector: two-stage dense search "
+                  f"disabled. Run: python -m backend.indexing.qdrant_collections migrate --profile <profile>")
+            return 0
+        return dims
+
+    def _ensure_payload_indexes(self):
+        """Payload indexes for window scrolls and filtered search (see payload_index_fields())."""
+        physical = resolve_collection(self.client, self.collection_name)
+        existing = self.client.get_collection(physical).payload_schema or {}
+        for field, schema in payload_index_fields().items():
+            if field not in existing:
+                self.client.create_payload_index(
+                    collection_name=physical,
+                    field_name=field,
+                    field_schema=schema,
+                )
+                print(f"🗂️ Created payload index on '{field}'")
+
+    def fetch_windows(self, windows: list) -> list:
+        """
+        Neighbour fetch for window retrieval. `windows` is [(source, lo, hi), ...] (inclusive chunk_index
+        bounds); returns one [(id, chunk_index, text, start_char), ...] list per window, in chunk order.
+        All windows are fetched with ONE scroll (OR of source + chunk_index range filters).
+        """
+        if not windows:
+            return []
+
+        window_filter = models.Filter(should=[
+            models.Filter(must=[
+                models.FieldCondition(key="source", match=models.MatchValue(value=doc_id)),
+                models.FieldCondition(key="chunk_index", range=models.Range(gte=lo, lte=hi)),
+            ])
+            for doc_id, lo, hi in windows
+        ])
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=window_filter,
+            limit=sum(hi - lo + 1 for _, lo, hi in windows),
+            with_payload=True,
+            with_vectors=False,
+        )
+        by_position = {(p.payload.get("source"), p.payload.get("chunk_index")): p for p in points}
+
+        results = []
+        for doc_id, lo, hi in windows:
+            rows = []
+            for index in range(lo, hi + 1):
+                point = by_position.get((doc_id, index))
+                if point is not None:
+                    rows.append((point.id, index, point.payload.get("text", ""), point.payload.get("start_char")))
+            results.append(rows)
+        return results
+
+    def ping(self) -> bool:
+        """Cheap liveness probe used by the service registry."""
+        return resolve_collection(self.client, self.collection_name) is not None
+
+    def close(self):
+        self.client.close()
+
     def upsert(self, points: list):
+        if self.prefetch_dims:
+            points = [add_prefetch_vector(p, self.prefetch_dims) for p in points]
         self.client.upsert(
             collection_name=self.collection_name,
             points=points
         )
 
-    def search(self, query_text: str, limit: int = 5):
-        # 0. GENERATE EMBEDDINGS
-        query_dense = embed_queries([query_text])[0]
-        sparse_output = embed_sparse([query_text])[0]
-        query_sparse_indices = list(int(k) for k in sparse_output.keys())
-        query_sparse_values = list(float(v) for v in sparse_output.values())
-
-        # 1. RETRIEVE CANDIDATES
-        initial_limit = 15 
-        candidates = self.client.query_points(
+    def delete_document(self, doc_id: str, from_index: int = 0):
+        """Deletes the chunks of `doc_id` with chunk_index >= from_index (0: the whole document)."""
+        must = [models.FieldCondition(key="source", match=models.MatchValue(value=doc_id))]
+        if from_index:
+            must.append(models.FieldCondition(key="chunk_index", range=models.Range(gte=from_index)))
+        self.client.delete(
             collection_name=self.collection_name,
-            prefetch=[
-                models.Prefetch(query=query_dense, using="dense", limit=initial_limit),
-                models.Prefetch(
-                    query=models.SparseVector(indices=query_sparse_indices, values=query_sparse_values),
-                    using="sparse",
-                    limit=initial_limit,
-                ),
-            ],
-            query=models.FusionQuery(fusion=models.Fusion.RRF),
-            limit=initial_limit,
-            with_payload=True
-        ).points
+            points_selector=models.FilterSelector(filter=models.Filter(must=must)),
+        )
+
+    def search(self, query_text: str, limit: int = 5, filter: dict = None):
+        return self.search_many([query_text], limit=limit, filters=filter)[0]
 
-        if not candidates:
+    def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """
+        Hybrid search + rerank for several queries at once:
+        one BGE-M3 pass for all queries, one query_batch_points round-trip,
+        one cross-encoder call over every (query, candidate) pair.
+        `filters` (backend.indexing.filters DSL) is applied server-side, in both prefetches.
+        Returns one result list per query, in input order.
+        """
+        if not queries:
             return []
+        query_filter = qdrant_filter(filters)
+
+        # 0. GENERATE EMBEDDINGS (cached queries skip the encoder)
+        query_vecs = embed_query_batch(queries)
+
+        # 1. RETRIEVE CANDIDATES (single batched request, per-query candidate budget)
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                hybrid_request(
+                    v, self.rerank_policy.budget(q), query_filter,
+                    self.dense_params, self.prefetch_dims, self.prefetch_limit
+                )
+                for q, v in zip(queries, query_vecs)
+            ],
+        )
+        candidate_lists = [r.points for r in responses]
 
-        # 2. RE-RANKING
-        pairs = []
-        for hit in candidates:
-            doc_text = hit.payload.get("search_content")
-            if not doc_text:
-                summary = hit.payload.get("context_summary", "")
-                raw_text = hit.payload.get("text", "")
-                doc_text = f"{summary}\n{raw_text}" if summary else raw_text
-            pairs.append([query_text, doc_text])
-
-        scores = self.reranker.predict(pairs)
-        for i, hit in enumerate(candidates):
-            hit.score = float(scores[i])
-        candidates.sort(key=lambda x: x.score, reverse=True)
-        return candidates[:limit]
+        # 2. RE-RANKING (budget, early exit, truncation: see RerankPolicy)
+        return self.rerank_policy.rerank(self.reranker, queries, candidate_lists, limit)
 
 if __name__ == "__main__":
     import uuid
@@ -105,8 +359,9 @@ if __name__ == "__main__":
         test_text = "Qdrant is a vector database."
         print(f"Generating embeddings for: '{test_text}'")
         
-        dense_vec = embed_queries([test_text])[0]
-        sparse_vec = embed_sparse([test_text])[0]
+        vecs = embed_hybrid([test_text])
+        dense_vec = vecs["dense"][0]
+        sparse_vec = vecs["sparse"][0]
         
         # Create a Qdrant PointStruct
         point_id = str(uuid.uuid4())
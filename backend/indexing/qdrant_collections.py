@@ -0,0 +1,245 @@
+# Qdrant collection profiles: status + zero-downtime migration (alias swap)
+"""
+The service always talks to `<collection>_large`. Once migrated, that name is an alias
+to a physical collection `<collection>_large__<profile>_<timestamp>`, so the next
+migration is an atomic alias swap:
+
+    python -m backend.indexing.qdrant_collections status
+    python -m backend.indexing.qdrant_collections migrate --profile int8 [--drop-old]
+
+A migration is also how the truncated dense vector (retrieval.dense_prefetch.dims) is
+added to, or resized in, an existing collection.
+
+Pause ingestion while a migration runs: points written to the old collection after
+they were copied are not carried over.
+"""
+import argparse
+import time
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from backend.core.config_loader import CollectionProfile, settings
+from backend.indexing.qdrant_client import (
+    add_prefetch_vector,
+    collection_config,
+    collection_profile,
+    payload_index_fields,
+    resolve_collection,
+)
+
+COPY_BATCH_SIZE = 256
+INDEXING_THRESHOLD = 20000  # Qdrant default (KB), restored once the bulk copy is done
+GREEN_TIMEOUT_SECONDS = 3600.0  # Index build of the new collection; the live one is untouched until it is green
+ALIAS_RETRIES = 5
+
+
+def estimate_dense_ram(profile: CollectionProfile, points: int, dim: int = 1024) -> int:
+    """Rough resident bytes for the dense vectors + HNSW graph of `points` vectors in `profile`."""
+    originals = 0 if profile.on_disk else points * dim * 4
+    quantized = 0
+    if profile.quantization and profile.always_ram:
+        bytes_per_vector = {
+            "scalar": dim,
+            "binary": dim / 8,
+            "product": dim * 4 / int(profile.compression.lstrip("x")),
+        }[profile.quantization]
+        quantized = points * bytes_per_vector
+    graph = 0 if profile.hnsw_on_disk else points * (profile.hnsw_m or 16) * 2 * 4
+    return int(originals + quantized + graph)
+
+
+def get_admin_client() -> QdrantClient:
+    return QdrantClient(
+        host=settings.retrieval.vector_store_host,
+        port=settings.retrieval.vector_store_port,
+        api_key=settings.retrieval.vector_store_api_key,
+        https=False,
+        timeout=300,
+    )
+
+
+def _wait_until_green(client: QdrantClient, collection: str, timeout_seconds: float = GREEN_TIMEOUT_SECONDS,
+                      poll_seconds: float = 2.0):
+    """Blocks until `collection` is GREEN. Raises if it turns RED (optimizer error) or on timeout."""
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        status = client.get_collection(collection).status
+        if status == models.CollectionStatus.GREEN:
+            return
+        if status == models.CollectionStatus.RED:
+            raise RuntimeError(f"❌ '{collection}' is RED (optimization failed): check the Qdrant logs.")
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"❌ '{collection}' still {status} after {timeout_seconds:.0f}s.")
+        time.sleep(poll_seconds)
+
+
+def _point_alias(client: QdrantClient, name: str, target: str, retries: int = ALIAS_RETRIES):
+    """Creates alias `name` -> `target`, retrying transient failures (the name must be free)."""
+    for attempt in range(retries + 1):
+        try:
+            client.update_collection_aliases(change_aliases_operations=[
+                models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=name)),
+            ])
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise RuntimeError(f"❌ Could not create alias '{name}' -> '{target}' ({e}). "
+                                   f"The data is in '{target}': create the alias manually.") from e
+            time.sleep(0.2 * 2 ** attempt)
+
+
+def copy_points(client: QdrantClient, source: str, target: str, batch_size: int = COPY_BATCH_SIZE) -> int:
+    """
+    Scrolls every point (payload + vectors) of `source` into `target`. Vectors the target
+    layout does not have are dropped; the truncated prefetch vector is derived if missing.
+    """
+    params = client.get_collection(target).config.params
+    keep = set(params.vectors) | set(params.sparse_vectors or {})
+    prefetch_dims = settings.retrieval.dense_prefetch_dims
+
+    def _point(record):
+        vector = {name: v for name, v in record.vector.items() if name in keep}
+        point = models.PointStruct(id=record.id, vector=vector, payload=record.payload)
+        return add_prefetch_vector(point, prefetch_dims) if prefetch_dims else point
+
+    copied, offset = 0, None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            client.upsert(
+                collection_name=target,
+                points=[_point(r) for r in records],
+                wait=True,
+            )
+            copied += len(records)
+            print(f"   📤 Copied {copied} points...", end="\r")
+        if offset is None:
+            break
+    print()
+    return copied
+
+
+def migrate(profile_name: str, drop_old: bool = False, batch_size: int = COPY_BATCH_SIZE,
+            green_timeout: float = GREEN_TIMEOUT_SECONDS) -> str:
+    """
+    Rebuilds the live collection into `profile_name` and points the service name at it.
+    Returns the new physical collection name. Nothing live is touched before the new
+    collection is GREEN and holds every point.
+    """
+    client = get_admin_client()
+    name = f"{settings.retrieval.vector_store_collection}_large"
+    profile = collection_profile(profile_name)
+
+    source = resolve_collection(client, name)
+    if source is None:
+        raise ValueError(f"❌ Nothing to migrate: '{name}' does not exist.")
+    is_alias = source != name
+    target = f"{name}__{profile_name}_{int(time.time())}"
+    vector_size = client.get_collection(source).config.params.vectors["dense"].size
+
+    # 1. New collection in the target profile; HNSW build deferred until the copy is done
+    print(f"📦 Creating '{target}' (profile '{profile_name}')...")
+    client.create_collection(
+        collection_name=target,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+        **collection_config(vector_size, profile),
+    )
+    for field, schema in payload_index_fields().items():
+        client.create_payload_index(collection_name=target, field_name=field, field_schema=schema)
+
+    # 2. Bulk copy, then build the index and quantize
+    start = time.time()
+    copied = copy_points(client, source, target, batch_size)
+    client.update_collection(
+        collection_name=target,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD),
+    )
+    print("⏳ Building HNSW + quantized vectors...")
+    _wait_until_green(client, target, timeout_seconds=green_timeout)
+
+    expected = client.count(collection_name=source, exact=True).count
+    actual = client.count(collection_name=target, exact=True).count
+    if actual != expected:
+        raise RuntimeError(f"❌ Copy incomplete ({actual}/{expected} points). '{name}' left untouched; drop '{target}' manually.")
+    print(f"✅ Copied {copied} points in {time.time() - start:.1f}s")
+
+    # 3. Swap
+    if is_alias:
+        # Atomic: readers see the old or the new collection, never neither
+        client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=name)),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=name)),
+        ])
+        if drop_old:
+            client.delete_collection(source)
+            print(f"🗑️ Dropped '{source}'")
+    else:
+        # First migration of a plain collection. Qdrant rejects an alias named like an existing
+        # collection, so the order is forced: the alias first under a staging name (proves the
+        # target can be aliased before anything is dropped), then drop + re-point back to back.
+        staging = f"{name}__next"
+        _point_alias(client, staging, target)
+        print(f"⚠️ '{name}' is a plain collection: it is replaced by an alias (sub-second gap, one time only).")
+        client.delete_collection(name)
+        _point_alias(client, name, target)
+        client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=staging)),
+        ])
+
+    print(f"🔀 '{name}' -> '{target}'")
+    print(f"💾 Estimated dense RAM: {estimate_dense_ram(profile, actual, vector_size) / 1024**2:.0f} MB "
+          f"(float32 in RAM: {estimate_dense_ram(CollectionProfile(), actual, vector_size) / 1024**2:.0f} MB)")
+    print(f"ℹ️ Set retrieval.vector_store.profile: {profile_name} so rescoring params match the collection.")
+    return target
+
+
+def status():
+    client = get_admin_client()
+    name = f"{settings.retrieval.vector_store_collection}_large"
+    physical = resolve_collection(client, name)
+    if physical is None:
+        print(f"⚠️ '{name}' does not exist.")
+        return
+
+    info = client.get_collection(physical)
+    dense = info.config.params.vectors["dense"]
+    points = info.points_count or 0
+    print(f"📦 '{name}' -> '{physical}'{' (alias)' if physical != name else ''}")
+    print(f"   Points: {points} | Status: {info.status} | Dense on_disk: {dense.on_disk}")
+    print(f"   HNSW: m={info.config.hnsw_config.m} ef_construct={info.config.hnsw_config.ef_construct}")
+    print(f"   Quantization: {info.config.quantization_config or 'none'}")
+    print(f"   Configured profile: '{settings.retrieval.vector_store_profile}'")
+    for profile_name, profile in sorted(settings.retrieval.vector_store_profiles.items()):
+        print(f"   {profile_name:<10} ~{estimate_dense_ram(profile, points, dense.size) / 1024**2:>8.0f} MB dense RAM")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and migrate the Qdrant collection storage profile.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show the live collection, its layout and per-profile RAM estimates")
+    mig = sub.add_parser("migrate", help="Rebuild the collection into another profile and swap the alias")
+    mig.add_argument("--profile", required=True, help="Profile name from retrieval.vector_store.profiles")
+    mig.add_argument("--drop-old", action="store_true", help="Delete the previous physical collection after the swap")
+    mig.add_argument("--batch-size", type=int, default=COPY_BATCH_SIZE, help="Points per scroll/upsert batch")
+    mig.add_argument("--green-timeout", type=float, default=GREEN_TIMEOUT_SECONDS,
+                     help="Seconds to wait for the new collection's index build before giving up")
+    args = parser.parse_args()
+
+    if settings is None:
+        print("❌ Settings not loaded. Check config_loader.py")
+        return
+
+    if args.command == "status":
+        status()
+    elif args.command == "migrate":
+        migrate(args.profile, drop_old=args.drop_old, batch_size=args.batch_size, green_timeout=args.green_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import uuid
 import time
 from typing import List, Dict, Any
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 from backend.models.embedding_client import embed_sparse
 from qdrant_client.http import models
 
@@ -12,8 +12,8 @@ class SparseIndexer:
         Initializes the Sparse Indexer.
         The Model is now handled by the shared embedding_client.
         """
-        self.db_client = VectorDBClient()
-        self.collection_name = self.db_client.collection_name
+        self.db_client = get_vector_db()
+        self.collection_name = self.db_client.client.collection_name
 
     def index_chunks(self, chunks: List[Dict[str, Any]]):
         if not chunks:
@@ -59,10 +59,11 @@ class SparseIndexer:
         print(f"📤 Updating {len(points_updates)} points with sparse data...")
         
         # We use the client directly to call update_vectors
-        self.db_client.client.update_vectors(
+        self.db_client.client.client.update_vectors(
             collection_name=self.collection_name,
             points=points_updates
         )
+        self.db_client.invalidate_cache()
         
         print(f"✅ Sparse Indexing Complete in {time.time() - start_time:.2f}s")
 
@@ -1,14 +1,34 @@
 import os
+import json
+from backend.core.config_loader import settings
+from backend.core.utils import TTLCache, normalize_query
 from backend.indexing.qdrant_client import QdrantVectorDB
 from backend.indexing.postgres_client import PostgresVectorDB
 
+def build_result_cache():
+    """Reranked-hit cache from the search_cache config (None when disabled)."""
+    if settings is None or settings.retrieval.search_cache_enabled:
+        return TTLCache(
+            max_entries=settings.retrieval.search_cache_max_entries if settings else 1024,
+            ttl_seconds=settings.retrieval.search_cache_ttl_seconds if settings else 600,
+        )
+    return None
+
+
+def result_key(query_text: str, limit: int, filter: dict, collection_version: int) -> tuple:
+    filter_key = json.dumps(filter, sort_keys=True, default=str) if filter else None
+    return (normalize_query(query_text), limit, filter_key, collection_version)
+
+
 class VectorDBClient:
-    def __init__(self):
+    def __init__(self, provider: str = None):
         """
         Factory Class: Initializes either Qdrant or Postgres based on configuration.
+        Prefer backend.app.dependencies.get_vector_db() over constructing this directly,
+        so the DB handles and the reranker are shared across the whole process.
         """
-        # Check environment variable or settings for provider
-        self.provider = os.getenv("VECTOR_DB_PROVIDER", "qdrant").lower()
+        # Explicit provider wins, then environment variable, then default
+        self.provider = (provider or os.getenv("VECTOR_DB_PROVIDER", "qdrant")).lower()
         print(f"🚀 Initializing Vector DB Provider: {self.provider.upper()}")
         
         if self.provider == "postgres":
@@ -16,11 +36,83 @@ class VectorDBClient:
         else:
             self.client = QdrantVectorDB()
 
+        # Final reranked hits, keyed by (query, limit, filter, collection_version).
+        # Query embeddings are cached one level down (embedding_client.embed_query).
+        self.collection_version = 0
+        self.result_cache = build_result_cache()
+
+    def _result_key(self, query_text: str, limit: int, filter: dict = None) -> tuple:
+        return result_key(query_text, limit, filter, self.collection_version)
+
+    def invalidate_cache(self):
+        """
+        Bumps the collection version so every cached result becomes unreachable.
+        Called on every write; entries written by other processes are bounded by the TTL.
+        """
+        self.collection_version += 1
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
     def upsert(self, points: list):
-        return self.client.upsert(points)
+        result = self.client.upsert(points)
+        self.invalidate_cache()
+        return result
+
+    def delete_document(self, doc_id: str, from_index: int = 0):
+        """Removes a document's chunks from `from_index` on (stale tail of a re-chunked file, or all of it)."""
+        result = self.client.delete_document(doc_id, from_index)
+        self.invalidate_cache()
+        return result
+
+    def search(self, query_text: str, limit: int = 5, filter: dict = None):
+        """
+        Hybrid search + rerank. Repeated queries skip the encoders, the DB round-trip
+        and the cross-encoder entirely.
+        `filter` uses the backend-neutral DSL of backend.indexing.filters and is applied
+        inside the database, before the candidate limit.
+        """
+        if self.result_cache is None:
+            return self.client.search(query_text, limit, filter=filter)
+
+        key = self._result_key(query_text, limit, filter)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        results = self.client.search(query_text, limit, filter=filter)
+        self.result_cache.set(key, list(results))
+        return results
+
+    def search_many(self, queries: list, limit: int = 5, filters: dict = None):
+        """
+        Batched search(): cached queries are answered from the result cache,
+        the misses go to the backend in a single batched call.
+        Returns one result list per query, in input order.
+        """
+        if self.result_cache is None:
+            return self.client.search_many(queries, limit=limit, filters=filters)
+
+        keys = [self._result_key(q, limit, filters) for q in queries]
+        results = [self.result_cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+
+        if missing:
+            fresh = self.client.search_many([queries[i] for i in missing], limit=limit, filters=filters)
+            for i, hits in zip(missing, fresh):
+                self.result_cache.set(keys[i], list(hits))
+                results[i] = hits
+
+        return [list(r) for r in results]
+
+    def fetch_windows(self, windows: list) -> list:
+        """[(doc_id, lo, hi), ...] -> one [(id, chunk_index, text, start_char), ...] list per window."""
+        return self.client.fetch_windows(windows)
+
+    def ping(self) -> bool:
+        return self.client.ping()
 
-    def search(self, query_text: str, limit: int = 5):
-        return self.client.search(query_text, limit)
+    def close(self):
+        return self.client.close()
 
 if __name__ == "__main__":
     print("--- TEST: VectorDBClient Factory ---")
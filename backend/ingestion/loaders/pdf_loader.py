@@ -1,12 +1,41 @@
 # PyMuPDF / Unstructured loader
 import fitz  # PyMuPDF
-from typing import List, Dict, Any
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 from pathlib import Path
 import logging
 
 # Configure logger locally
 logger = logging.getLogger(__name__)
 
+PAGE_SEPARATOR = "\n"  # Between pages in the document text (load_file and the page offsets agree on it)
+
+
+def page_ranges(n_pages: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """[start, end) page ranges of at most `pages_per_task` pages covering a document."""
+    step = max(1, pages_per_task)
+    return [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)] or [(0, 0)]
+
+
+def extract_pages(file_path: str, start_page: int = 0, end_page: int = None) -> List[str]:
+    """Text of pages [start_page, end_page) of one PDF (module-level: runs in worker processes)."""
+    with fitz.open(file_path) as doc:
+        end_page = len(doc) if end_page is None else min(end_page, len(doc))
+        return [doc[i].get_text() for i in range(start_page, end_page)]
+
+
+def assemble_document(path: Path, page_texts: List[str]) -> Dict[str, Any]:
+    """{"source", "text", "pages": [{"page", "start_char", "end_char"}]} from the ordered page texts."""
+    pages, offset = [], 0
+    for i, text in enumerate(page_texts):
+        pages.append({"page": i + 1, "start_char": offset, "end_char": offset + len(text)})
+        offset += len(text) + len(PAGE_SEPARATOR)
+    return {"source": path.name, "text": PAGE_SEPARATOR.join(page_texts), "pages": pages}
+
+
 class PDFLoader:
     def __init__(self):
         """
@@ -14,38 +43,129 @@ class PDFLoader:
         """
         pass
 
-    def load_file(self, file_path: str) -> str:
+    def iter_pages(self, file_path: str) -> Iterator[Dict[str, Any]]:
         """
-        Extracts full text from a PDF file.
-        Returns: A single string containing the entire document text.
+        Streams a PDF page by page: {"page" (1-based), "text", "start_char", "end_char"}.
+        Offsets index into the load_file() text, so chunks can be mapped back to their page.
+        Only one page is held in memory at a time.
         """
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"❌ PDF not found at: {path}")
 
-        try:
-            doc = fitz.open(path)
-            full_text = []
-            
-            # Iterate over pages
+        offset = 0
+        with fitz.open(path) as doc:
             for page_num, page in enumerate(doc):
                 text = page.get_text()
-                # Optional: Add page markers for better context later
-                # text = f"--- Page {page_num + 1} ---\n{text}" 
-                full_text.append(text)
-                
-            logger.info(f"✅ Loaded PDF '{path.name}' with {len(doc)} pages.")
-            return "\n".join(full_text)
+                yield {"page": page_num + 1, "text": text, "start_char": offset, "end_char": offset + len(text)}
+                offset += len(text) + len(PAGE_SEPARATOR)
 
+    def load_document(self, file_path: str) -> Dict[str, Any]:
+        """Whole document text plus its page offsets (see assemble_document)."""
+        path = Path(file_path)
+        try:
+            page_texts = [p["text"] for p in self.iter_pages(file_path)]
+            logger.info(f"✅ Loaded PDF '{path.name}' with {len(page_texts)} pages.")
+            return assemble_document(path, page_texts)
         except Exception as e:
             logger.error(f"⚠️ Failed to load PDF {path.name}: {e}")
             raise e
 
+    def load_file(self, file_path: str) -> str:
+        """
+        Extracts full text from a PDF file.
+        Returns: A single string containing the entire document text.
+        """
+        return self.load_document(file_path)["text"]
+
+    def iter_documents(self, files: Iterable[Path]) -> Iterator[Tuple[Path, Dict[str, Any], Exception]]:
+        """(path, document, None) or (path, None, error) per file, in order, one file at a time."""
+        for path in files:
+            try:
+                yield path, self.load_document(str(path)), None
+            except Exception as e:
+                yield path, None, e
+
+
+class ParallelPDFLoader(PDFLoader):
+    def __init__(self, max_workers: int = None, pages_per_task: int = 32, max_pending: int = None):
+        """
+        Extracts PDFs on a pool of worker processes (PyMuPDF holds the GIL, threads would not help).
+
+        Args:
+            max_workers: processes (default: all cores).
+            pages_per_task: large PDFs are split into page ranges of this size, so one big
+                file is spread over several cores instead of pinning one.
+            max_pending: page ranges submitted but not yet consumed (default 2 x workers).
+                Bounds memory: extraction runs at most this far ahead of the consumer.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_pending = max_pending or 2 * self.max_workers
+
+    def _tasks(self, files: Iterable[Path]) -> Iterator[Tuple[Path, int, int, int, Exception]]:
+        """(path, start_page, end_page, n_ranges, None) per page range, or (path, 0, 0, 0, error) for an unreadable PDF."""
+        for path in files:
+            path = Path(path)
+            try:
+                with fitz.open(path) as doc:
+                    n_pages = len(doc)
+            except Exception as e:
+                logger.error(f"⚠️ Failed to open PDF {path.name}: {e}")
+                yield path, 0, 0, 0, e
+                continue
+            ranges = page_ranges(n_pages, self.pages_per_task)
+            for start, end in ranges:
+                yield path, start, end, len(ranges), None
+
+    def iter_documents(self, files: Iterable[Path]) -> Iterator[Tuple[Path, Dict[str, Any], Exception]]:
+        """
+        Same contract as PDFLoader.iter_documents (input order), extracted in parallel.
+        Page ranges are submitted lazily, so at most `max_pending` are in flight or buffered.
+        """
+        # spawn: the ingestion process already runs threads (and CUDA), which fork does not survive
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as pool:
+            tasks = self._tasks(files)
+            pending = deque()  # (path, n_ranges, future or open error) in submission order
+            current, texts, error = None, [], None
+
+            def _submit() -> bool:
+                task = next(tasks, None)
+                if task is None:
+                    return False
+                path, start, end, n_ranges, error = task
+                pending.append((path, n_ranges, error or pool.submit(extract_pages, str(path), start, end)))
+                return True
+
+            while len(pending) < self.max_pending and _submit():
+                pass
+
+            while pending:
+                path, n_ranges, future = pending.popleft()
+                _submit()
+                if isinstance(future, Exception):
+                    yield path, None, future
+                    continue
+                if current != path:
+                    current, texts, error, done = path, [], None, 0
+                try:
+                    texts.extend(future.result())
+                except Exception as e:
+                    error = error or e
+                done += 1
+                if done == n_ranges:
+                    if error is not None:
+                        yield path, None, error
+                    else:
+                        yield path, assemble_document(path, texts), None
+                    current, texts = None, []
+
 # Simple Test
 if __name__ == "__main__":
     # Create a dummy PDF for testing if one doesn't exist
     # (Or point this to a real PDF path on your machine)
     loader = PDFLoader()
     print("⚠️ Please point the test to a real PDF file path in the code below.")
-    text = loader.load_file("data/pdfs/LIASI - Règlement d'application - 19-06-2007 - 31-12-2024.pdf")
-    print(text[:500])
\ No newline at end of file
+    text = loader.load_file("data/pdfs/LIASI - Règlement d'application - 19-06-2007 - 31-12-2024.pdf")
+    print(text[:500])
@@ -1,7 +1,58 @@
 # Sliding window chunker
-from typing import List, Dict, Any
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from backend.core.config_loader import settings
+
+DEFAULT_TOKENIZER = "BAAI/bge-m3"  # The hybrid encoder: chunk sizes are measured in its tokens
+
+# Cut points, strongest first: paragraph break (2), line break / sentence end (1)
+_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|\n\s*|(?<=[.!?;:])\s+")
+
+
+def page_lookup(pages: List[Dict[str, Any]] = None):
+    """offset -> 1-based page holding it, from the loader's page offsets (always None without pages)."""
+    if not pages:
+        return lambda offset: None
+    starts = [p["start_char"] for p in pages]
+    return lambda offset: pages[max(bisect_right(starts, offset) - 1, 0)]["page"]
+
+
+def split_pieces(text: str) -> List[Tuple[int, int, int]]:
+    """
+    (start, end, strength) spans covering `text`, cut right after every separator.
+    `strength` is the strength of the boundary at `end` (2 paragraph, 1 line / sentence).
+    One regex pass: linear in the document length.
+    """
+    pieces, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end()
+        if end > start:
+            pieces.append((start, end, 2 if match.group().count("\n") >= 2 else 1))
+            start = end
+    if start < len(text):
+        pieces.append((start, len(text), 2))
+    return pieces
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Shrinks [start, end) to exclude surrounding whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+@lru_cache(maxsize=2)
+def get_tokenizer(name: str = DEFAULT_TOKENIZER):
+    """Fast (Rust) HF tokenizer; imported lazily, transformers is only needed for token chunking."""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name, use_fast=True)
+
 class Chunker:
     def __init__(self, chunk_size: int = 512, chunk_overlap: int = 100):
         """
@@ -11,6 +62,8 @@ class Chunker:
             chunk_size: The target size of each chunk (in characters/tokens approx).
             chunk_overlap: How much context to keep from the previous chunk.
         """
+        # Recorded in the ingestion manifest: changing the chunking re-ingests every document
+        self.config_id = f"recursive-chars:{chunk_size}/{chunk_overlap}"
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -20,12 +73,16 @@ class Chunker:
             # 2. Single newlines (Lines)
             # 3. Periods (Sentences)
             # 4. Spaces (Words)
-            separators=["\n\n", "\n", ". ", " ", ""]
+            separators=["\n\n", "\n", ". ", " ", ""],
+            # Character offset of every chunk in the source text: lets the context builder
+            # stitch neighbouring chunks by offset instead of searching for the overlap
+            add_start_index=True
         )
 
-    def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def chunk_text(self, text: str, metadata: Dict[str, Any] = None, pages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Splits the text into chunks and attaches metadata to each.
+        `pages` are the loader's page offsets (PDFLoader.load_document), for the chunk's page number.
         
         Returns:
             List of dicts: [{"text": "...", "metadata": {...}}, ...]
@@ -33,23 +90,167 @@ class Chunker:
         if not text:
             return []
 
-        # Generate simple string chunks
-        raw_chunks = self.splitter.split_text(text)
+        # Generate string chunks (with their start offsets)
+        raw_chunks = self.splitter.create_documents([text])
         
         structured_chunks = []
-        for i, chunk_text in enumerate(raw_chunks):
+        page_of = page_lookup(pages)
+        for i, doc in enumerate(raw_chunks):
             chunk_data = {
-                "text": chunk_text,
+                "text": doc.page_content,
                 "metadata": (metadata or {}).copy()
             }
             # Add chunk-specific metadata
             chunk_data["metadata"]["chunk_index"] = i
             chunk_data["metadata"]["total_chunks"] = len(raw_chunks)
+            chunk_data["metadata"]["start_char"] = doc.metadata.get("start_index")
+            if chunk_data["metadata"]["start_char"] is not None:
+                chunk_data["metadata"]["end_char"] = chunk_data["metadata"]["start_char"] + len(doc.page_content)
+            chunk_data["metadata"]["page"] = page_of(chunk_data["metadata"]["start_char"] or 0)
             
             structured_chunks.append(chunk_data)
             
         return structured_chunks
 
+
+class TokenChunker:
+    def __init__(self, chunk_size: int = 256, chunk_overlap: int = 48, tokenizer: str = DEFAULT_TOKENIZER, batch_size: int = 1024):
+        """
+        Token-sized chunker: sizes are embedding-model tokens, not characters.
+
+        The document is cut once at every separator (split_pieces), all pieces are tokenized in
+        batches by the fast tokenizer, then packed greedily into chunks of <= chunk_size tokens,
+        ending on a paragraph break when that keeps at least half a chunk. Each piece is packed
+        at most a bounded number of times (overlap), so a whole document splits in linear time.
+        A piece longer than a chunk (no separator in sight) is cut at token boundaries.
+
+        Every chunk is an exact slice: chunk["text"] == text[start_char:end_char].
+
+        Args:
+            chunk_size: max tokens per chunk (piece counts are summed, so +- a token at joins).
+            chunk_overlap: tokens of trailing pieces repeated at the start of the next chunk.
+            tokenizer: HF tokenizer name (the embedder's).
+            batch_size: pieces per tokenizer call.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer_name = tokenizer
+        self.batch_size = batch_size
+        # Recorded in the ingestion manifest: changing the chunking re-ingests every document
+        self.config_id = f"tokens:{tokenizer}:{chunk_size}/{chunk_overlap}"
+
+    @property
+    def tokenizer(self):
+        return get_tokenizer(self.tokenizer_name)
+
+    def _count(self, text: str, pieces: List[Tuple[int, int, int]]) -> List[int]:
+        counts = []
+        for i in range(0, len(pieces), self.batch_size):
+            batch = [text[start:end] for start, end, _ in pieces[i:i + self.batch_size]]
+            counts.extend(len(ids) for ids in self.tokenizer(batch, add_special_tokens=False)["input_ids"])
+        return counts
+
+    def _split_long(self, text: str, start: int, end: int, strength: int) -> List[Tuple[int, int, int, int]]:
+        """An oversized piece as (start, end, strength, tokens) windows of chunk_size tokens."""
+        offsets = self.tokenizer(text[start:end], add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        windows = []
+        for i in range(0, len(offsets), self.chunk_size):
+            window = offsets[i:i + self.chunk_size]
+            lo = start + (window[0][0] if i else 0)
+            hi = end if i + self.chunk_size >= len(offsets) else start + offsets[i + self.chunk_size][0]
+            windows.append((lo, hi, strength if hi == end else 0, len(window)))
+        return windows
+
+    def pieces(self, text: str) -> List[Tuple[int, int, int, int]]:
+        """(start, end, strength, tokens) units no longer than a chunk."""
+        pieces = split_pieces(text)
+        units = []
+        for (start, end, strength), count in zip(pieces, self._count(text, pieces)):
+            if count > self.chunk_size:
+                units.extend(self._split_long(text, start, end, strength))
+            else:
+                units.append((start, end, strength, count))
+        return units
+
+    def spans(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start_char, end_char, tokens) of every chunk, in order."""
+        units = self.pieces(text)
+        cum = [0]
+        for unit in units:
+            cum.append(cum[-1] + unit[3])
+
+        spans, i, n = [], 0, len(units)
+        while i < n:
+            # Greedy: as many pieces as fit (always at least one)
+            j = i + 1
+            while j < n and cum[j + 1] - cum[i] <= self.chunk_size:
+                j += 1
+            # Prefer ending on a paragraph break if that still fills half a chunk
+            if j < n and units[j - 1][2] < 2:
+                k = j - 1
+                while k > i and units[k - 1][2] < 2:
+                    k -= 1
+                if k > i and cum[k] - cum[i] >= self.chunk_size // 2:
+                    j = k
+
+            start, end = _trim(text, units[i][0], units[j - 1][1])
+            if end > start:
+                spans.append((start, end, cum[j] - cum[i]))
+            if j >= n:
+                break
+            # Overlap: step back over trailing pieces worth <= chunk_overlap tokens, but always move forward
+            next_i = j
+            while next_i - 1 > i and cum[j] - cum[next_i - 1] <= self.chunk_overlap:
+                next_i -= 1
+            i = next_i
+        return spans
+
+    def chunk_text(self, text: str, metadata: Dict[str, Any] = None, pages: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Same output as Chunker.chunk_text, plus end_char, page (of start_char) and token_count.
+        `pages` are the loader's page offsets (PDFLoader.load_document).
+        """
+        if not text:
+            return []
+
+        spans = self.spans(text)
+        page_of = page_lookup(pages)
+        chunks = []
+        for i, (start, end, tokens) in enumerate(spans):
+            chunk_metadata = (metadata or {}).copy()
+            chunk_metadata.update({
+                "chunk_index": i,
+                "total_chunks": len(spans),
+                "start_char": start,
+                "end_char": end,
+                "page": page_of(start),
+                "token_count": tokens,
+            })
+            chunks.append({"text": text[start:end], "metadata": chunk_metadata})
+        return chunks
+
+
+def build_chunker(chunk_size: int = None, chunk_overlap: int = None):
+    """
+    The chunker selected by data_pipeline.chunking.unit: TokenChunker ("tokens", sizes from
+    token_chunk_size / token_chunk_overlap) or the character Chunker ("chars").
+    Explicit sizes override the configured ones.
+    """
+    cfg = settings.ingestion if settings else None
+    if cfg is None or cfg.chunk_unit == "tokens":
+        return TokenChunker(
+            chunk_size=chunk_size or (cfg.token_chunk_size if cfg else 256),
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else (cfg.token_chunk_overlap if cfg else 48),
+            tokenizer=cfg.chunk_tokenizer if cfg else DEFAULT_TOKENIZER,
+        )
+    return Chunker(
+        chunk_size=chunk_size or cfg.chunk_size,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else cfg.chunk_overlap,
+    )
+
+
 # Test Block
 if __name__ == "__main__":
     # Dummy text to test the split
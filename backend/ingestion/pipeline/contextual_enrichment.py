@@ -1,11 +1,16 @@
 # PHASE 1.5: Teacher LLM summarizer for chunks
 import os, re
-# from typing import List, Dict, Any
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
-from langchain_core.output_parsers import StrOutputParser
 from langchain_ollama import ChatOllama
 
+from backend.core.config_loader import settings
+from backend.ingestion.pipeline.enrichment_cache import get_enrichment_cache
+
 # Define the Teacher Model (Groq)
 # We use a cheaper/faster model for this bulk task to save costs/time
 # TEACHER_MODEL_ID = "llama-3.3-70b-versatile"
@@ -13,14 +18,89 @@ from langchain_ollama import ChatOllama
 
 # REMOTE_OLLAMA_URL = "http://18.132.143.112:14528"
 # CONTEXT_MODEL = "qwen3:8b"  # Updated to match your local model
-CONTEXT_MODEL = "qwen3:4b"  # Local Ollama model for context enrichment
+CONTEXT_MODEL = "qwen3:4b"  # Local Ollama model for context enrichment (default for data_pipeline.contextual_retrieval.model_name)
+
+# Bump whenever the prompt below changes: cached contexts of older prompts stop matching
+PROMPT_VERSION = "v1"
+SUMMARY_PROMPT_VERSION = "summary-v1"  # Same, for the section summaries of the "summary" mode
+MAX_DOCUMENT_CHARS = 5000
+
+# What the LLM sees as the "document" next to each chunk:
+#   window  - the chunk's neighbour window: every prompt starts differently, Ollama re-reads it all
+#   prefix  - the chunk's whole section: consecutive prompts share the same prefix, Ollama's KV cache
+#             (kept loaded by keep_alive, same num_ctx) only has to process the chunk and the answer
+#   summary - one summary call per section, then short per-chunk prompts over that summary
+ENRICHMENT_MODES = ("window", "prefix", "summary")
+
+_DONE = object()
+
+
+class EnrichmentError(Exception):
+    """The LLM could not produce a context for a chunk (after the retries)."""
+
+
+def configured_model() -> str:
+    return settings.ingestion.enrichment_model if settings else CONTEXT_MODEL
+
+
+def neighbor_window(chunks: list, i: int, window_size: int = 3) -> str:
+    """Text of chunk i and its `window_size` neighbours on each side: the "document" the LLM sees."""
+    start_i = max(0, i - window_size)
+    end_i = min(len(chunks), i + window_size + 1)
+    return "\n---\n".join(c["text"] for c in chunks[start_i:end_i])
+
+
+def document_sections(chunks: list, section_chars: int = 4000) -> List[Tuple[int, int]]:
+    """Splits a document's chunks into consecutive [start, end) ranges whose joined text fits in `section_chars`."""
+    spans, start, size = [], 0, 0
+    for i, chunk in enumerate(chunks):
+        length = len(chunk["text"]) + 5  # + the "\n---\n" separator
+        if i > start and size + length > section_chars:
+            spans.append((start, i))
+            start, size = i, 0
+        size += length
+    if start < len(chunks):
+        spans.append((start, len(chunks)))
+    return spans
+
+
+def _is_transient(error: Exception) -> bool:
+    """Timeouts and dropped connections are worth retrying; anything else is not."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name
 
 
 class ContextualEnricher:
-    def __init__(self):
+    def __init__(
+        self,
+        model: str = None,
+        base_url: str = None,
+        max_concurrency: int = None,
+        timeout_seconds: float = None,
+        max_retries: int = None,
+        retry_backoff_seconds: float = None,
+        use_cache: bool = True,
+        mode: str = None,
+        section_chars: int = None,
+    ):
         """
         Initialize the Contextual Enricher with the Teacher LLM.
+        Unset arguments come from data_pipeline.contextual_retrieval.
         """
+        cfg = settings.ingestion if settings else None
+        self.model = model or configured_model()
+        self.mode = mode or (cfg.enrichment_mode if cfg else "window")
+        if self.mode not in ENRICHMENT_MODES:
+            raise ValueError(f"Unknown enrichment mode '{self.mode}' (expected one of {ENRICHMENT_MODES})")
+        self.section_chars = section_chars or (cfg.enrichment_section_chars if cfg else 4000)
+        self.max_concurrency = max_concurrency or (cfg.enrichment_concurrency if cfg else 8)
+        self.timeout_seconds = timeout_seconds or (cfg.enrichment_timeout_seconds if cfg else 120.0)
+        self.max_retries = max_retries if max_retries is not None else (cfg.enrichment_max_retries if cfg else 3)
+        self.retry_backoff_seconds = retry_backoff_seconds or (cfg.enrichment_retry_backoff_seconds if cfg else 2.0)
+        self.cache = get_enrichment_cache() if use_cache else None
+
         # api_key = os.getenv("GROQ_API_KEY")
         # if not api_key:
         #     raise ValueError("❌ GROQ_API_KEY not found in environment variables.")
@@ -33,11 +113,11 @@ class ContextualEnricher:
         # )
 
         self.llm = ChatOllama(
-            model=CONTEXT_MODEL,
-            base_url="http://localhost:11434",
-            temperature=0.1, 
-            num_ctx=4096,
-            keep_alive="15m"
+            model=self.model,
+            base_url=base_url or (cfg.enrichment_base_url if cfg else "http://localhost:11434"),
+            temperature=0.1,
+            num_ctx=cfg.enrichment_num_ctx if cfg else 4096,
+            keep_alive=cfg.enrichment_keep_alive if cfg else "15m"
         )
 
 
@@ -62,7 +142,31 @@ class ContextualEnricher:
             """
         )
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.chain = self.prompt | self.llm
+
+        # Two-tier mode: one summary per section, the chunk prompt above then uses it as the document
+        self.summary_prompt = ChatPromptTemplate.from_template(
+            """
+            <document>
+            {document_content}
+            </document>
+
+            Summarize this section of a document in 3-4 sentences: what the document is about and what this section covers.
+            Name the document title/subject if it appears. Do not use bullet points.
+            """
+        )
+        self.summary_chain = self.summary_prompt | self.llm
+
+        # Counters for this enricher (see stats())
+        self.chunks = 0
+        self.llm_calls = 0
+        self.summary_calls = 0
+        self.prompt_tokens = 0  # Prompt tokens Ollama actually evaluated (a reused cached prefix is not counted)
+        self.output_tokens = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.failures = 0
+        self.llm_seconds = 0.0
 
     def clean_response(self, text: str) -> str:
         """Removes <think> tags if the model outputs them."""
@@ -72,30 +176,205 @@ class ContextualEnricher:
         cleaned = cleaned.replace("Context:", "").strip()
         return cleaned
 
+    def _count_tokens(self, message):
+        """Adds the token counts Ollama reports for one call (prompt_eval_count / eval_count)."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        meta = getattr(message, "response_metadata", None) or {}
+        self.prompt_tokens += usage.get("input_tokens", meta.get("prompt_eval_count", 0)) or 0
+        self.output_tokens += usage.get("output_tokens", meta.get("eval_count", 0)) or 0
+
+    async def _invoke(self, inputs: Dict[str, str], chain=None) -> str:
+        """One LLM call with a hard timeout, retried with exponential backoff (+ jitter) on transient errors."""
+        chain = chain or self.chain
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.llm_calls += 1
+                message = await asyncio.wait_for(chain.ainvoke(inputs), timeout=self.timeout_seconds)
+                self._count_tokens(message)
+                return message.content
+            except Exception as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    raise
+                self.retries += 1
+                delay = self.retry_backoff_seconds * 2 ** attempt * (1 + random.random() / 2)
+                print(f"⏳ Enrichment call failed ({type(e).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            finally:
+                self.llm_seconds += time.perf_counter() - start
+
+    async def generate_context(self, chunk_content: str, full_document_content: str) -> str:
+        """
+        The 1-2 sentence context for a chunk. Served from the enrichment cache when the
+        same chunk was already enriched with the same surrounding text, model and prompt.
+        """
+        # We truncate full_document_content to avoid blowing up the context window
+        truncated_doc = full_document_content[:MAX_DOCUMENT_CHARS]
+
+        key = self.cache.key(self.model, PROMPT_VERSION, chunk_content, truncated_doc) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        raw_context = await self._invoke({
+            "document_content": truncated_doc,
+            "chunk_content": chunk_content
+        })
+        context = self.clean_response(raw_context)
+        if key is not None:
+            self.cache.put(key, context)
+        return context
+
     async def enrich_chunk(self, chunk_content: str, full_document_content: str) -> str:
         """
         Generates context for a single chunk.
+        Raises EnrichmentError if the Teacher fails: the caller decides whether to fall back
+        to the raw chunk, and knows that it did.
         """
+        self.chunks += 1
         try:
-            # We truncate full_document_content to avoid blowing up the context window
-            # Taking the first 2000 chars is usually enough for "Global Context"
-            truncated_doc = full_document_content[:5000] 
-            
-            raw_context = await self.chain.ainvoke({
-                "document_content": truncated_doc,
-                "chunk_content": chunk_content
-            })
-            
             # Combine Context + Original Content
-            clean_context = self.clean_response(raw_context)
+            clean_context = await self.generate_context(chunk_content, full_document_content)
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Error enriching chunk: {e}")
+            raise EnrichmentError(str(e)) from e
 
-            # This is what gets EMBEDDED, but the LLM sees only the original chunk usually
-            enriched_text = f"Context: {clean_context}\n\nContent: {chunk_content}"
-            return enriched_text
+        # This is what gets EMBEDDED, but the LLM sees only the original chunk usually
+        enriched_text = f"Context: {clean_context}\n\nContent: {chunk_content}"
+        return enriched_text
 
+    async def summarize_section(self, section_text: str) -> str:
+        """
+        Section summary for the "summary" mode (cached like chunk contexts).
+        Falls back to the section text itself, i.e. the "prefix" mode, if the call fails.
+        """
+        truncated = section_text[:MAX_DOCUMENT_CHARS]
+        key = self.cache.key(self.model, SUMMARY_PROMPT_VERSION, "", truncated) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        try:
+            self.summary_calls += 1
+            summary = self.clean_response(await self._invoke({"document_content": truncated}, self.summary_chain))
         except Exception as e:
-            print(f"⚠️ Error enriching chunk: {e}")
-            return chunk_content # Fallback to original text if Teacher fails
+            self.failures += 1
+            print(f"⚠️ Error summarizing section: {e}")
+            return section_text
+        if key is not None:
+            self.cache.put(key, summary)
+        return summary
+
+    async def document_contexts(self, chunks: List[dict], window_size: int = 3) -> List[str]:
+        """
+        The "document" shown next to each chunk of one document, according to self.mode.
+        In "prefix" / "summary" mode consecutive chunks get the very same string, so their
+        prompts (and Ollama's cached prefix) are identical up to the chunk itself.
+        """
+        if self.mode == "window":
+            return [neighbor_window(chunks, i, window_size) for i in range(len(chunks))]
+
+        spans = document_sections(chunks, self.section_chars)
+        sections = ["\n---\n".join(c["text"] for c in chunks[start:end]) for start, end in spans]
+        if self.mode == "summary":
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def _summarize(text):
+                async with semaphore:
+                    return await self.summarize_section(text)
+
+            sections = await asyncio.gather(*[_summarize(text) for text in sections])
+
+        contexts = []
+        for (start, end), text in zip(spans, sections):
+            contexts.extend([text] * (end - start))
+        return contexts
+
+    async def enrich_stream(self, jobs: AsyncIterable[Tuple[Any, str, str]]) -> AsyncIterator[Tuple[Any, str]]:
+        """
+        Worker pool over `jobs` = (key, chunk_content, document_content) tuples.
+        Keeps up to max_concurrency LLM calls in flight: a new job starts as soon as any
+        call finishes (no batch waits for its slowest member), and jobs are only pulled
+        from `jobs` when a slot is free. Yields (key, enriched_text) in completion order,
+        enriched_text being None for a chunk whose enrichment failed (EnrichmentError).
+        Jobs start in the order they come, so jobs sharing a document prefix run back to back.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        running = set()
+
+        async def _run(key, chunk_content, document_content):
+            try:
+                try:
+                    text = await self.enrich_chunk(chunk_content, document_content)
+                except EnrichmentError:
+                    text = None
+                results.put_nowait((key, text))
+            finally:
+                semaphore.release()
+
+        async def _feed():
+            try:
+                async for key, chunk_content, document_content in jobs:
+                    await semaphore.acquire()
+                    task = asyncio.create_task(_run(key, chunk_content, document_content))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                while running:
+                    await asyncio.wait(set(running))
+            finally:
+                results.put_nowait(_DONE)
+
+        feeder = asyncio.create_task(_feed())
+        try:
+            while (item := await results.get()) is not _DONE:
+                yield item
+            await feeder  # Re-raises a failure of the jobs iterator
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+            for task in list(running):
+                task.cancel()
+
+    async def enrich_chunks(self, chunks: List[dict], window_size: int = 3) -> List[str]:
+        """Enriched text of every chunk of one document (see self.mode), in chunk order; None where it failed."""
+        contexts = await self.document_contexts(chunks, window_size)
+
+        async def _jobs():
+            for i, chunk in enumerate(chunks):
+                yield i, chunk["text"], contexts[i]
+
+        enriched = [None] * len(chunks)
+        async for i, text in self.enrich_stream(_jobs()):
+            enriched[i] = text
+        return enriched
+
+    def version_id(self) -> str:
+        """What the contexts depend on besides the text (recorded in the ingestion manifest)."""
+        prompts = f"{PROMPT_VERSION}+{SUMMARY_PROMPT_VERSION}" if self.mode == "summary" else PROMPT_VERSION
+        return f"{prompts}/{self.mode}/{self.model}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "mode": self.mode,
+            "prompt_version": PROMPT_VERSION,
+            "summary_prompt_version": SUMMARY_PROMPT_VERSION if self.mode == "summary" else None,
+            "chunks": self.chunks,
+            "llm_calls": self.llm_calls,
+            "summary_calls": self.summary_calls,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "failures": self.failures,
+            "llm_seconds": round(self.llm_seconds, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_chunk": round((self.prompt_tokens + self.output_tokens) / self.chunks, 1) if self.chunks else 0.0,
+        }
 
 # Simple test block to verify it works
 if __name__ == "__main__":
@@ -107,9 +386,9 @@ if __name__ == "__main__":
         enricher = ContextualEnricher()
         doc = "Standard Operating Procedure for Coffee Machine. Step 1: Turn on. Step 2: Add water."
         chunk = "Step 2: Add water."
-        
+
         print("Enriching...")
         res = await enricher.enrich_chunk(chunk, doc)
         print(f"\nResult:\n{res}")
 
-    asyncio.run(test())
\ No newline at end of file
+    asyncio.run(test())
@@ -0,0 +1,164 @@
+# Persistent cache of LLM chunk contexts (contextual enrichment at ingestion time)
+import sqlite3
+import argparse
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from backend.core.config_loader import settings
+from backend.models.embedding_cache import text_hash
+
+
+class EnrichmentCache:
+    """
+    SQLite table of generated contexts keyed by
+    (model, prompt version, chunk hash, neighbour-window hash).
+
+    A chunk is only sent to the LLM again when its text, the text around it, the model
+    or the prompt changed. Bumping PROMPT_VERSION in contextual_enrichment.py
+    invalidates every entry of the previous prompt (prune removes them).
+    """
+
+    def __init__(self, path: str = "data/cache/enrichment.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS contexts (
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                window_hash TEXT NOT NULL,
+                context TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (model, prompt_version, chunk_hash, window_hash)
+            )
+        """)
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, prompt_version: str, chunk: str, window: str) -> Tuple[str, str, str, str]:
+        return model, prompt_version, text_hash(chunk), text_hash(window)
+
+    def get(self, key: Tuple[str, str, str, str]) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT context FROM contexts WHERE model = ? AND prompt_version = ? AND chunk_hash = ? AND window_hash = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: Tuple[str, str, str, str], context: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO contexts (model, prompt_version, chunk_hash, window_hash, context, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, context, time.time()),
+            )
+            self._db.commit()
+
+    def prune(self, keep: Iterable[Tuple[str, str]], dry_run: bool = False) -> Dict[str, int]:
+        """
+        Deletes every entry whose (model, prompt_version) is not in `keep`.
+        Returns {"model@version": entries_removed}.
+        """
+        keep = set(keep)
+        with self._lock:
+            groups = [
+                (model, version, n)
+                for model, version, n in self._db.execute(
+                    "SELECT model, prompt_version, COUNT(*) FROM contexts GROUP BY model, prompt_version"
+                )
+                if (model, version) not in keep
+            ]
+            if not dry_run and groups:
+                self._db.executemany(
+                    "DELETE FROM contexts WHERE model = ? AND prompt_version = ?",
+                    [(m, v) for m, v, _ in groups],
+                )
+                self._db.commit()
+            return {f"{m}@{v}": n for m, v, n in groups}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM contexts")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_model = [
+                {"model": m, "prompt_version": v, "entries": n}
+                for m, v, n in self._db.execute(
+                    "SELECT model, prompt_version, COUNT(*) FROM contexts GROUP BY model, prompt_version"
+                )
+            ]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk_bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "by_model": by_model,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_enrichment_cache() -> Optional[EnrichmentCache]:
+    """Returns the process-wide cache, or None when disabled in config."""
+    if settings and settings.ingestion:
+        if not settings.ingestion.enrichment_cache_enabled:
+            return None
+        return EnrichmentCache(settings.ingestion.enrichment_cache_path)
+    return EnrichmentCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain the enrichment (LLM context) cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry counts per model/prompt version")
+    prune = sub.add_parser("prune", help="Remove entries of other models / older prompt versions")
+    prune.add_argument("--dry-run", action="store_true", help="Only show what would be removed")
+    sub.add_parser("clear", help="Delete every cached context")
+    args = parser.parse_args()
+
+    cache = get_enrichment_cache()
+    if cache is None:
+        print("⚠️ Enrichment cache is disabled in config (data_pipeline.contextual_retrieval.cache.enabled).")
+        return
+
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"📦 {cache.path} ({stats['disk_bytes'] / 1024**2:.1f} MB)")
+        for row in stats["by_model"]:
+            print(f"   {row['model']:<30} {row['prompt_version']:<6} {row['entries']:>8} contexts")
+
+    elif args.command == "prune":
+        # Imported here: the enricher pulls in the LLM clients
+        from backend.ingestion.pipeline.contextual_enrichment import PROMPT_VERSION, SUMMARY_PROMPT_VERSION, configured_model
+        keep = {(configured_model(), PROMPT_VERSION), (configured_model(), SUMMARY_PROMPT_VERSION)}
+        removed = cache.prune(keep, dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        for group, n in removed.items():
+            print(f"   🗑️ {verb} {n} contexts for {group}")
+        if not removed:
+            print("✅ Nothing to prune.")
+
+    elif args.command == "clear":
+        cache.clear()
+        print("✅ Cache cleared.")
+
+
+if __name__ == "__main__":
+    main()
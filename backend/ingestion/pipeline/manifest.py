@@ -0,0 +1,219 @@
+# Ingestion manifest: what is already indexed, so re-runs only process new / changed files
+import sqlite3
+import hashlib
+import argparse
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.core.config_loader import settings
+
+# Settings a document's chunks depend on besides the file itself (see IngestionPipeline.fingerprint())
+FINGERPRINT_FIELDS = ("chunker_config", "prompt_version", "embedding_model")
+
+
+def file_hash(path: Path, block_size: int = 1024 * 1024) -> str:
+    """sha256 of the file contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionPlan:
+    """
+    What a run has to do, per document (source = file name):
+    new / changed (contents) / reconfigured (chunker, prompt or embedding model) are ingested,
+    touched files (new mtime, same contents) only get their manifest row refreshed,
+    deleted sources have their chunks removed from the vector store.
+    """
+
+    def __init__(self):
+        self.new: List[Dict[str, Any]] = []
+        self.changed: List[Dict[str, Any]] = []
+        self.reconfigured: List[Dict[str, Any]] = []
+        self.touched: List[Dict[str, Any]] = []
+        self.unchanged: List[str] = []
+        self.deleted: List[str] = []
+
+    @property
+    def to_process(self) -> List[Dict[str, Any]]:
+        return self.new + self.changed + self.reconfigured
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {
+            "new": [e["source"] for e in self.new],
+            "changed": [e["source"] for e in self.changed],
+            "reconfigured": [e["source"] for e in self.reconfigured],
+            "touched": [e["source"] for e in self.touched],
+            "unchanged": list(self.unchanged),
+            "deleted": list(self.deleted),
+        }
+
+
+class IngestionManifest:
+    """
+    SQLite table with one row per (provider, source): file hash, mtime, size, the
+    fingerprint (chunker config, enrichment prompt version, embedding model) and the
+    chunk count it was indexed with. Qdrant and Postgres are tracked separately.
+    """
+
+    def __init__(self, path: str = "data/cache/ingestion_manifest.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                provider TEXT NOT NULL,
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                chunker_config TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                embedding_model TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                ingested REAL NOT NULL,
+                PRIMARY KEY (provider, source)
+            )
+        """)
+        self._db.commit()
+
+    def records(self, provider: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM documents WHERE provider = ?", (provider,))
+            columns = [c[0] for c in cursor.description]
+            return {row[1]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+    def put(self, provider: str, entry: Dict[str, Any], fingerprint: Dict[str, str], chunks: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (provider, source, path, file_hash, mtime, size, "
+                "chunker_config, prompt_version, embedding_model, chunks, ingested) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    provider, entry["source"], str(entry["path"]), entry["file_hash"], entry["mtime"], entry["size"],
+                    *(fingerprint[f] for f in FINGERPRINT_FIELDS), chunks, time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def touch(self, provider: str, entry: Dict[str, Any]):
+        """Same contents under a new mtime: remember the mtime so the file is not hashed again."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE documents SET mtime = ?, size = ?, path = ? WHERE provider = ? AND source = ?",
+                (entry["mtime"], entry["size"], str(entry["path"]), provider, entry["source"]),
+            )
+            self._db.commit()
+
+    def remove(self, provider: str, source: str):
+        with self._lock:
+            self._db.execute("DELETE FROM documents WHERE provider = ? AND source = ?", (provider, source))
+            self._db.commit()
+
+    def clear(self, provider: str = None):
+        with self._lock:
+            if provider:
+                self._db.execute("DELETE FROM documents WHERE provider = ?", (provider,))
+            else:
+                self._db.execute("DELETE FROM documents")
+            self._db.commit()
+
+    def plan(self, provider: str, files: Iterable[Path], fingerprint: Dict[str, str], full: bool = False) -> IngestionPlan:
+        """
+        Compares `files` (the whole corpus, not a subset: sources missing from it count as deleted)
+        against the manifest. Files are only hashed when their mtime or size moved.
+        `full` re-ingests every file.
+        """
+        records = self.records(provider)
+        plan = IngestionPlan()
+        seen = set()
+        for path in sorted(Path(f) for f in files):
+            stat = path.stat()
+            entry = {"source": path.name, "path": path, "mtime": stat.st_mtime, "size": stat.st_size}
+            seen.add(path.name)
+            record = records.get(path.name)
+
+            if record is None:
+                entry["file_hash"] = file_hash(path)
+                plan.new.append(entry)
+                continue
+
+            same_stat = record["mtime"] == entry["mtime"] and record["size"] == entry["size"]
+            entry["file_hash"] = record["file_hash"] if same_stat else file_hash(path)
+            if entry["file_hash"] != record["file_hash"]:
+                plan.changed.append(entry)
+            elif full or any(record[f] != fingerprint[f] for f in FINGERPRINT_FIELDS):
+                plan.reconfigured.append(entry)
+            elif not same_stat:
+                plan.touched.append(entry)
+            else:
+                plan.unchanged.append(path.name)
+
+        plan.deleted = sorted(source for source in records if source not in seen)
+        return plan
+
+
+def print_plan(plan: IngestionPlan):
+    summary = plan.as_dict()
+    print(f"📋 Ingestion plan: {len(summary['new'])} new, {len(summary['changed'])} changed, "
+          f"{len(summary['reconfigured'])} reconfigured, {len(summary['deleted'])} deleted, "
+          f"{len(summary['unchanged']) + len(summary['touched'])} unchanged")
+    markers = {"new": "➕", "changed": "✏️", "reconfigured": "🔧", "deleted": "🗑️"}
+    for kind, marker in markers.items():
+        for source in summary[kind]:
+            print(f"   {marker} {kind:<12} {source}")
+
+
+@lru_cache(maxsize=1)
+def get_ingestion_manifest() -> Optional[IngestionManifest]:
+    """Returns the process-wide manifest, or None when disabled in config."""
+    if settings and settings.ingestion:
+        if not settings.ingestion.manifest_enabled:
+            return None
+        return IngestionManifest(settings.ingestion.manifest_path)
+    return IngestionManifest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or reset the ingestion manifest.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="List indexed documents")
+    show.add_argument("--provider", default=None, help="qdrant / postgres (default: both)")
+    forget = sub.add_parser("forget", help="Forget documents so the next run re-ingests them")
+    forget.add_argument("--provider", required=True)
+    forget.add_argument("sources", nargs="*", help="File names (none: every document of the provider)")
+    args = parser.parse_args()
+
+    manifest = get_ingestion_manifest()
+    if manifest is None:
+        print("⚠️ Ingestion manifest is disabled in config (data_pipeline.manifest.enabled).")
+        return
+
+    if args.command == "show":
+        for provider in [args.provider] if args.provider else ["qdrant", "postgres"]:
+            records = manifest.records(provider)
+            print(f"📦 {provider}: {len(records)} documents")
+            for source, r in sorted(records.items()):
+                print(f"   {source:<40} {r['chunks']:>6} chunks  {r['file_hash'][:12]}  "
+                      f"{r['chunker_config']}  {r['prompt_version']}  {r['embedding_model']}")
+
+    elif args.command == "forget":
+        if args.sources:
+            for source in args.sources:
+                manifest.remove(args.provider, source)
+        else:
+            manifest.clear(args.provider)
+        print("✅ Forgotten: the next ingestion run re-processes them (chunks stay indexed until then).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# Streaming ingestion: load -> chunk -> enrich -> embed -> write over bounded queues
+"""
+Every stage runs in its own thread and talks to the next one through a bounded queue:
+
+    files -> [load] -> documents -> [chunk] -> chunk lists -> [enrich] -> chunk batches
+          -> [embed] -> (batch, vectors) -> [write] -> Qdrant / Postgres
+
+A stage blocks when the queue in front of the next one is full (backpressure), so at most
+`queue_size` items wait between two stages and memory does not grow with the corpus.
+While the GPU encodes batch N, the LLM enriches batch N+1 and the DB writes batch N-1.
+
+The enrich stage runs an asyncio loop of its own around ContextualEnricher.enrich_stream().
+A failing document or batch is reported and skipped; the rest of the corpus goes through.
+
+sync() is the incremental entry point: it diffs the corpus against the ingestion manifest
+(manifest.py), runs the pipeline on new / changed files only, trims or deletes stale chunks
+and records the documents that made it through completely.
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from backend.app.dependencies import get_vector_db
+from backend.core.config_loader import settings
+from backend.indexing.hybrid_index import postgres_points, qdrant_points
+from backend.ingestion.loaders.pdf_loader import ParallelPDFLoader, PDFLoader
+from backend.ingestion.pipeline.chunking import Chunker, build_chunker
+from backend.ingestion.pipeline.manifest import get_ingestion_manifest, print_plan
+from backend.models.embedding_client import embed_hybrid
+
+_DONE = object()  # End-of-stream marker passed down the queues
+POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """Per-stage counters: items processed, failures, seconds spent working (not waiting)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0  # Deepest the stage's output queue got
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        provider: str = None,
+        chunker: Chunker = None,
+        enricher=None,
+        loader: PDFLoader = None,
+        enrichment_window: int = None,
+        queue_size: int = None,
+        embed_batch_size: int = None,
+        use_embedding_cache: bool = True,
+    ):
+        """
+        Args:
+            provider: vector store to write to ("qdrant" / "postgres"; default VECTOR_DB_PROVIDER).
+            chunker: defaults to data_pipeline.chunking (build_chunker()).
+            loader: defaults to data_pipeline.loading (a ParallelPDFLoader unless workers is 1).
+            enricher: a ContextualEnricher (its max_concurrency sets the LLM calls in flight),
+                or None to index raw chunks.
+            enrichment_window: neighbour chunks on each side shown to the enricher ("window" mode).
+            queue_size: items buffered between two stages.
+            embed_batch_size: chunks per embedding pass and per DB write.
+            use_embedding_cache: look chunks up in the on-disk embedding cache first.
+        """
+        cfg = settings.ingestion if settings else None
+        self.db = get_vector_db(provider)
+        self.build_points = postgres_points if self.db.provider == "postgres" else qdrant_points
+        if loader is None:
+            workers = cfg.load_workers if cfg else 1
+            loader = PDFLoader() if workers == 1 else ParallelPDFLoader(
+                max_workers=workers or None,
+                pages_per_task=cfg.load_pages_per_task,
+                max_pending=cfg.load_max_pending or None,
+            )
+        self.loader = loader
+        self.chunker = chunker or build_chunker()
+        self.enricher = enricher
+        self.enrichment_window = enrichment_window if enrichment_window is not None else (cfg.enrichment_window if cfg else 3)
+        self.queue_size = queue_size or (cfg.queue_size if cfg else 4)
+        self.embed_batch_size = embed_batch_size or (cfg.embed_batch_size if cfg else 64)
+        self.use_embedding_cache = use_embedding_cache
+
+        self._stop = threading.Event()
+        self.stats: Dict[str, StageStats] = {}
+        # Per source: {"chunks": produced, "written": upserted, "failed": lost,
+        # "unenriched": indexed with the raw text after an enrichment failure} (see _track)
+        self.documents: Dict[str, Dict[str, int]] = {}
+        self._documents_lock = threading.Lock()
+
+    # --- Queue helpers (give up when the pipeline is stopping) ---
+    def _put(self, q: queue.Queue, item, stats: StageStats = None) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                if stats is not None:
+                    stats.max_queue_depth = max(stats.max_queue_depth, q.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _track(self, source: str, key: str, n: int = 1):
+        with self._documents_lock:
+            doc = self.documents.setdefault(source, {"chunks": 0, "written": 0, "failed": 0, "unenriched": 0})
+            doc[key] += n
+
+    def _track_batch(self, batch: List[dict], key: str):
+        for source, n in Counter(c["metadata"].get("source") for c in batch).items():
+            self._track(source, key, n)
+
+    def _stage(self, name: str, body, *args):
+        """Thread target: runs `body`, stops the whole pipeline on an unexpected error."""
+        try:
+            body(self.stats[name], *args)
+        except Exception as e:
+            print(f"❌ Stage '{name}' crashed: {e}")
+            self._stop.set()
+
+    # --- Stages ---
+    def _load(self, stats: StageStats, files: List[Path], out: queue.Queue):
+        documents = self.loader.iter_documents(files)
+        while True:
+            start = time.perf_counter()
+            item = next(documents, None)
+            stats.busy_seconds += time.perf_counter() - start
+            if item is None:
+                break
+            path, doc, error = item
+            if error is not None:
+                stats.failed += 1
+                self._track(path.name, "failed")
+                print(f"   ❌ Failed to load {path.name}: {error}")
+                continue
+            text = doc["text"]
+            if not text or not text.strip():
+                self._track(path.name, "chunks", 0)
+                print(f"   ⚠️ Skipped empty file: {path.name}")
+                continue
+            stats.items += 1
+            if not self._put(out, doc, stats):
+                documents.close()
+                return
+        self._put(out, _DONE)
+
+    def _chunk(self, stats: StageStats, inq: queue.Queue, out: queue.Queue):
+        while (doc := self._get(inq)) is not _DONE:
+            start = time.perf_counter()
+            try:
+                chunks = self.chunker.chunk_text(doc["text"], metadata={"source": doc["source"]}, pages=doc.get("pages"))
+            except Exception as e:
+                stats.failed += 1
+                self._track(doc["source"], "failed")
+                print(f"   ❌ Chunking failed for {doc['source']}: {e}")
+                continue
+            finally:
+                stats.busy_seconds += time.perf_counter() - start
+            stats.items += 1
+            self._track(doc["source"], "chunks", len(chunks))
+            print(f"   ✂️ {doc['source']}: {len(chunks)} chunks")
+            if chunks and not self._put(out, chunks, stats):
+                return
+        self._put(out, _DONE)
+
+    def _emit_batches(self, chunks: List[dict], out: queue.Queue, stats: StageStats) -> bool:
+        for i in range(0, len(chunks), self.embed_batch_size):
+            if not self._put(out, chunks[i:i + self.embed_batch_size], stats):
+                return False
+        return True
+
+    async def _enrich_async(self, stats: StageStats, inq: queue.Queue, out: queue.Queue):
+        """
+        The chunks of consecutive documents feed ONE enricher worker pool, so the LLM stays
+        busy across document boundaries. Embedding batches are handed on in completion order.
+        """
+        async def _jobs():
+            while (chunks := await asyncio.to_thread(self._get, inq)) is not _DONE:
+                # Chunks go out in document order: in "prefix" mode the ones sharing a section are consecutive
+                try:
+                    contexts = await self.enricher.document_contexts(chunks, self.enrichment_window)
+                except Exception as e:
+                    stats.failed += len(chunks)
+                    self._track_batch(chunks, "failed")
+                    print(f"   ❌ Enrichment failed for {chunks[0]['metadata'].get('source')}: {e}")
+                    continue
+                for chunk, context in zip(chunks, contexts):
+                    yield chunk, chunk["text"], context
+
+        async def _emit(batch) -> bool:
+            nonlocal blocked
+            t = time.perf_counter()
+            ok = await asyncio.to_thread(self._put, out, batch, stats)
+            blocked += time.perf_counter() - t
+            return ok
+
+        start, blocked, pending = time.perf_counter(), 0.0, []
+        async for chunk, text in self.enricher.enrich_stream(_jobs()):
+            if text is None:
+                # Enrichment failed: the raw chunk stays searchable, but its document is incomplete
+                stats.failed += 1
+                self._track(chunk["metadata"].get("source"), "unenriched")
+                text = chunk["text"]
+            chunk["search_content"] = text
+            chunk["display_content"] = chunk["text"]
+            stats.items += 1
+            pending.append(chunk)
+            if len(pending) >= self.embed_batch_size:
+                if not await _emit(pending):
+                    return
+                pending = []
+        if pending and not await _emit(pending):
+            return
+        stats.busy_seconds += time.perf_counter() - start - blocked
+        self._put(out, _DONE)
+
+    def _enrich(self, stats: StageStats, inq: queue.Queue, out: queue.Queue):
+        if self.enricher is not None:
+            asyncio.run(self._enrich_async(stats, inq, out))
+            return
+
+        # No LLM: the chunk text is what gets embedded
+        while (chunks := self._get(inq)) is not _DONE:
+            for chunk in chunks:
+                chunk["search_content"] = chunk["display_content"] = chunk["text"]
+            stats.items += len(chunks)
+            if not self._emit_batches(chunks, out, stats):
+                return
+        self._put(out, _DONE)
+
+    def _embed(self, stats: StageStats, inq: queue.Queue, out: queue.Queue):
+        while (batch := self._get(inq)) is not _DONE:
+            start = time.perf_counter()
+            try:
+                vectors = embed_hybrid([c["search_content"] for c in batch], use_cache=self.use_embedding_cache)
+            except Exception as e:
+                stats.failed += len(batch)
+                self._track_batch(batch, "failed")
+                print(f"   ❌ Embedding failed for {len(batch)} chunks: {e}")
+                continue
+            finally:
+                stats.busy_seconds += time.perf_counter() - start
+            stats.items += len(batch)
+            if not self._put(out, (batch, vectors), stats):
+                return
+        self._put(out, _DONE)
+
+    def _write(self, stats: StageStats, inq: queue.Queue):
+        while (item := self._get(inq)) is not _DONE:
+            batch, vectors = item
+            start = time.perf_counter()
+            try:
+                self.db.upsert(self.build_points(batch, vectors))
+                stats.items += len(batch)
+                self._track_batch(batch, "written")
+            except Exception as e:
+                stats.failed += len(batch)
+                self._track_batch(batch, "failed")
+                print(f"   ❌ Upsert failed for {len(batch)} chunks: {e}")
+            finally:
+                stats.busy_seconds += time.perf_counter() - start
+
+    # --- Run ---
+    def run(self, files: Iterable[Path]) -> Dict[str, Any]:
+        """
+        Ingests `files` and blocks until every stage has drained.
+        Returns per-stage stats plus the wall time (stage busy times adding up to more
+        than the wall time is the overlap).
+        """
+        files = [Path(f) for f in files]
+        self._stop.clear()
+        names = ["load", "chunk", "enrich", "embed", "write"]
+        self.stats = {name: StageStats(name) for name in names}
+        self.documents = {}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(names) - 1)]
+
+        threads = [
+            threading.Thread(target=self._stage, args=("load", self._load, files, queues[0])),
+            threading.Thread(target=self._stage, args=("chunk", self._chunk, queues[0], queues[1])),
+            threading.Thread(target=self._stage, args=("enrich", self._enrich, queues[1], queues[2])),
+            threading.Thread(target=self._stage, args=("embed", self._embed, queues[2], queues[3])),
+            threading.Thread(target=self._stage, args=("write", self._write, queues[3])),
+        ]
+        for name, thread in zip(names, threads):
+            thread.name = f"ingest-{name}"
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=POLL_SECONDS)
+        except KeyboardInterrupt:
+            print("\n🛑 Interrupted: stopping the pipeline...")
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            raise
+
+        report = {
+            "files": len(files),
+            "wall_seconds": round(time.perf_counter() - start, 2),
+            "stages": {name: s.as_dict() for name, s in self.stats.items()},
+        }
+        if self.enricher is not None:
+            report["enrichment"] = self.enricher.stats()
+        return report
+
+    def fingerprint(self) -> Dict[str, str]:
+        """Everything besides the file contents that the indexed chunks depend on."""
+        return {
+            "chunker_config": getattr(self.chunker, "config_id", type(self.chunker).__name__),
+            "prompt_version": self.enricher.version_id() if self.enricher is not None else "none",
+            "embedding_model": settings.retrieval.embedder_model if settings else "unknown",
+        }
+
+    def sync(self, files: Iterable[Path], full: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Incremental ingestion of the corpus `files` (all of it: indexed sources missing from
+        `files` are treated as deleted). Only new, changed or reconfigured files go through the
+        pipeline; `full` re-ingests everything, `dry_run` only prints the plan.
+
+        A document is recorded in the manifest only once all of its chunks were written and
+        enriched, and only then is its stale tail (chunks past its new count) removed, so a failed
+        file keeps its previous chunks searchable and is retried on the next run. Chunks whose
+        enrichment failed are indexed with their raw text meanwhile.
+        """
+        manifest = get_ingestion_manifest()
+        if manifest is None:
+            return self.run(files) if not dry_run else {"dry_run": True, "plan": None}
+
+        provider = self.db.provider
+        fingerprint = self.fingerprint()
+        plan = manifest.plan(provider, files, fingerprint, full=full)
+        print_plan(plan)
+        if dry_run:
+            return {"dry_run": True, "plan": plan.as_dict()}
+
+        for source in plan.deleted:
+            self.db.delete_document(source)
+            manifest.remove(provider, source)
+            print(f"   🗑️ Removed chunks of deleted file: {source}")
+        for entry in plan.touched:
+            manifest.touch(provider, entry)
+
+        todo = plan.to_process
+        if todo:
+            report = self.run([entry["path"] for entry in todo])
+        else:
+            report = {"files": 0, "wall_seconds": 0.0, "stages": {}}
+
+        recorded = 0
+        for entry in todo:
+            doc = self.documents.get(entry["source"])
+            if doc is None or doc["failed"] or doc["written"] < doc["chunks"]:
+                print(f"   ⚠️ {entry['source']} incomplete: not recorded, retried on the next run")
+                continue
+            if doc["unenriched"]:
+                print(f"   ⚠️ {entry['source']}: enrichment failed for {doc['unenriched']} chunks "
+                      f"(indexed raw): not recorded, retried on the next run")
+                continue
+            self.db.delete_document(entry["source"], from_index=doc["chunks"])
+            manifest.put(provider, entry, fingerprint, doc["chunks"])
+            recorded += 1
+
+        report["plan"] = plan.as_dict()
+        report["recorded"] = recorded
+        return report
+
+
+def print_report(report: Dict[str, Any]):
+    if report.get("dry_run"):
+        return
+    print(f"⏱️ {report['files']} files in {report['wall_seconds']}s")
+    if "recorded" in report:
+        print(f"   📋 {report['recorded']} documents recorded in the manifest")
+    print(f"   {'Stage':<7} | {'Items':<6} | {'Failed':<6} | {'Busy (s)':<8} | {'Max queue':<9}")
+    for name, s in report["stages"].items():
+        print(f"   {name:<7} | {s['items']:<6} | {s['failed']:<6} | {s['busy_seconds']:<8} | {s['max_queue_depth']:<9}")
+    if "enrichment" in report:
+        e = report["enrichment"]
+        print(f"   👨‍🏫 Enrichment: {e['llm_calls']} LLM calls, {e['cache_hits']} cache hits, "
+              f"{e['retries']} retries, {e['failures']} failures ({e['llm_seconds']}s in LLM calls)")
+        print(f"   🔢 Mode '{e['mode']}': {e['tokens_per_chunk']} LLM tokens per chunk "
+              f"({e['prompt_tokens']} prompt + {e['output_tokens']} output, {e['summary_calls']} section summaries)")
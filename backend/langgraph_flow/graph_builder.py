@@ -1,9 +1,10 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 from backend.langgraph_flow.state import GraphState
 
 from backend.langgraph_flow.nodes.node_query_classify import classify_query
 from backend.langgraph_flow.nodes.rewrite_query import rewrite_query
-from backend.langgraph_flow.nodes.node_retrieve import retrieve
+from backend.langgraph_flow.nodes.node_retrieve import retrieve, aretrieve
 # from backend.langgraph_flow.nodes.grade_documents import grade_documents
 from backend.langgraph_flow.nodes.node_generate import generate
 from backend.langgraph_flow.nodes.hallucination_check import hallucination_check
@@ -69,7 +70,9 @@ workflow = StateGraph(GraphState)
 # Add Nodes
 workflow.add_node("classify_query", classify_query)
 workflow.add_node("rewrite_query", rewrite_query)
-workflow.add_node("retrieve", retrieve)
+# app.invoke() runs the sync node, app.ainvoke() the asyncio-native one.
+# Sync-only nodes are run by LangGraph in a worker thread under ainvoke().
+workflow.add_node("retrieve", RunnableLambda(retrieve, afunc=aretrieve, name="retrieve"))
 # workflow.add_node("grade_documents", grade_documents)
 workflow.add_node("generate", generate)
 workflow.add_node("hallucination_check", hallucination_check)
@@ -1,6 +1,30 @@
 from langchain_core.documents import Document
 from backend.langgraph_flow.state import GraphState
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db, get_async_vector_db
+
+def _to_documents(results):
+    """Converts search hits (Qdrant ScoredPoints / Postgres SearchResults) to LangChain Documents."""
+    docs = []
+    for hit in results:
+        # Reconstruct content if 'search_content' is missing
+        payload = hit.payload or {}
+        # content = payload.get("search_content")
+        # if not content:
+        summary = payload.get("context_summary", "")
+        raw_text = payload.get("text", "")
+        content = f"{summary}\n{raw_text}" if summary else raw_text
+        
+        # Map Qdrant hit to Document
+        doc = Document(
+            page_content=content,
+            metadata={
+                "score": hit.score,
+                "id": hit.id,
+                **payload
+            }
+        )
+        docs.append(doc)
+    return docs
 
 def retrieve(state: GraphState):
     """
@@ -15,36 +39,16 @@ def retrieve(state: GraphState):
     print("---NODE: RETRIEVE---")
     question = state["question"]
 
-    # 1. Initialize VectorDB
+    # 1. Get the shared VectorDB (created once per process, reused across app.invoke calls)
     try:
-        vector_db = VectorDBClient()
+        vector_db = get_vector_db()
         
         # 2. Execute Retrieval
         # We fetch a bit more than needed to allow the 'Grade' node to filter
         results = vector_db.search(question, limit=5)
         
         # Convert Qdrant ScoredPoints to LangChain Documents
-        docs = []
-        for hit in results:
-            # Reconstruct content if 'search_content' is missing
-            payload = hit.payload or {}
-            # content = payload.get("search_content")
-            # if not content:
-            summary = payload.get("context_summary", "")
-            raw_text = payload.get("text", "")
-            content = f"{summary}\n{raw_text}" if summary else raw_text
-            
-            # Map Qdrant hit to Document
-            doc = Document(
-                page_content=content,
-                metadata={
-                    "score": hit.score,
-                    "id": hit.id,
-                    **payload
-                }
-            )
-            docs.append(doc)
-            
+        docs = _to_documents(results)
         print(f"✅ Retrieved {len(docs)} documents.")
     except Exception as e:
         print(f"⚠️ Retrieval failed: {e}")
@@ -57,6 +61,29 @@ def retrieve(state: GraphState):
         # Increment attempts if this was a retry (handled by logic outside, but good to know)
     }
 
+async def aretrieve(state: GraphState):
+    """
+    Async variant of retrieve(), used by app.ainvoke().
+    DB I/O is awaited and the encoders/reranker run on the bounded inference executor,
+    so one slow query does not block other conversations on the same event loop.
+    """
+    print("---NODE: RETRIEVE (async)---")
+    question = state["question"]
+
+    try:
+        vector_db = await get_async_vector_db()
+        results = await vector_db.search(question, limit=5)
+        docs = _to_documents(results)
+        print(f"✅ Retrieved {len(docs)} documents.")
+    except Exception as e:
+        print(f"⚠️ Retrieval failed: {e}")
+        docs = []
+
+    return {
+        "documents": docs,
+        "steps": ["retrieve"],
+    }
+
 if __name__ == "__main__":
     # Test Retrieval
     print("--- TEST: Retrieval ---")
@@ -0,0 +1,185 @@
+# Dynamic micro-batching for query-time models (reranker, encoders)
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def length_buckets(lengths: List[int], max_padding: float = 0.3, max_size: int = 0) -> List[List[int]]:
+    """
+    Groups item indices into forward passes by length: items are sorted, and a bucket is
+    closed when adding the next (longer) item would make more than `max_padding` of the
+    padded bucket padding, or when it holds `max_size` items (0 = no cap).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current, total = [], [], 0
+    for i in order:
+        length = max(1, lengths[i])
+        padded = (len(current) + 1) * length  # Sorted: the new item is the longest
+        if current and (1 - (total + length) / padded > max_padding or len(current) == max_size):
+            buckets.append(current)
+            current, total = [], 0
+        current.append(i)
+        total += length
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class MicroBatcher:
+    """
+    Coalesces the items of concurrent callers into one call of `process_fn`.
+
+    A background thread takes the first waiting request, then keeps collecting requests
+    until `max_batch_size` items are queued or `max_wait_ms` has passed, runs
+    `process_fn(all_items)` once and fans the results back out in order.
+    A request's items are never split across batches; one larger than `max_batch_size`
+    runs as its own batch.
+
+    The queue is bounded (`max_queue` requests): run() / submit() block when it is full,
+    arun() yields to the event loop and retries instead.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 1024,
+        name: str = "batcher",
+    ):
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._items = 0
+        self._waits_ms = deque(maxlen=2048)
+        self._sizes = deque(maxlen=2048)
+
+        self._carry = None  # Request that did not fit in the previous batch
+        self._thread = threading.Thread(target=self._loop, name=f"{name}-worker", daemon=True)
+        self._thread.start()
+
+    # --- Callers ---
+    def _new_future(self, items: List[Any]) -> Future:
+        if self._closed:
+            raise RuntimeError(f"❌ {self.name} is closed")
+        future = Future()
+        if not items:
+            future.set_result([])
+        return future
+
+    def submit(self, items: List[Any]) -> Future:
+        future = self._new_future(items)
+        if items:
+            self._queue.put((list(items), future, time.perf_counter()))
+        return future
+
+    def run(self, items: List[Any]) -> List[Any]:
+        """Blocking call: returns the results for `items`, in order."""
+        return self.submit(items).result()
+
+    async def arun(self, items: List[Any]) -> List[Any]:
+        """Awaitable call: the event loop is free while the batch runs, and while the queue is full."""
+        future = self._new_future(items)
+        delay = 0.0005
+        while items:
+            try:
+                self._queue.put_nowait((list(items), future, time.perf_counter()))
+                break
+            except queue.Full:
+                await asyncio.sleep(delay)  # Never block the loop thread on a full queue
+                delay = min(2 * delay, 0.02)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # --- Worker ---
+    def _collect(self, first) -> list:
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Re-queue the shutdown marker for the main loop
+                break
+            if size + len(request[0]) > self.max_batch_size:
+                self._carry = request  # Opens the next batch
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _loop(self):
+        while True:
+            if self._carry is not None:
+                request, self._carry = self._carry, None
+            else:
+                request = self._queue.get()
+            if request is None:
+                return
+            self._process(self._collect(request))
+
+    def _process(self, batch: list):
+        items = [item for request_items, _, _ in batch for item in request_items]
+        start = time.perf_counter()
+        try:
+            results = self.process_fn(items)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        pos = 0
+        for request_items, future, _ in batch:
+            future.set_result(results[pos:pos + len(request_items)])
+            pos += len(request_items)
+
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._items += len(items)
+            self._sizes.append(len(items))
+            self._waits_ms.extend(1000 * (start - queued_at) for _, _, queued_at in batch)
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            sizes, waits = list(self._sizes), list(self._waits_ms)
+            batches, items, requests = self._batches, self._items, self._requests
+        return {
+            "queue_depth": self._queue.qsize(),
+            "requests": requests,
+            "batches": batches,
+            "items": items,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "requests_per_batch": round(requests / batches, 2) if batches else 0.0,
+            "fill_ratio": round(sum(min(s, self.max_batch_size) for s in sizes) / (len(sizes) * self.max_batch_size), 4) if sizes else 0.0,
+            "wait_ms_p50": round(percentile(waits, 50), 3),
+            "wait_ms_p99": round(percentile(waits, 99), 3),
+        }
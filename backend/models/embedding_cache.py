@@ -0,0 +1,381 @@
+# Persistent, content-addressed embedding cache (used at ingestion time)
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple, Any
+
+import numpy as np
+
+from backend.core.config_loader import settings
+
+# mode -> value layout. Dense vectors are stored as fixed-length float16 rows,
+# sparse vectors as parallel (int32 token ids, float16 weights) runs.
+DENSE_MODES = ("dense",)
+SPARSE_MODES = ("sparse",)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model id, text hash, mode).
+
+    Layout under `root`:
+        index.sqlite               -> compact index: key -> (offset, length) + LRU bookkeeping
+        <model>__<mode>.f16        -> append-only float16 values (memory-mapped for reads)
+        <model>__<mode>.i32        -> append-only int32 token ids (sparse modes only)
+
+    Eviction is LRU by last access and bounded by `max_bytes` of live data.
+    Evicted rows leave holes in the value files, which compact() reclaims.
+    """
+
+    def __init__(self, root: str = "data/cache/embeddings", max_bytes: int = 2 * 1024**3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL;")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                model TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, mode, text_hash)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries (last_access);")
+        self._db.commit()
+
+        # path -> (file size when mapped, memmap)
+        self._maps: Dict[Path, Tuple[int, np.memmap]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- files ----------
+
+    def _base(self, model: str, mode: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9_-]", "_", model)
+        return f"{slug}__{mode}"
+
+    def _values_path(self, model: str, mode: str) -> Path:
+        return self.root / f"{self._base(model, mode)}.f16"
+
+    def _indices_path(self, model: str, mode: str) -> Path:
+        return self.root / f"{self._base(model, mode)}.i32"
+
+    def _memmap(self, path: Path, dtype) -> np.ndarray:
+        size = path.stat().st_size if path.exists() else 0
+        if size == 0:
+            # np.memmap refuses empty files
+            return np.empty(0, dtype=dtype)
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != size:
+            self._maps[path] = (size, np.memmap(path, dtype=dtype, mode="r"))
+        return self._maps[path][1]
+
+    def _append(self, path: Path, array: np.ndarray) -> int:
+        """Appends `array` and returns its element offset in the file."""
+        with open(path, "ab") as f:
+            offset = f.tell() // array.itemsize
+            f.write(array.tobytes())
+        return offset
+
+    # ---------- lookups ----------
+
+    def _lookup(self, model: str, mode: str, hashes: List[str]) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        # SQLite caps bound parameters, so look up in slices
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT text_hash, offset, length FROM entries WHERE model = ? AND mode = ? "
+                f"AND text_hash IN ({','.join('?' * len(part))})",
+                [model, mode, *part],
+            ).fetchall()
+            for h, offset, length in rows:
+                found[h] = (offset, length)
+        return found
+
+    def _touch(self, model: str, mode: str, hashes: Iterable[str]):
+        now = time.time()
+        self._db.executemany(
+            "UPDATE entries SET last_access = ? WHERE model = ? AND mode = ? AND text_hash = ?",
+            [(now, model, mode, h) for h in hashes],
+        )
+        self._db.commit()
+
+    def get(self, model: str, mode: str, texts: List[str]) -> List[Optional[Any]]:
+        """
+        Returns one entry per text: a list[float] (dense), a {token_id: weight} dict (sparse),
+        or None on a miss.
+        """
+        hashes = [text_hash(t) for t in texts]
+        with self._lock:
+            found = self._lookup(model, mode, hashes)
+            results: List[Optional[Any]] = [None] * len(texts)
+            if found:
+                values = self._memmap(self._values_path(model, mode), np.float16)
+                indices = self._memmap(self._indices_path(model, mode), np.int32) if mode in SPARSE_MODES else None
+                for i, h in enumerate(hashes):
+                    if h not in found:
+                        continue
+                    offset, length = found[h]
+                    vals = values[offset:offset + length].astype(np.float32)
+                    if indices is None:
+                        results[i] = vals.tolist()
+                    else:
+                        ids = indices[offset:offset + length]
+                        results[i] = {str(int(k)): float(v) for k, v in zip(ids, vals)}
+                self._touch(model, mode, found.keys())
+
+            hit_count = sum(r is not None for r in results)
+            self.hits += hit_count
+            self.misses += len(texts) - hit_count
+            return results
+
+    def put(self, model: str, mode: str, texts: List[str], vectors: List[Any]):
+        """Stores freshly computed vectors (same shapes as get() returns)."""
+        if not texts:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            values_path = self._values_path(model, mode)
+            for text, vec in zip(texts, vectors):
+                if mode in SPARSE_MODES:
+                    ids = np.fromiter((int(k) for k in vec.keys()), dtype=np.int32, count=len(vec))
+                    vals = np.fromiter((float(v) for v in vec.values()), dtype=np.float16, count=len(vec))
+                    offset = self._append(values_path, vals)
+                    self._append(self._indices_path(model, mode), ids)
+                    nbytes = vals.nbytes + ids.nbytes
+                else:
+                    vals = np.asarray(vec, dtype=np.float16)
+                    offset = self._append(values_path, vals)
+                    nbytes = vals.nbytes
+                rows.append((model, mode, text_hash(text), offset, len(vals), nbytes, now))
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (model, mode, text_hash, offset, length, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+            self.evict()
+
+    # ---------- maintenance ----------
+
+    def live_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Drops least-recently-used entries until live data fits in 90% of max_bytes.
+        Returns the number of evicted entries.
+        """
+        with self._lock:
+            total = self.live_bytes()
+            if total <= self.max_bytes:
+                return 0
+
+            target = int(self.max_bytes * 0.9)
+            evicted = []
+            cursor = self._db.execute("SELECT model, mode, text_hash, nbytes FROM entries ORDER BY last_access ASC")
+            for model, mode, h, nbytes in cursor:
+                if total <= target:
+                    break
+                evicted.append((model, mode, h))
+                total -= nbytes
+
+            self._db.executemany("DELETE FROM entries WHERE model = ? AND mode = ? AND text_hash = ?", evicted)
+            self._db.commit()
+            print(f"🧹 Embedding cache evicted {len(evicted)} entries (LRU).")
+            self.compact(min_waste=0.5)
+            return len(evicted)
+
+    def compact(self, min_waste: float = 0.0):
+        """
+        Rewrites value files whose dead space exceeds `min_waste` (fraction of file size).
+        """
+        with self._lock:
+            groups = self._db.execute("SELECT DISTINCT model, mode FROM entries").fetchall()
+            for model, mode in groups:
+                values_path = self._values_path(model, mode)
+                if not values_path.exists():
+                    continue
+                live = self._db.execute(
+                    "SELECT COALESCE(SUM(length), 0) FROM entries WHERE model = ? AND mode = ?", (model, mode)
+                ).fetchone()[0]
+                file_elems = values_path.stat().st_size // 2
+                if file_elems == 0 or (1 - live / file_elems) <= min_waste:
+                    continue
+                self._rewrite(model, mode)
+            self._remove_orphans()
+
+    def _rewrite(self, model: str, mode: str):
+        values_path = self._values_path(model, mode)
+        indices_path = self._indices_path(model, mode)
+        sparse = mode in SPARSE_MODES
+
+        old_values = np.fromfile(values_path, dtype=np.float16)
+        old_indices = np.fromfile(indices_path, dtype=np.int32) if sparse else None
+
+        rows = self._db.execute(
+            "SELECT text_hash, offset, length FROM entries WHERE model = ? AND mode = ? ORDER BY offset",
+            (model, mode),
+        ).fetchall()
+
+        tmp_values = Path(f"{values_path}.tmp")
+        tmp_indices = Path(f"{indices_path}.tmp")
+        updates = []
+        new_offset = 0
+        new_values, new_indices = [], []
+        for h, offset, length in rows:
+            new_values.append(old_values[offset:offset + length])
+            if sparse:
+                new_indices.append(old_indices[offset:offset + length])
+            updates.append((new_offset, model, mode, h))
+            new_offset += length
+
+        np.concatenate(new_values or [np.empty(0, np.float16)]).tofile(tmp_values)
+        if sparse:
+            np.concatenate(new_indices or [np.empty(0, np.int32)]).tofile(tmp_indices)
+
+        self._maps.pop(values_path, None)
+        self._maps.pop(indices_path, None)
+        os.replace(tmp_values, values_path)
+        if sparse:
+            os.replace(tmp_indices, indices_path)
+        self._db.executemany(
+            "UPDATE entries SET offset = ? WHERE model = ? AND mode = ? AND text_hash = ?", updates
+        )
+        self._db.commit()
+        print(f"🗜️ Compacted {values_path.name}: {len(old_values)} -> {new_offset} values.")
+
+    def _remove_orphans(self):
+        """Deletes value files whose (model, mode) has no entries left."""
+        live = {self._base(m, md) for m, md in self._db.execute("SELECT DISTINCT model, mode FROM entries")}
+        for path in self.root.glob("*__*"):
+            if path.suffix in (".f16", ".i32") and path.name[:-len(path.suffix)] not in live:
+                self._maps.pop(path, None)
+                path.unlink()
+
+    def prune_models(self, keep: Iterable[str], dry_run: bool = False) -> Dict[str, int]:
+        """
+        Deletes every entry whose model id is not in `keep`.
+        Returns {model_id: entries_removed}.
+        """
+        keep = set(keep)
+        with self._lock:
+            counts = {
+                model: n
+                for model, n in self._db.execute("SELECT model, COUNT(*) FROM entries GROUP BY model")
+                if model not in keep
+            }
+            if not dry_run and counts:
+                self._db.executemany("DELETE FROM entries WHERE model = ?", [(m,) for m in counts])
+                self._db.commit()
+                self._remove_orphans()
+            return counts
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+            self._remove_orphans()
+
+    def stats(self) -> Dict[str, Any]:
+        by_model = [
+            {"model": m, "mode": md, "entries": n, "bytes": b}
+            for m, md, n, b in self._db.execute(
+                "SELECT model, mode, COUNT(*), SUM(nbytes) FROM entries GROUP BY model, mode"
+            )
+        ]
+        disk = sum(p.stat().st_size for p in self.root.glob("*") if p.is_file())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "live_bytes": self.live_bytes(),
+            "disk_bytes": disk,
+            "max_bytes": self.max_bytes,
+            "by_model": by_model,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Returns the process-wide cache, or None when disabled in config.
+    """
+    if settings and settings.retrieval:
+        if not settings.retrieval.embedding_cache_enabled:
+            return None
+        return EmbeddingCache(
+            root=settings.retrieval.embedding_cache_path,
+            max_bytes=settings.retrieval.embedding_cache_max_mb * 1024**2,
+        )
+    return EmbeddingCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain the on-disk embedding cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry counts and sizes per model/mode")
+    prune = sub.add_parser("prune", help="Remove entries for models that are no longer configured")
+    prune.add_argument("--keep", nargs="*", default=[], help="Extra model ids to keep")
+    prune.add_argument("--dry-run", action="store_true", help="Only show what would be removed")
+    sub.add_parser("compact", help="Reclaim space left by evicted/pruned entries")
+    sub.add_parser("clear", help="Delete every cached embedding")
+    args = parser.parse_args()
+
+    cache = get_embedding_cache()
+    if cache is None:
+        print("⚠️ Embedding cache is disabled in config (retrieval.embedding_cache.enabled).")
+        return
+
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"📦 Live: {stats['live_bytes'] / 1024**2:.1f} MB | Disk: {stats['disk_bytes'] / 1024**2:.1f} MB "
+              f"| Budget: {stats['max_bytes'] / 1024**2:.0f} MB")
+        for row in stats["by_model"]:
+            print(f"   {row['model']:<40} {row['mode']:<8} {row['entries']:>8} entries  {row['bytes'] / 1024**2:>8.1f} MB")
+
+    elif args.command == "prune":
+        # Imported here: embedding_client imports this module
+        from backend.models.embedding_client import configured_cache_model_ids
+        keep = set(configured_cache_model_ids()) | set(args.keep)
+        print(f"🔒 Keeping: {sorted(keep)}")
+        removed = cache.prune_models(keep, dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        for model, n in removed.items():
+            print(f"   🗑️ {verb} {n} entries for {model}")
+        if not removed:
+            print("✅ Nothing to prune.")
+
+    elif args.command == "compact":
+        cache.compact()
+        print("✅ Compaction complete.")
+
+    elif args.command == "clear":
+        cache.clear()
+        print("✅ Cache cleared.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 # Embedding model client
 from functools import lru_cache
-from typing import List, Literal, Dict, Any, Tuple
+from typing import List, Literal, Dict, Any, Tuple, Optional
 import os
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from FlagEmbedding import BGEM3FlagModel
 from huggingface_hub import snapshot_download
 
 from backend.core.config_loader import settings
+from backend.models.embedding_cache import get_embedding_cache
+from backend.core.utils import TTLCache, normalize_query, run_blocking
+from backend.models.batching import MicroBatcher, length_buckets
+from backend.models.runtime import (
+    get_embedder_backend,
+    device_for,
+    configure_threads,
+    quantize_int8,
+)
 
 # Map our simple names -> real HF IDs
 EMBEDDING_NAME_TO_HF_ID: Dict[str, str] = {
@@ -39,17 +49,71 @@ def _get_embedding_choice() -> Tuple[str, str]:
     return hf_id, short_name
 
 
+def build_sentence_transformer(hf_id: str, backend: str) -> SentenceTransformer:
+    """
+    Builds a dense encoder for the given backend (see backend/models/runtime.py).
+    Not cached: use get_sentence_transformer() unless you need a specific backend (benchmarks).
+    """
+    configure_threads()
+
+    if backend == "onnx":
+        # ONNX Runtime on CPU. sentence-transformers exports the model on first load if needed.
+        return SentenceTransformer(
+            hf_id,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"provider": "CPUExecutionProvider"},
+        )
+
+    model = SentenceTransformer(hf_id, device=device_for(backend))
+    if backend == "cpu-int8":
+        model[0].auto_model = quantize_int8(model[0].auto_model)
+    return model
+
+
+def build_sparse_model(hf_id: str, backend: str) -> BGEM3FlagModel:
+    """
+    Builds a BGE-M3 (FlagEmbedding) model for the given backend.
+    FlagEmbedding has no ONNX path, so 'onnx' runs as 'cpu-int8' for the sparse head.
+    """
+    configure_threads()
+
+    if backend == "onnx":
+        print("⚠️ ONNX backend is not available for BGE-M3 sparse encoding. Using 'cpu-int8'.")
+        backend = "cpu-int8"
+
+    # SMART DOWNLOAD: Download ONLY what we need (Skip the 2GB ONNX file)
+    local_path = snapshot_download(
+        repo_id=hf_id,
+        ignore_patterns=["*.onnx", "*.onnx_data", "flax_model.msgpack", "rust_model.ot", "pytorch_model.bin"],
+        resume_download=True
+    )
+
+    # fp16 is only a win on GPU; on CPU it is slower than fp32
+    model = BGEM3FlagModel(
+        model_name_or_path=local_path,
+        use_fp16=(backend == "cuda"),
+        device=device_for(backend),
+    )
+    if backend == "cpu-int8":
+        model.model = quantize_int8(model.model)
+    return model
+
+
 @lru_cache(maxsize=1)
 def get_sentence_transformer() -> SentenceTransformer:
     hf_id, _ = _get_embedding_choice()
+    backend = get_embedder_backend()
+    print(f"🧠 Loading Dense Model: {hf_id} (backend={backend})...")
     # Lazy-load & cache the model in memory
-    return SentenceTransformer(hf_id, device="cuda")
+    return build_sentence_transformer(hf_id, backend)
 
 
 @lru_cache(maxsize=1)
 def get_sparse_model() -> BGEM3FlagModel:
     """
-    Loads the BGE-M3 model specifically for sparse encoding.
+    Loads the single BGE-M3 (FlagEmbedding) instance of the process.
+    Used for sparse encoding and, when the embedder is bge-m3, for dense/ColBERT too (see embed_hybrid).
     """
     hf_id, short_name = _get_embedding_choice()
     
@@ -60,16 +124,275 @@ def get_sparse_model() -> BGEM3FlagModel:
         print(f"⚠️ Warning: Sparse embedding requested but model is {short_name}. Loading BGE-M3 for sparse.")
         hf_id = EMBEDDING_NAME_TO_HF_ID["bge-m3"]
 
-    print(f"🧠 Loading Sparse Model: {hf_id}...")
-    
-    # SMART DOWNLOAD: Download ONLY what we need (Skip the 2GB ONNX file)
-    local_path = snapshot_download(
-        repo_id=hf_id,
-        ignore_patterns=["*.onnx", "*.onnx_data", "flax_model.msgpack", "rust_model.ot", "pytorch_model.bin"],
-        resume_download=True
+    backend = get_embedder_backend()
+    print(f"🧠 Loading Sparse Model: {hf_id} (backend={backend})...")
+    return build_sparse_model(hf_id, backend)
+
+
+def _use_single_pass() -> bool:
+    """
+    True when one BGE-M3 forward pass can serve dense + sparse.
+    The ONNX backend keeps the dense SentenceTransformer export, so it cannot share the pass.
+    """
+    _, short_name = _get_embedding_choice()
+    return short_name == "bge-m3" and get_embedder_backend() != "onnx"
+
+
+def sparse_to_lists(weights: Dict[str, float]) -> Tuple[List[int], List[float]]:
+    """
+    Converts BGE-M3 lexical weights {token_id: weight} into (indices, values).
+    """
+    indices = [int(k) for k in weights.keys()]
+    values = [float(v) for v in weights.values()]
+    return indices, values
+
+
+def truncate_dense(vector, dims: int) -> List[float]:
+    """
+    First `dims` components of a dense vector, L2-renormalized (Matryoshka-style prefix).
+    Used for the cheap first ANN pass of two-stage dense search.
+    """
+    head = np.asarray(vector, dtype=np.float32)[:dims]
+    norm = float(np.linalg.norm(head))
+    return (head / norm if norm else head).tolist()
+
+
+def _cache_model_id(hf_id: str) -> str:
+    # Quantized / ONNX backends produce slightly different vectors, so they get their own entries
+    return f"{hf_id}@{get_embedder_backend()}"
+
+
+def configured_cache_model_ids() -> List[str]:
+    """Model ids the embedding cache should keep (everything else can be pruned)."""
+    hf_id, _ = _get_embedding_choice()
+    return sorted({_cache_model_id(hf_id), _cache_model_id(EMBEDDING_NAME_TO_HF_ID["bge-m3"])})
+
+
+def _cached_encode(mode: str, hf_id: str, texts: List[str], encode_fn, use_cache: bool = True) -> List[Any]:
+    """
+    Looks every text up in the on-disk cache and only runs `encode_fn` on the misses.
+    """
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return encode_fn(texts)
+
+    model_id = _cache_model_id(hf_id)
+    results = cache.get(model_id, mode, texts)
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        miss_texts = [texts[i] for i in missing]
+        fresh = encode_fn(miss_texts)
+        cache.put(model_id, mode, miss_texts, fresh)
+        for j, i in enumerate(missing):
+            results[i] = fresh[j]
+    return results
+
+
+def embed_hybrid(
+    texts: List[str],
+    return_dense: bool = True,
+    return_sparse: bool = True,
+    return_colbert: bool = False,
+    use_cache: bool = True,
+    is_query: bool = False,
+) -> Dict[str, Any]:
+    """
+    Runs ONE forward pass of the shared BGE-M3 instance and returns every requested representation.
+    Dense/sparse outputs go through the on-disk embedding cache unless `use_cache=False`
+    (queries) or ColBERT vectors are requested (not cached).
+    `is_query`: the texts are search queries, encoded like embed_queries() does (the bge-large
+    query instruction on the dense side); never cached, the cache holds document vectors.
+
+    Returns:
+        {
+            "dense": [[float, ...], ...]             (normalized, or None),
+            "sparse": [{token_id: weight}, ...]      (or None),
+            "colbert": [ndarray(n_tokens, 1024), ...] (or None),
+        }
+    """
+    if not texts:
+        return {
+            "dense": [] if return_dense else None,
+            "sparse": [] if return_sparse else None,
+            "colbert": [] if return_colbert else None,
+        }
+
+    cache = get_embedding_cache() if (use_cache and not return_colbert and not is_query) else None
+    if cache is None:
+        return _embed_hybrid_uncached(texts, return_dense, return_sparse, return_colbert, is_query)
+
+    dense_id = _cache_model_id(_get_embedding_choice()[0])
+    sparse_id = _cache_model_id(EMBEDDING_NAME_TO_HF_ID["bge-m3"])
+    dense = cache.get(dense_id, "dense", texts) if return_dense else None
+    sparse = cache.get(sparse_id, "sparse", texts) if return_sparse else None
+
+    dense_missing = [i for i, v in enumerate(dense) if v is None] if return_dense else []
+    sparse_missing = [i for i, v in enumerate(sparse) if v is None] if return_sparse else []
+    missing = sorted(set(dense_missing) | set(sparse_missing))
+
+    if missing:
+        # One pass over the union of misses, then store only what was actually missing
+        fresh = _embed_hybrid_uncached([texts[i] for i in missing], return_dense, return_sparse, False)
+        position = {i: j for j, i in enumerate(missing)}
+        if dense_missing:
+            new = [fresh["dense"][position[i]] for i in dense_missing]
+            cache.put(dense_id, "dense", [texts[i] for i in dense_missing], new)
+            for i, vec in zip(dense_missing, new):
+                dense[i] = vec
+        if sparse_missing:
+            new = [fresh["sparse"][position[i]] for i in sparse_missing]
+            cache.put(sparse_id, "sparse", [texts[i] for i in sparse_missing], new)
+            for i, vec in zip(sparse_missing, new):
+                sparse[i] = vec
+
+    return {"dense": dense, "sparse": sparse, "colbert": None}
+
+
+def _embed_hybrid_uncached(
+    texts: List[str],
+    return_dense: bool,
+    return_sparse: bool,
+    return_colbert: bool,
+    is_query: bool = False,
+) -> Dict[str, Any]:
+    if not _use_single_pass():
+        # Non BGE-M3 embedder (or ONNX dense): dense and sparse come from different models
+        if return_colbert:
+            raise ValueError("ColBERT vectors require the bge-m3 embedder on a torch backend.")
+        dense_texts = _dense_query_texts(texts) if is_query else texts
+        return {
+            "dense": _encode_dense(dense_texts) if return_dense else None,
+            "sparse": embed_sparse(texts, use_cache=False) if return_sparse else None,
+            "colbert": None,
+        }
+
+    model = get_sparse_model()
+    output = model.encode(
+        texts,
+        return_dense=return_dense,
+        return_sparse=return_sparse,
+        return_colbert_vecs=return_colbert,
     )
-    
-    return BGEM3FlagModel(model_name_or_path=local_path, use_fp16=True, device="cuda")
+    return {
+        # BGEM3FlagModel L2-normalizes dense vectors already
+        "dense": output["dense_vecs"].tolist() if return_dense else None,
+        "sparse": output["lexical_weights"] if return_sparse else None,
+        "colbert": output["colbert_vecs"] if return_colbert else None,
+    }
+
+
+def _encode_dense(texts: List[str]) -> List[List[float]]:
+    """Dense-only encoding through the SentenceTransformer path."""
+    model = get_sentence_transformer()
+    embeddings = model.encode(
+        texts,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+    )
+    return embeddings.tolist()
+
+
+@lru_cache(maxsize=1)
+def get_query_embedding_cache() -> Optional[TTLCache]:
+    """In-memory LRU + TTL cache for query embeddings (None when disabled)."""
+    if settings and settings.retrieval:
+        if not settings.retrieval.search_cache_enabled:
+            return None
+        return TTLCache(
+            max_entries=settings.retrieval.search_cache_max_entries,
+            ttl_seconds=settings.retrieval.search_cache_ttl_seconds,
+        )
+    return TTLCache()
+
+
+def embed_query(query_text: str) -> Dict[str, Any]:
+    """
+    Dense + sparse embedding of a single search query: {"dense": [...], "sparse": {token_id: weight}}.
+    Repeated (whitespace-normalized) queries are served from memory without touching the encoder.
+    """
+    return embed_query_batch([query_text])[0]
+
+
+def _encode_query_texts(texts: List[str], max_padding: float = 0.3) -> List[Dict[str, Any]]:
+    """
+    Dense + sparse vectors for already-normalized query texts, one dict per text.
+    Duplicates are encoded once; texts of similar length share a forward pass
+    (length_buckets), so a long query does not pad a batch of short ones.
+    """
+    unique = list(dict.fromkeys(texts))
+    encoded: Dict[str, Dict[str, Any]] = {}
+    for bucket in length_buckets([len(t) for t in unique], max_padding):
+        batch = [unique[i] for i in bucket]
+        vecs = embed_hybrid(batch, use_cache=False, is_query=True)
+        for j, text in enumerate(batch):
+            encoded[text] = {"dense": vecs["dense"][j], "sparse": vecs["sparse"][j]}
+    return [encoded[t] for t in texts]
+
+
+@lru_cache(maxsize=1)
+def get_query_batcher() -> Optional[MicroBatcher]:
+    """
+    Process-wide micro-batcher for query encoding (None when retrieval.query_batching is off):
+    concurrent searches queue their uncached queries for up to max_wait_ms and share forward passes.
+    """
+    if not settings or not settings.retrieval.query_batching_enabled:
+        return None
+    r = settings.retrieval
+    return MicroBatcher(
+        lambda texts: _encode_query_texts(texts, r.query_batching_max_padding),
+        max_batch_size=r.query_batching_max_batch_size,
+        max_wait_ms=r.query_batching_max_wait_ms,
+        max_queue=r.query_batching_max_queue,
+        name="query-encoder",
+    )
+
+
+def _lookup_queries(query_texts: List[str]) -> Tuple[List[str], List[Optional[Dict[str, Any]]], List[int]]:
+    """(normalized keys, cached results or None, indices still to encode)."""
+    keys = [normalize_query(q) for q in query_texts]
+    cache = get_query_embedding_cache()
+    results = [cache.get(k) if cache is not None else None for k in keys]
+    return keys, results, [i for i, r in enumerate(results) if r is None]
+
+
+def _store_queries(keys: List[str], results: list, missing: List[int], fresh: List[Dict[str, Any]]) -> list:
+    cache = get_query_embedding_cache()
+    for j, i in enumerate(missing):
+        results[i] = fresh[j]
+        if cache is not None:
+            cache.set(keys[i], fresh[j])
+    return results
+
+
+def embed_query_batch(query_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batched embed_query(): cached queries are served from memory, the misses are encoded
+    together (through the shared query batcher when enabled, so concurrent callers share
+    forward passes).
+    """
+    keys, results, missing = _lookup_queries(query_texts)
+    if missing:
+        miss_keys = [keys[i] for i in missing]
+        batcher = get_query_batcher()
+        fresh = batcher.run(miss_keys) if batcher is not None else _encode_query_texts(miss_keys)
+        _store_queries(keys, results, missing, fresh)
+    return results
+
+
+async def aembed_query_batch(query_texts: List[str], executor=None) -> List[Dict[str, Any]]:
+    """
+    embed_query_batch() for async callers. With the query batcher the coroutine simply awaits
+    its share of the batch; without it the encoding runs on `executor`.
+    """
+    batcher = get_query_batcher()
+    if batcher is None:
+        return await run_blocking(executor, embed_query_batch, query_texts)
+
+    keys, results, missing = _lookup_queries(query_texts)
+    if missing:
+        fresh = await batcher.arun([keys[i] for i in missing])
+        _store_queries(keys, results, missing, fresh)
+    return results
 
 
 def _apply_bge_query_prefix(texts: List[str]) -> List[str]:
@@ -78,6 +401,14 @@ def _apply_bge_query_prefix(texts: List[str]) -> List[str]:
     return [instruction + t for t in texts]
 
 
+def _dense_query_texts(texts: List[str]) -> List[str]:
+    """Queries as the dense model expects them: bge-large gets its instruction, BGE-M3 needs none."""
+    _, short_name = _get_embedding_choice()
+    if short_name == "bge-large":
+        return _apply_bge_query_prefix(texts)
+    return texts
+
+
 def embed_queries(texts: List[str]) -> List[List[float]]:
     """
     Embed user queries for retrieval.
@@ -85,52 +416,44 @@ def embed_queries(texts: List[str]) -> List[List[float]]:
     if not texts:
         return []
 
-    model = get_sentence_transformer()
-    _, short_name = _get_embedding_choice()
-
-    processed = texts
-
-    if short_name == "bge-large":
-        processed = _apply_bge_query_prefix(texts)
+    # BGE-M3 needs no query instruction: reuse the shared model instead of loading a second copy
+    if _use_single_pass():
+        return embed_hybrid(texts, return_sparse=False, use_cache=False)["dense"]
 
-    embeddings = model.encode(
-        processed,
-        normalize_embeddings=True,
-        convert_to_numpy=True,
-    )
-    return embeddings.tolist()
+    return _encode_dense(_dense_query_texts(texts))
 
 
-def embed_documents(texts: List[str]) -> List[List[float]]:
+def embed_documents(texts: List[str], use_cache: bool = True) -> List[List[float]]:
     """
-    Embed document chunks for indexing.
+    Embed document chunks for indexing (cache misses only).
     """
     if not texts:
         return []
 
-    model = get_sentence_transformer()
+    if _use_single_pass():
+        return embed_hybrid(texts, return_sparse=False, use_cache=use_cache)["dense"]
+
     # For documents we usually don't add the BGE query prefix; straight encoding works well.
-    embeddings = model.encode(
-        texts,
-        normalize_embeddings=True,
-        convert_to_numpy=True,
-    )
-    return embeddings.tolist()
+    hf_id, _ = _get_embedding_choice()
+    return _cached_encode("dense", hf_id, texts, _encode_dense, use_cache)
 
 
-def embed_sparse(texts: List[str]) -> List[Dict[str, float]]:
+def embed_sparse(texts: List[str], use_cache: bool = True) -> List[Dict[str, float]]:
     """
     Generates sparse vectors (lexical weights) for a list of texts using BGE-M3.
     """
     if not texts:
         return []
-        
-    model = get_sparse_model()
-    output = model.encode(
-        texts, 
-        return_dense=False, 
-        return_sparse=True, 
-        return_colbert_vecs=False
-    )
-    # Returns a list of dictionaries: [{'word_id': weight}, ...]
-    return output['lexical_weights']
+
+    def _encode(batch: List[str]) -> List[Dict[str, float]]:
+        model = get_sparse_model()
+        output = model.encode(
+            batch,
+            return_dense=False,
+            return_sparse=True,
+            return_colbert_vecs=False
+        )
+        # Returns a list of dictionaries: [{'word_id': weight}, ...]
+        return output['lexical_weights']
+
+    return _cached_encode("sparse", EMBEDDING_NAME_TO_HF_ID["bge-m3"], texts, _encode, use_cache)
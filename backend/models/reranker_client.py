@@ -0,0 +1,113 @@
+# Cross-encoder reranker client
+import os
+from functools import lru_cache
+from typing import List
+
+from sentence_transformers import CrossEncoder
+
+from backend.core.config_loader import settings
+from backend.models.runtime import (
+    get_reranker_backend,
+    device_for,
+    configure_threads,
+    quantize_int8,
+)
+
+DEFAULT_RERANKER_HF_ID = "BAAI/bge-reranker-v2-m3"
+
+
+def _get_reranker_id() -> str:
+    if settings and settings.retrieval:
+        return settings.retrieval.reranker_model
+    return os.getenv("RERANKER_MODEL_NAME", DEFAULT_RERANKER_HF_ID)
+
+
+def build_reranker(hf_id: str, max_length: int, backend: str) -> CrossEncoder:
+    """
+    Builds a cross-encoder for the given backend (see backend/models/runtime.py).
+    Not cached: use get_reranker() unless you need a specific backend (benchmarks).
+    """
+    configure_threads()
+
+    if backend == "onnx":
+        return CrossEncoder(
+            hf_id,
+            max_length=max_length,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"provider": "CPUExecutionProvider"},
+        )
+
+    model = CrossEncoder(hf_id, max_length=max_length, device=device_for(backend))
+    if backend == "cpu-int8":
+        model.model = quantize_int8(model.model)
+    return model
+
+
+@lru_cache(maxsize=None)
+def get_reranker(max_length: int = 512) -> CrossEncoder:
+    """
+    Lazy-load & cache the cross-encoder reranker.
+    One instance per max_length is kept for the lifetime of the process,
+    so every VectorDB backend and test harness shares the same weights.
+    """
+    hf_id = _get_reranker_id()
+    backend = get_reranker_backend()
+    print(f"⚖️ Loading Reranker: {hf_id} (max_length={max_length}, backend={backend})...")
+    return build_reranker(hf_id, max_length, backend)
+
+
+def rerank_text(payload: dict) -> str:
+    """
+    The text the cross-encoder sees for a hit: enriched 'search_content' if present,
+    else context summary + raw text.
+    """
+    doc_text = payload.get("search_content")
+    if not doc_text:
+        summary = payload.get("context_summary", "")
+        raw_text = payload.get("text", "")
+        doc_text = f"{summary}\n{raw_text}" if summary else raw_text
+    return doc_text
+
+
+def predict_bucketed(reranker: CrossEncoder, pairs: List[list], batch_size: int = 32) -> List[float]:
+    """
+    reranker.predict() with pairs sorted by length, so each forward pass pads to a
+    similar length instead of to the longest pair of a random mix. Scores are returned
+    in input order.
+    """
+    if not pairs:
+        return []
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+    sorted_scores = reranker.predict([pairs[i] for i in order], batch_size=batch_size)
+
+    scores = [0.0] * len(pairs)
+    for pos, i in enumerate(order):
+        scores[i] = float(sorted_scores[pos])
+    return scores
+
+
+def rerank_batch(reranker: CrossEncoder, queries: List[str], candidate_lists: List[list], limit: int) -> List[list]:
+    """
+    Reranks the candidates of several queries with ONE length-bucketed cross-encoder pass.
+    Each hit must expose `.payload` and a writable `.score`.
+    Returns the top `limit` hits per query, best first.
+    (No budget / early exit / truncation: see backend.retrieval.rerank_policy for that.)
+    """
+    pairs = []
+    for query_text, candidates in zip(queries, candidate_lists):
+        pairs.extend([query_text, rerank_text(hit.payload)] for hit in candidates)
+
+    if not pairs:
+        return [[] for _ in queries]
+
+    scores = predict_bucketed(reranker, pairs)
+
+    results, pos = [], 0
+    for candidates in candidate_lists:
+        for hit in candidates:
+            hit.score = float(scores[pos])
+            pos += 1
+        ranked = sorted(candidates, key=lambda x: x.score, reverse=True)
+        results.append(ranked[:limit])
+    return results
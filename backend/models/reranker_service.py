@@ -0,0 +1,243 @@
+# Shared reranker service: cross-request micro-batching of (query, doc) pairs
+"""
+Concurrent searches each rerank 10-25 pairs. Scoring them one `predict()` per request
+runs many tiny, badly padded forward passes back to back. The service queues the pairs
+of every caller for a few milliseconds and scores them as ONE length-bucketed batch.
+
+Modes (retrieval.reranker_service.mode):
+    off      each backend calls CrossEncoder.predict() directly (previous behaviour)
+    thread   in-process batcher thread in front of the shared CrossEncoder
+    process  local worker process that owns the model; every app process on the
+             host connects to it, so their requests are batched together:
+
+                 RERANKER_SERVICE_AUTHKEY=<secret> python -m backend.models.reranker_service serve
+
+             Clients need the same RERANKER_SERVICE_AUTHKEY. Messages are JSON (never
+             pickle), and the worker only binds to loopback unless allow_remote is set.
+
+Every mode hands the backends an object with `predict(pairs, batch_size=...)` and
+`max_length`, so RerankPolicy / ContextBuilder do not know which one they got.
+"""
+import os
+import json
+import argparse
+import ipaddress
+import threading
+from functools import lru_cache
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+from typing import Dict, List, Tuple
+
+from backend.core.config_loader import settings
+from backend.models.batching import MicroBatcher
+from backend.models.reranker_client import get_reranker, predict_bucketed
+
+DEFAULT_ADDRESS = "127.0.0.1:6390"
+AUTHKEY_ENV = "RERANKER_SERVICE_AUTHKEY"
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def _authkey() -> bytes:
+    """Shared secret of the worker and its clients; there is deliberately no default."""
+    key = os.getenv(AUTHKEY_ENV)
+    if not key:
+        raise ValueError(f"❌ {AUTHKEY_ENV} is not set: the reranker worker and its clients need a shared secret.")
+    return key.encode("utf-8")
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _send(conn, message):
+    conn.send_bytes(json.dumps(message, default=float).encode("utf-8"))
+
+
+def _recv(conn):
+    # JSON instead of Connection.recv(): nothing a peer sends is ever unpickled
+    return json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES))
+
+
+class RerankerService:
+    """In-process micro-batcher in front of the shared cross-encoder for `max_length`."""
+
+    def __init__(self, max_length: int = 512, max_batch_pairs: int = 128, max_wait_ms: float = 3.0, batch_size: int = 32):
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.model = get_reranker(max_length=max_length)
+        self.batcher = MicroBatcher(
+            self._score,
+            max_batch_size=max_batch_pairs,
+            max_wait_ms=max_wait_ms,
+            name=f"reranker-{max_length}",
+        )
+
+    def _score(self, pairs: List[list]) -> List[float]:
+        return predict_bucketed(self.model, pairs, batch_size=self.batch_size)
+
+    def predict(self, pairs: List[list], batch_size: int = None, **kwargs) -> List[float]:
+        # batch_size belongs to the coalesced batch, not to one caller
+        return self.batcher.run([list(p) for p in pairs])
+
+    async def apredict(self, pairs: List[list]) -> List[float]:
+        return await self.batcher.arun([list(p) for p in pairs])
+
+    def stats(self) -> Dict:
+        return {"mode": "thread", "max_length": self.max_length, **self.batcher.stats()}
+
+
+class RemoteReranker:
+    """
+    Client of `serve()`: one connection per calling thread, so concurrent callers reach
+    the worker's batcher concurrently.
+    """
+
+    def __init__(self, max_length: int = 512, address: str = DEFAULT_ADDRESS):
+        self.max_length = max_length
+        self.address = _parse_address(address)
+        self._authkey = _authkey()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self._authkey)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, message: tuple):
+        try:
+            conn = self._connection()
+            _send(conn, message)
+            status, result = _recv(conn)
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise ConnectionError(f"❌ Reranker worker at {self.address[0]}:{self.address[1]} is not reachable")
+        if status != "ok":
+            raise RuntimeError(f"❌ Reranker worker error: {result}")
+        return result
+
+    def predict(self, pairs: List[list], batch_size: int = None, **kwargs) -> List[float]:
+        if not len(pairs):
+            return []
+        return self._call(["predict", self.max_length, [list(p) for p in pairs]])
+
+    def stats(self) -> Dict:
+        try:
+            return {**self._call(["stats", self.max_length, None]), "mode": "process"}
+        except ConnectionError as e:
+            return {"mode": "process", "error": str(e)}
+
+
+# --- Worker process ---
+def _handle(conn, authkey: bytes, services: Dict[int, RerankerService], lock: threading.Lock, config: dict):
+    def _service(max_length: int) -> RerankerService:
+        with lock:
+            if max_length not in services:
+                services[max_length] = RerankerService(max_length=max_length, **config)
+            return services[max_length]
+
+    with conn:
+        # The HMAC handshake Listener(authkey=...) would run inside accept(): done here instead,
+        # so a port scan or a client with the wrong key only ends its own thread
+        try:
+            deliver_challenge(conn, authkey)
+            answer_challenge(conn, authkey)
+        except (AuthenticationError, EOFError, OSError) as e:
+            print(f"⚠️ Rejected reranker client ({type(e).__name__}: {e})")
+            return
+        while True:
+            try:
+                command, max_length, pairs = _recv(conn)
+            except (EOFError, OSError, ValueError, TypeError):
+                return  # Disconnected, or not a [command, max_length, pairs] message
+            try:
+                if command == "predict":
+                    _send(conn, ["ok", _service(int(max_length)).predict(pairs)])
+                elif command == "stats":
+                    service = services.get(max_length)
+                    _send(conn, ["ok", service.stats() if service else {"max_length": max_length, "requests": 0}])
+                else:
+                    _send(conn, ["error", f"unknown command '{command}'"])
+            except Exception as e:
+                _send(conn, ["error", repr(e)])
+
+
+def serve(address: str = DEFAULT_ADDRESS, max_batch_pairs: int = 128, max_wait_ms: float = 3.0, batch_size: int = 32,
+          allow_remote: bool = False):
+    """
+    Runs the worker: one model + batcher per requested max_length (loaded on first use),
+    one thread per client connection feeding the shared batchers.
+    Refuses to bind to a non-loopback address unless `allow_remote`.
+    """
+    host, port = _parse_address(address)
+    if not allow_remote and not _is_loopback(host):
+        raise ValueError(f"❌ Refusing to serve on non-loopback address {address} (pass --allow-remote to override).")
+    authkey = _authkey()
+    config = {"max_batch_pairs": max_batch_pairs, "max_wait_ms": max_wait_ms, "batch_size": batch_size}
+    services: Dict[int, RerankerService] = {}
+    lock = threading.Lock()
+
+    with Listener((host, port)) as listener:
+        print(f"⚖️ Reranker worker listening on {address} (max_batch_pairs={max_batch_pairs}, max_wait_ms={max_wait_ms})")
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError as e:
+                print(f"⚠️ accept() failed: {e}")
+                continue
+            threading.Thread(target=_handle, args=(conn, authkey, services, lock, config), daemon=True).start()
+
+
+# --- Accessor ---
+@lru_cache(maxsize=None)
+def get_rerank_scorer(max_length: int = 512):
+    """
+    What the backends score pairs with, per retrieval.reranker_service.mode:
+    the bare CrossEncoder ("off"), a RerankerService ("thread") or a RemoteReranker ("process").
+    """
+    if not settings:
+        return get_reranker(max_length=max_length)
+    r = settings.retrieval
+    if r.reranker_service_mode == "thread":
+        return RerankerService(
+            max_length=max_length,
+            max_batch_pairs=r.reranker_service_max_batch_pairs,
+            max_wait_ms=r.reranker_service_max_wait_ms,
+            batch_size=r.rerank_batch_size,
+        )
+    if r.reranker_service_mode == "process":
+        return RemoteReranker(max_length=max_length, address=r.reranker_service_address)
+    return get_reranker(max_length=max_length)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the shared reranker worker process.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve", help="Load the cross-encoder and serve batched predict() calls")
+    srv.add_argument("--address", default=None, help="host:port (default: retrieval.reranker_service.address)")
+    srv.add_argument("--allow-remote", action="store_true", help="Allow binding to a non-loopback address")
+    args = parser.parse_args()
+
+    r = settings.retrieval if settings else None
+    serve(
+        address=args.address or (r.reranker_service_address if r else DEFAULT_ADDRESS),
+        max_batch_pairs=r.reranker_service_max_batch_pairs if r else 128,
+        max_wait_ms=r.reranker_service_max_wait_ms if r else 3.0,
+        batch_size=r.rerank_batch_size if r else 32,
+        allow_remote=args.allow_remote or (r.reranker_service_allow_remote if r else False),
+    )
+
+
+if __name__ == "__main__":
+    main()
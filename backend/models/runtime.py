@@ -0,0 +1,109 @@
+# Device / inference backend selection for local encoders (embedder + reranker)
+import os
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Tuple
+
+import torch
+
+from backend.core.config_loader import settings
+
+# cuda     -> GPU, fp16 where supported
+# cpu      -> plain fp32 PyTorch on CPU
+# cpu-int8 -> PyTorch on CPU with dynamic int8 quantization of every nn.Linear
+# onnx     -> ONNX Runtime (CPUExecutionProvider) through sentence-transformers
+SUPPORTED_BACKENDS: Tuple[str, ...] = ("cuda", "cpu", "cpu-int8", "onnx")
+ONNX_PACKAGES: Tuple[str, ...] = ("onnxruntime", "optimum")
+
+_threads_configured = False
+
+
+def _validate(backend: str) -> str:
+    backend = (backend or "cuda").lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(
+            f"Unsupported inference backend={backend!r}. "
+            f"Allowed: {list(SUPPORTED_BACKENDS)}"
+        )
+    return backend
+
+
+def _check_onnx_installed():
+    """The 'onnx' backend needs packages torch-only installs lack: fail at startup, not at first load."""
+    missing = [name for name in ONNX_PACKAGES if importlib.util.find_spec(name) is None]
+    if missing:
+        raise ImportError(
+            f"❌ Backend 'onnx' requires {', '.join(missing)}. "
+            f"Install with: pip install onnxruntime 'optimum[onnxruntime]' (see requirements.txt), "
+            f"or pick another backend ({', '.join(b for b in SUPPORTED_BACKENDS if b != 'onnx')})."
+        )
+
+
+def resolve_backend(requested: str) -> str:
+    """
+    Validates the requested backend and degrades 'cuda' to 'cpu' on machines without a GPU,
+    so CPU-only retrieval nodes can start with the default config.
+    """
+    backend = _validate(requested)
+    if backend == "onnx":
+        _check_onnx_installed()
+    if backend == "cuda" and not torch.cuda.is_available():
+        print("⚠️ Backend 'cuda' requested but no GPU detected. Falling back to 'cpu'.")
+        return "cpu"
+    return backend
+
+
+def get_embedder_backend() -> str:
+    if settings and settings.retrieval:
+        return resolve_backend(settings.retrieval.embedder_backend)
+    return resolve_backend(os.getenv("EMBEDDER_BACKEND", "cuda"))
+
+
+def get_reranker_backend() -> str:
+    if settings and settings.retrieval:
+        return resolve_backend(settings.retrieval.reranker_backend)
+    return resolve_backend(os.getenv("RERANKER_BACKEND", "cuda"))
+
+
+def device_for(backend: str) -> str:
+    """Torch device string for a backend name."""
+    return "cuda" if backend == "cuda" else "cpu"
+
+
+def configure_threads(num_threads: int = None):
+    """
+    Applies the CPU thread-count setting once per process.
+    0/None keeps torch's default (all physical cores).
+    """
+    global _threads_configured
+    if _threads_configured:
+        return
+
+    if num_threads is None:
+        num_threads = settings.retrieval.inference_threads if settings and settings.retrieval else 0
+
+    if num_threads and num_threads > 0:
+        torch.set_num_threads(num_threads)
+        print(f"🧵 CPU inference threads set to {num_threads}")
+    _threads_configured = True
+
+
+def quantize_int8(module: torch.nn.Module) -> torch.nn.Module:
+    """
+    Dynamic int8 quantization of all Linear layers (weights int8, activations quantized on the fly).
+    Only meaningful on CPU.
+    """
+    module.eval()
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+@lru_cache(maxsize=None)
+def get_inference_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool for encoder/reranker calls made from async code.
+    Keeps CPU/GPU-bound model work off the event loop without letting N concurrent
+    conversations run N forward passes at once.
+    """
+    max_workers = settings.retrieval.inference_workers if settings and settings.retrieval else 2
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="inference")
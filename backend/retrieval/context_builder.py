@@ -1 +1,193 @@
 # Build context for generation
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.dependencies import get_vector_db
+from backend.models.reranker_client import predict_bucketed, rerank_text
+from backend.models.reranker_service import get_rerank_scorer
+
+
+def hit_position(hit) -> Tuple[Optional[str], Optional[int]]:
+    """(doc_id, chunk_index) of a search hit: Postgres SearchResult columns or Qdrant payload fields."""
+    doc_id = getattr(hit, "doc_id", None)
+    chunk_index = getattr(hit, "chunk_index", None)
+    if doc_id is None or chunk_index is None:
+        payload = hit.payload or {}
+        meta = payload.get("metadata") or {}
+        doc_id = payload.get("source") or meta.get("source")
+        chunk_index = payload.get("chunk_index", meta.get("chunk_index"))
+    return doc_id, chunk_index
+
+
+def coalesce_spans(spans: List[tuple]) -> List[tuple]:
+    """
+    Merges overlapping or adjacent (doc_id, lo, hi, score) chunk ranges of the same document,
+    keeping the best hit score, so two hits a chunk apart produce one window instead of two.
+    """
+    merged = []
+    for doc_id, lo, hi, score in sorted(spans, key=lambda s: (str(s[0]), s[1])):
+        if merged and merged[-1][0] == doc_id and lo <= merged[-1][2] + 1:
+            _, prev_lo, prev_hi, prev_score = merged[-1]
+            merged[-1] = (doc_id, prev_lo, max(prev_hi, hi), max(prev_score, score))
+        else:
+            merged.append((doc_id, lo, hi, score))
+    return merged
+
+
+def _suffix_overlap(text: str, next_text: str, max_overlap: int) -> int:
+    """Longest prefix of next_text (<= max_overlap + slack chars) that ends `text`. Legacy fallback only."""
+    for size in range(min(len(next_text), max_overlap + 50), 10, -1):
+        if text.endswith(next_text[:size]):
+            return size
+    return 0
+
+
+def stitch_chunks(rows: List[tuple], chunk_overlap: int = 100) -> str:
+    """
+    Concatenates consecutive chunks of one document without repeating their overlap.
+    `rows` are (id, chunk_index, text, start_char) in chunk order.
+
+    With start offsets (written by the Chunker) the overlap is known exactly:
+    end of the text so far minus the start of the next chunk. Rows without offsets fall back
+    to a suffix match bounded by `chunk_overlap`.
+    """
+    merged, end, prev_index = "", None, None
+
+    for _, index, text, start in rows:
+        if not merged:
+            merged = text
+        elif prev_index is not None and index != prev_index + 1:
+            # Missing chunk in between: never glue across the gap
+            merged += "\n...\n" + text
+        elif start is not None and end is not None:
+            if start >= end:
+                merged += "\n" + text
+            else:
+                merged += text[end - start:]
+        else:
+            overlap = _suffix_overlap(merged, text, chunk_overlap)
+            merged += text[overlap:] if overlap else "\n" + text
+
+        # Chunks are in document order, so the latest chunk always ends the stitched text
+        end = start + len(text) if start is not None else None
+        prev_index = index
+
+    return merged
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        db_client=None,
+        window_before: int = 0,
+        window_after: int = 2,
+        chunk_overlap: int = 100,
+        reranker=None,
+    ):
+        """
+        Expands search hits into neighbour windows and stitches them into generation contexts.
+        Works with both stores through VectorDBClient.search_many() / fetch_windows().
+
+        Args:
+            window_before / window_after: chunks to add before/after each hit (same document).
+            chunk_overlap: the Chunker's overlap, only used for rows without start offsets.
+            reranker: cross-encoder for the stitched windows (defaults to the shared 4096-token one).
+        """
+        self.db_client = db_client or get_vector_db()
+        self.window_before = window_before
+        self.window_after = window_after
+        self.chunk_overlap = chunk_overlap
+        self._reranker = reranker
+
+    @property
+    def reranker(self):
+        if self._reranker is None:
+            self._reranker = get_rerank_scorer(max_length=4096)
+        return self._reranker
+
+    def build(self, query: str, top_k: int = 3, filters: dict = None) -> List[Dict[str, Any]]:
+        return self.build_many([query], top_k=top_k, filters=filters)[0]
+
+    def build_many(self, queries: List[str], top_k: int = 3, filters: dict = None) -> List[List[Dict[str, Any]]]:
+        """
+        Returns, per query, a list of {"text", "source", "chunk_range", "retrieval_score", "score"}
+        sorted by reranker score (best first). `filters` restricts the hits (backend.indexing.filters DSL).
+        """
+        # 1. Hybrid search for every query (one batched call)
+        hit_lists = self.db_client.search_many(queries, limit=top_k, filters=filters)
+
+        # 2. One window per hit, overlapping/adjacent windows coalesced per query
+        spans_per_query, loose_per_query = [], []
+        for hits in hit_lists:
+            spans, loose = [], []
+            for hit in hits:
+                doc_id, index = hit_position(hit)
+                if doc_id is None or index is None:
+                    loose.append(hit)
+                    continue
+                spans.append((doc_id, max(0, index - self.window_before), index + self.window_after, hit.score))
+            spans_per_query.append(coalesce_spans(spans))
+            loose_per_query.append(loose)
+
+        # 3. ONE neighbour fetch for every window of every query (shared windows fetched once)
+        unique_windows = list(dict.fromkeys(
+            (doc_id, lo, hi) for spans in spans_per_query for doc_id, lo, hi, _ in spans
+        ))
+        fetched = dict(zip(unique_windows, self.db_client.fetch_windows(unique_windows))) if unique_windows else {}
+
+        # 4. Stitch
+        contexts_per_query = []
+        for spans, loose in zip(spans_per_query, loose_per_query):
+            contexts = []
+            for doc_id, lo, hi, score in spans:
+                rows = fetched.get((doc_id, lo, hi))
+                if not rows:
+                    continue
+                contexts.append({
+                    "text": stitch_chunks(rows, self.chunk_overlap),
+                    "source": doc_id,
+                    "chunk_range": (rows[0][1], rows[-1][1]),
+                    "retrieval_score": score,
+                })
+            # Hits without a position (legacy rows) are used as-is
+            for hit in loose:
+                payload = hit.payload or {}
+                contexts.append({
+                    "text": rerank_text(payload),
+                    "source": payload.get("source") or (payload.get("metadata") or {}).get("source", "Unknown"),
+                    "chunk_range": None,
+                    "retrieval_score": hit.score,
+                })
+            contexts_per_query.append(contexts)
+
+        # 5. Rerank every stitched window of every query in one cross-encoder call
+        self._rerank(queries, contexts_per_query)
+        return contexts_per_query
+
+    def _rerank(self, queries: List[str], contexts_per_query: List[List[Dict[str, Any]]]):
+        pairs = [[q, c["text"]] for q, contexts in zip(queries, contexts_per_query) for c in contexts]
+        if not pairs:
+            return
+
+        start = time.time()
+        scores = predict_bucketed(self.reranker, pairs)
+        pos = 0
+        for contexts in contexts_per_query:
+            for c in contexts:
+                c["score"] = float(scores[pos])
+                pos += 1
+            contexts.sort(key=lambda c: c["score"], reverse=True)
+        print(f"📊 Re-ranking {len(pairs)} windows took {time.time() - start:.4f}s")
+
+
+if __name__ == "__main__":
+    print("--- TEST: stitch_chunks ---")
+    text = "Article 1. The fortune limit is 4000 CHF. Article 2. The base amount is 977 CHF per month."
+    rows = [
+        (1, 0, text[0:45], 0),
+        (2, 1, text[30:75], 30),
+        (3, 2, text[60:], 60),
+    ]
+    stitched = stitch_chunks(rows)
+    print(f"✅ Exact reconstruction: {stitched == text}")
+    print(coalesce_spans([("a", 0, 2, 0.5), ("a", 3, 5, 0.9), ("b", 1, 3, 0.1), ("a", 10, 12, 0.2)]))
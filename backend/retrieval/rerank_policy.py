@@ -0,0 +1,198 @@
+# Cross-encoder stage policy: candidate budgets, early exit, truncation, metrics
+import copy
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from backend.core.config_loader import settings
+from backend.models.reranker_client import predict_bucketed, rerank_text
+
+
+class RerankMetrics:
+    """Bounded, thread-safe log of the last N per-query rerank decisions."""
+
+    def __init__(self, window: int = 1000):
+        self._records = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._records.append(entry)
+
+    def recent(self, n: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._records)[-n:]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return {"queries": 0}
+
+        n = len(records)
+        return {
+            "queries": n,
+            "by_class": dict(Counter(r["query_class"] for r in records)),
+            "early_exit_rate": round(sum(r["early_exit"] for r in records) / n, 4),
+            "avg_candidates": round(sum(r["candidates"] for r in records) / n, 2),
+            "avg_reranked": round(sum(r["reranked"] for r in records) / n, 2),
+            "truncated_docs": sum(r["truncated"] for r in records),
+            "by_score_source": dict(Counter(r["score_source"] for r in records)),
+            "avg_rerank_ms": round(sum(r["rerank_ms"] for r in records) / n, 2),
+        }
+
+
+class RerankPolicy:
+    def __init__(
+        self,
+        budgets: Dict[str, int] = None,
+        short_query_words: int = 4,
+        long_query_words: int = 30,
+        early_exit_gap: float = 0.0,
+        batch_size: int = 32,
+        chars_per_token: float = 3.5,
+        metrics_window: int = 1000,
+    ):
+        """
+        Decides, per query, how much cross-encoder work a search gets:
+        - candidate budget by query class (short keyword-like / default / long multi-part)
+        - early exit when the fused (RRF) ranking is already decisive
+        - document text cut to the reranker's token window before tokenization
+        - length-sorted batches (predict_bucketed) to cut padding
+        Every decision is recorded in `metrics`.
+        """
+        self.budgets = {"short": 10, "default": 15, "long": 25, **(budgets or {})}
+        self.short_query_words = short_query_words
+        self.long_query_words = long_query_words
+        self.early_exit_gap = early_exit_gap
+        self.batch_size = batch_size
+        self.chars_per_token = chars_per_token
+        self.metrics = RerankMetrics(metrics_window)
+
+    # --- Budget ---
+    def query_class(self, query: str) -> str:
+        words = len(query.split())
+        if words <= self.short_query_words:
+            return "short"
+        if words >= self.long_query_words:
+            return "long"
+        return "default"
+
+    def budget(self, query: str) -> int:
+        return self.budgets[self.query_class(query)]
+
+    def candidate_limit(self, queries: List[str]) -> int:
+        """One candidate limit for a batched DB query (the largest budget of the batch)."""
+        return max((self.budget(q) for q in queries), default=self.budgets["default"])
+
+    # --- Early exit ---
+    def fused_gap(self, candidates: list) -> Optional[float]:
+        """Relative gap between the top-2 fused scores, or None if there is no runner-up."""
+        if len(candidates) < 2:
+            return None
+        # Postgres returns the RRF sum as Decimal
+        top, second = float(candidates[0].score), float(candidates[1].score)
+        if top <= 0:
+            return None
+        return (top - second) / top
+
+    def _early_exit(self, gap: Optional[float]) -> bool:
+        return bool(self.early_exit_gap) and gap is not None and gap >= self.early_exit_gap
+
+    @staticmethod
+    def normalize_fused(candidates: list):
+        """
+        Fused (RRF) scores scaled to (0, 1] relative to the top hit, in place: raw RRF sums are
+        ~0.03, far below the cross-encoder's [0, 1], so early-exit hits would look irrelevant next
+        to reranked ones (score thresholds, retrieval_score in the contexts).
+        """
+        top = float(candidates[0].score) if candidates else 0.0
+        for hit in candidates:
+            hit.score = float(hit.score) / top if top > 0 else 0.0
+
+    # --- Truncation ---
+    def doc_char_limit(self, reranker, query: str) -> int:
+        """Characters of document text that can still fit in max_length next to the query."""
+        max_length = getattr(reranker, "max_length", None) or 512
+        query_tokens = len(query) / self.chars_per_token
+        return max(1, int((max_length - query_tokens - 4) * self.chars_per_token))
+
+    # --- Rerank ---
+    def rerank(self, reranker, queries: List[str], candidate_lists: List[list], limit: int) -> List[list]:
+        """
+        Drop-in replacement for reranker_client.rerank_batch(): `candidate_lists` are the
+        fused hits (best first) per query. Returns the top `limit` hits per query, best first.
+        Reranked hits get the cross-encoder score; early-exit hits get their fused score
+        normalized (normalize_fused), and the decision records which one (score_source).
+        The returned hits are copies: the input hits may be shared (search result cache).
+        """
+        decisions, pairs, owners = [], [], []
+
+        for qi, (query, candidates) in enumerate(zip(queries, candidate_lists)):
+            qclass = self.query_class(query)
+            candidates = [copy.copy(hit) for hit in candidates[:self.budgets[qclass]]]
+            gap = self.fused_gap(candidates)
+            early_exit = self._early_exit(gap)
+
+            truncated = 0
+            if not early_exit:
+                char_limit = self.doc_char_limit(reranker, query)
+                for hit in candidates:
+                    text = rerank_text(hit.payload)
+                    if len(text) > char_limit:
+                        text = text[:char_limit]
+                        truncated += 1
+                    pairs.append([query, text])
+                    owners.append((qi, hit))
+
+            decisions.append({
+                "query_class": qclass,
+                "candidates": len(candidates),
+                "top_gap": round(gap, 4) if gap is not None else None,
+                "early_exit": early_exit,
+                "score_source": "fused" if early_exit else "cross_encoder",
+                "reranked": 0 if early_exit else len(candidates),
+                "truncated": truncated,
+                "candidates_list": candidates,
+            })
+
+        start = time.time()
+        scores = predict_bucketed(reranker, pairs, batch_size=self.batch_size)
+        rerank_ms = 1000 * (time.time() - start)
+        for (qi, hit), score in zip(owners, scores):
+            hit.score = score
+
+        results = []
+        for decision in decisions:
+            candidates = decision.pop("candidates_list")
+            if decision["early_exit"]:
+                self.normalize_fused(candidates)
+            else:
+                candidates = sorted(candidates, key=lambda x: x.score, reverse=True)
+            results.append(candidates[:limit])
+
+            # Batch time attributed by share of reranked pairs
+            share = decision["reranked"] / len(pairs) if pairs else 0.0
+            decision["rerank_ms"] = round(rerank_ms * share, 2)
+            self.metrics.record(decision)
+
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_rerank_policy() -> RerankPolicy:
+    """Process-wide policy (and metrics) built from retrieval.rerank_policy."""
+    if not settings:
+        return RerankPolicy()
+    r = settings.retrieval
+    return RerankPolicy(
+        budgets=r.rerank_budgets,
+        short_query_words=r.rerank_short_query_words,
+        long_query_words=r.rerank_long_query_words,
+        early_exit_gap=r.rerank_early_exit_gap,
+        batch_size=r.rerank_batch_size,
+        chars_per_token=r.rerank_chars_per_token,
+        metrics_window=r.rerank_metrics_window,
+    )
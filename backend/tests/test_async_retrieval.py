@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import services, get_async_vector_db
+from backend.langgraph_flow.nodes.node_retrieve import aretrieve
+from backend.tests.test_search_simple import queries
+
+CONCURRENCY = 16
+
+
+async def main():
+    print(f"🧪 STARTING ASYNC RETRIEVAL TEST ({CONCURRENCY} concurrent conversations)")
+    print("============================================================")
+
+    client = await get_async_vector_db()
+    print(f"✅ Async client ready (Provider: {client.provider.upper()}). Ping: {await client.ping()}")
+
+    batch = queries[:CONCURRENCY]
+    start = time.time()
+    states = await asyncio.gather(*(aretrieve({"question": q, "steps": []}) for q in batch))
+    elapsed = time.time() - start
+
+    for q, state in zip(batch, states):
+        print(f"   {len(state['documents'])} docs | {q[:60]}...")
+    print(f"✅ {len(batch)} concurrent retrievals in {elapsed:.2f}s ({len(batch) / elapsed:.2f} q/s)")
+
+    await services.ashutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
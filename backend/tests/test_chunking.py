@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import json
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.ingestion.loaders.pdf_loader import PDFLoader
+from backend.ingestion.pipeline.chunking import Chunker, TokenChunker, get_tokenizer, split_pieces
+from backend.models.batching import percentile
+
+N_LARGEST = 3
+
+
+def test_split_pieces():
+    """Pieces tile the text exactly, cut after sentence ends, line and paragraph breaks."""
+    text = "A b. C d\n\nE\nf"
+    pieces = split_pieces(text)
+    assert pieces == [(0, 5, 1), (5, 10, 2), (10, 12, 1), (12, 13, 2)]
+    assert "".join(text[s:e] for s, e, _ in pieces) == text
+
+
+def token_sizes(chunks) -> dict:
+    """Real BGE-M3 token counts of the chunk texts (one batched call)."""
+    counts = [len(ids) for ids in get_tokenizer()([c["text"] for c in chunks], add_special_tokens=False)["input_ids"]]
+    return {"p50": percentile(counts, 50), "p99": percentile(counts, 99), "max": max(counts)}
+
+
+def main():
+    """RecursiveCharacterTextSplitter (chars) vs TokenChunker (tokens) on the largest PDFs of data/pdfs."""
+    print("🧪 STARTING CHUNKER BENCHMARK")
+    print("============================================================")
+    files = sorted(Path("data/pdfs").glob("*.pdf"), key=lambda p: p.stat().st_size, reverse=True)[:N_LARGEST]
+    if not files:
+        print("❌ Error: No PDFs found in 'data/pdfs'.")
+        return
+    test_split_pieces()
+
+    loader = PDFLoader()
+    documents = [loader.load_document(str(path)) for path in files]
+    total_chars = sum(len(d["text"]) for d in documents)
+    print(f"📄 {len(files)} largest PDFs, {total_chars / 1e6:.2f}M characters")
+
+    get_tokenizer()  # Load outside the timed section
+    chunkers = {
+        "recursive (1024 chars)": Chunker(chunk_size=1024, chunk_overlap=200),
+        "tokens (256 tokens)": TokenChunker(chunk_size=256, chunk_overlap=48),
+    }
+    results = {}
+    for name, chunker in chunkers.items():
+        start = time.perf_counter()
+        chunks = [c for d in documents for c in chunker.chunk_text(d["text"], {"source": d["source"]}, pages=d["pages"])]
+        seconds = time.perf_counter() - start
+        exact = all(
+            c["text"] == d["text"][c["metadata"]["start_char"]:c["metadata"]["end_char"]]
+            for d in documents
+            for c in chunker.chunk_text(d["text"], {"source": d["source"]}, pages=d["pages"])
+        )
+        sizes = token_sizes(chunks)
+        results[name] = {"seconds": round(seconds, 3), "chunks": len(chunks), "exact_offsets": exact, "tokens": sizes}
+        print(f"   {name:<24} | {seconds:>6.2f}s | {total_chars / seconds / 1e6:>5.2f}M chars/s | {len(chunks):>5} chunks "
+              f"| tokens p50 {sizes['p50']:.0f} p99 {sizes['p99']:.0f} max {sizes['max']} | exact offsets: {exact}")
+
+    # Linear time: chunking the same text repeated k times should take ~k times as long
+    text = documents[0]["text"]
+    chunker = chunkers["tokens (256 tokens)"]
+    for k in (1, 2, 4):
+        start = time.perf_counter()
+        chunker.chunk_text(text * k)
+        print(f"   📈 {k}x {files[0].name}: {time.perf_counter() - start:.2f}s")
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/chunking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import json
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import get_vector_db
+from backend.core.config_loader import settings
+from backend.models.embedding_client import embed_query_batch, truncate_dense
+from backend.tests.test_search_simple import queries
+
+TOP_K = 15
+PREFETCH_LIMITS = [15, 30, 60, 100, 200]
+
+
+# --- Qdrant ---
+def qdrant_top_k(db, dense, mode, prefetch_limit=None):
+    from qdrant_client.http import models
+    from backend.indexing.qdrant_client import prefetch_vector_name
+
+    if mode == "exact":
+        kwargs = {"query": dense, "using": "dense", "search_params": models.SearchParams(exact=True)}
+    elif mode == "full":
+        kwargs = {"query": dense, "using": "dense"}
+    else:
+        kwargs = {
+            "prefetch": models.Prefetch(
+                query=truncate_dense(dense, db.prefetch_dims),
+                using=prefetch_vector_name(db.prefetch_dims),
+                limit=prefetch_limit,
+            ),
+            "query": dense,
+            "using": "dense",
+        }
+
+    start = time.time()
+    points = db.client.query_points(collection_name=db.collection_name, limit=TOP_K, **kwargs).points
+    return [p.id for p in points], time.time() - start
+
+
+# --- Postgres ---
+def postgres_top_k(db, dense, mode, prefetch_limit=None):
+    from psycopg2 import sql
+    from backend.indexing.postgres_client import format_dense, prefix_column, prefix_expression
+
+    table = sql.Identifier(db.table_name)
+    if mode in ("exact", "full"):
+        query = sql.SQL("SELECT id FROM {table} ORDER BY dense_vector <=> %s::vector LIMIT %s").format(table=table)
+        args = [format_dense(dense), TOP_K]
+    else:
+        query = sql.SQL("""
+            SELECT id FROM (
+                SELECT id, dense_vector FROM {table}
+                ORDER BY {col} <=> {prefix}
+                LIMIT %s
+            ) c
+            ORDER BY dense_vector <=> %s::vector
+            LIMIT %s
+        """).format(
+            table=table,
+            col=sql.Identifier(prefix_column(db.prefetch_dims)),
+            prefix=prefix_expression(sql.SQL("%s::vector"), db.prefetch_dims),
+        )
+        args = [format_dense(dense), prefetch_limit, format_dense(dense), TOP_K]
+
+    def _run(conn):
+        with conn.cursor() as cur:
+            if mode == "exact":
+                cur.execute("SET enable_indexscan = off;")
+            if prefetch_limit:
+                # The prefix scan cannot return more than ef_search rows
+                cur.execute("SET hnsw.ef_search = %s;", [max(prefetch_limit, db.hnsw_ef_search)])
+            try:
+                start = time.time()
+                cur.execute(query, args)
+                return [r[0] for r in cur.fetchall()], time.time() - start
+            finally:
+                cur.execute("RESET enable_indexscan;")
+                cur.execute("SET hnsw.ef_search = %s;", [db.hnsw_ef_search])
+
+    return db.pool.run(_run)
+
+
+def recall(results, exact):
+    scores = [len(set(ids) & set(e_ids)) / len(e_ids) for (ids, _), (e_ids, _) in zip(results, exact) if e_ids]
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def main():
+    """
+    Dense-leg recall@k against exact full-dimension search:
+    single-stage HNSW on 1024 dims vs two-stage (prefix HNSW + full rescoring) per prefetch limit.
+    """
+    dims = settings.retrieval.dense_prefetch_dims
+    print(f"🧪 STARTING TWO-STAGE DENSE RECALL BENCHMARK (k={TOP_K}, prefix={dims} dims)")
+    print("============================================================")
+    if not dims:
+        print("⚠️ retrieval.dense_prefetch.dims is 0: enable it (and migrate the Qdrant collection) first.")
+        return
+
+    client = get_vector_db()
+    db = client.client
+    if not db.prefetch_dims:
+        print("⚠️ The store has no prefix vector yet (see the warning above).")
+        return
+    top_k = postgres_top_k if client.provider == "postgres" else qdrant_top_k
+
+    dense_vecs = [v["dense"] for v in embed_query_batch(queries)]
+    exact = [top_k(db, d, "exact") for d in dense_vecs]
+
+    rows = [("exact", None, exact), ("full HNSW", None, [top_k(db, d, "full") for d in dense_vecs])]
+    for limit in PREFETCH_LIMITS:
+        rows.append((f"{dims}d -> 1024d", limit, [top_k(db, d, "two_stage", limit) for d in dense_vecs]))
+
+    report = {"provider": client.provider, "top_k": TOP_K, "prefix_dims": dims, "queries": len(queries), "results": []}
+    print(f"{'Mode':<16} | {'Prefetch':<8} | {'Recall@k':<9} | {'Avg ms':<8}")
+    print("-" * 60)
+    for mode, limit, results in rows:
+        r = recall(results, exact)
+        avg_ms = 1000 * sum(t for _, t in results) / len(results)
+        print(f"{mode:<16} | {str(limit or '-'):<8} | {r:<9.3f} | {avg_ms:<8.2f}")
+        report["results"].append({"mode": mode, "prefetch_limit": limit, "recall": round(r, 4), "avg_ms": round(avg_ms, 2)})
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/dense_prefetch_recall_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.ingestion.loaders.pdf_loader import PDFLoader
+from backend.ingestion.pipeline.chunking import Chunker
+from backend.ingestion.pipeline.contextual_enrichment import ContextualEnricher, neighbor_window
+
+N_CHUNKS = 40
+
+
+async def fixed_batches(enricher, chunks, batch_size=10):
+    """The previous ingest-script pattern: gather fixed batches, each waiting for its slowest call."""
+    results = []
+    for i in range(0, len(chunks), batch_size):
+        results.extend(await asyncio.gather(*[
+            enricher.enrich_chunk(c["text"], neighbor_window(chunks, i + j))
+            for j, c in enumerate(chunks[i:i + batch_size])
+        ], return_exceptions=True))
+    return results
+
+
+async def main():
+    """Fixed gather batches vs the worker pool (cache off), then a cached re-run (no LLM calls expected)."""
+    print("🧪 STARTING ENRICHMENT WORKER POOL TEST")
+    print("=" * 60)
+    pdf_files = sorted(Path("data/pdfs").glob("*.pdf"))
+    if not pdf_files:
+        print("❌ Error: No PDFs found in 'data/pdfs'.")
+        return
+
+    text = PDFLoader().load_file(str(pdf_files[0]))
+    chunks = Chunker(chunk_size=512, chunk_overlap=100).chunk_text(text, metadata={"source": pdf_files[0].name})[:N_CHUNKS]
+    print(f"📄 {pdf_files[0].name}: enriching {len(chunks)} chunks")
+
+    uncached = ContextualEnricher(max_concurrency=10, use_cache=False)
+    start = time.time()
+    await fixed_batches(uncached, chunks)
+    print(f"🐢 Fixed batches of 10:     {time.time() - start:.1f}s")
+
+    start = time.time()
+    await uncached.enrich_chunks(chunks)
+    print(f"🚀 Worker pool (10 in flight): {time.time() - start:.1f}s")
+
+    cached = ContextualEnricher(max_concurrency=10)
+    await cached.enrich_chunks(chunks)  # Fills the cache if needed
+    calls_before = cached.llm_calls
+    start = time.time()
+    await cached.enrich_chunks(chunks)
+    print(f"🗃️ Cached re-run:           {time.time() - start:.2f}s ({cached.llm_calls - calls_before} LLM calls)")
+    print(f"📊 {cached.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import json
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.ingestion.loaders.pdf_loader import PDFLoader
+from backend.ingestion.pipeline.chunking import Chunker
+from backend.ingestion.pipeline.contextual_enrichment import ContextualEnricher, document_sections
+
+N_CHUNKS = 40
+
+
+def test_document_sections():
+    """Sections are consecutive, cover every chunk once, and only a lone oversized chunk exceeds the budget."""
+    chunks = [{"text": "x" * n} for n in (300, 300, 300, 900, 2000, 100, 100)]
+    spans = document_sections(chunks, section_chars=1000)
+    assert spans == [(0, 3), (3, 4), (4, 5), (5, 7)]
+    assert document_sections([], section_chars=1000) == []
+
+
+async def main():
+    """LLM tokens processed per chunk: neighbour windows vs shared section prefix vs section summaries (cache off)."""
+    print("🧪 STARTING ENRICHMENT PREFIX-REUSE TEST")
+    print("=" * 60)
+    pdf_files = sorted(Path("data/pdfs").glob("*.pdf"))
+    if not pdf_files:
+        print("❌ Error: No PDFs found in 'data/pdfs'.")
+        return
+
+    text = PDFLoader().load_file(str(pdf_files[0]))
+    chunks = Chunker(chunk_size=512, chunk_overlap=100).chunk_text(text, metadata={"source": pdf_files[0].name})[:N_CHUNKS]
+    print(f"📄 {pdf_files[0].name}: enriching {len(chunks)} chunks per mode")
+
+    results = {}
+    for mode in ("window", "prefix", "summary"):
+        enricher = ContextualEnricher(mode=mode, use_cache=False)
+        start = time.time()
+        await enricher.enrich_chunks(chunks)
+        stats = enricher.stats()
+        stats["wall_seconds"] = round(time.time() - start, 2)
+        results[mode] = stats
+        print(f"   {mode:<8} | {stats['tokens_per_chunk']:>7} tokens/chunk | {stats['prompt_tokens']:>7} prompt "
+              f"| {stats['output_tokens']:>6} output | {stats['llm_calls']:>3} calls | {stats['wall_seconds']}s")
+
+    baseline = results["window"]["tokens_per_chunk"]
+    for mode in ("prefix", "summary"):
+        if results[mode]["tokens_per_chunk"]:
+            print(f"⚡ {mode}: {baseline / results[mode]['tokens_per_chunk']:.2f}x fewer tokens per chunk than window")
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/enrichment_prefix_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    test_document_sections()
+    asyncio.run(main())
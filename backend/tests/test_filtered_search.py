@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import services, get_vector_db
+from backend.tests.test_search_simple import queries
+
+LIMIT = 5
+
+
+def hit_source(hit):
+    payload = hit.payload or {}
+    return payload.get("source") or (payload.get("metadata") or {}).get("source")
+
+
+def test_filter_paths_agree():
+    """Both backends resolve a DSL path to the same chunk-metadata field, with or without the "metadata" key."""
+    from backend.indexing.postgres_client import build_filter_clause, filter_field
+    from backend.indexing.qdrant_client import qdrant_filter
+
+    for filters in ({"page": 3}, {"metadata": {"page": 3}}):
+        clause, args = build_filter_clause(filters)
+        assert args == ['{"metadata": {"page": 3}}']
+        assert [c.key for c in qdrant_filter(filters).must] == ["page"]
+
+    for path in (("page",), ("lang", "code"), ("source",)):
+        column, json_path = filter_field(path)
+        qdrant_key = qdrant_filter({".".join(path): "x"}).must[0].key
+        # The JSONB path inside the chunk metadata object is the Qdrant payload key
+        assert column or json_path[1:] == tuple(qdrant_key.split("."))
+    assert filter_field(("source",)) == ("doc_id", None)
+
+
+def main():
+    """
+    Filtered vs unfiltered hybrid search on the same queries (filters run inside the DB):
+    every filtered hit must match the filter, and latency should stay in the same range.
+    """
+    print("🧪 STARTING FILTERED SEARCH TEST")
+    print("============================================================")
+
+    test_filter_paths_agree()
+    services.warmup()
+    db = get_vector_db()
+    db.result_cache = None  # Measure the backend, not the cache
+
+    unfiltered_time, filtered_time, violations, starved = 0.0, 0.0, 0, 0
+
+    for query in queries:
+        start = time.time()
+        hits = db.search(query, limit=LIMIT)
+        unfiltered_time += time.time() - start
+        if not hits:
+            continue
+
+        source = hit_source(hits[0])
+        filters = {"source": source, "chunk_index": {"gte": 0}}
+
+        start = time.time()
+        filtered = db.search(query, limit=LIMIT, filter=filters)
+        filtered_time += time.time() - start
+
+        violations += sum(1 for h in filtered if hit_source(h) != source)
+        # Server-side filtering fills the whole candidate budget from the matching document
+        if len(filtered) < min(LIMIT, len([h for h in hits if hit_source(h) == source])):
+            starved += 1
+
+    n = len(queries)
+    print("-" * 60)
+    print(f"{'Mode':<12} | {'Avg latency (s)':<15}")
+    print("-" * 60)
+    print(f"{'unfiltered':<12} | {unfiltered_time / n:<15.3f}")
+    print(f"{'filtered':<12} | {filtered_time / n:<15.3f}")
+    print("-" * 60)
+    status = "✅" if violations == 0 and starved == 0 else "❌"
+    print(f"{status} Filter violations: {violations} | Under-filled result lists: {starved}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 
 # ==========================================
 # ⚙️ CONFIGURATION
@@ -107,7 +107,7 @@ def run_benchmark():
     # 1. SETUP (Run Once)
     print("⚙️ Initializing Hybrid RAG components...")
     try:
-        client = VectorDBClient()
+        client = get_vector_db()
         
         llm = ChatOllama(
             model=MODEL_NAME,
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import json
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.ingestion.loaders.pdf_loader import ParallelPDFLoader, PDFLoader, page_ranges
+
+DATA_DIR = Path("data/pdfs")
+
+
+def test_page_ranges():
+    """Page ranges cover every page exactly once, in order."""
+    assert page_ranges(25, 10) == [(0, 10), (10, 20), (20, 25)]
+    assert page_ranges(10, 10) == [(0, 10)]
+    assert page_ranges(0, 10) == [(0, 0)]
+
+
+def main():
+    """Serial load_file() vs the process-pool loader on data/pdfs: pages/sec and identical text."""
+    print("🧪 STARTING PDF EXTRACTION BENCHMARK")
+    print("============================================================")
+    files = sorted(DATA_DIR.glob("*.pdf"))
+    if not files:
+        print(f"❌ Error: No PDFs found in '{DATA_DIR}'.")
+        return
+
+    serial_loader = PDFLoader()
+    start = time.perf_counter()
+    serial = {path.name: serial_loader.load_file(str(path)) for path in files}
+    serial_seconds = time.perf_counter() - start
+    n_pages = sum(len(serial_loader.load_document(str(path))["pages"]) for path in files)
+    print(f"📄 {len(files)} PDFs, {n_pages} pages")
+    print(f"🐢 Serial:   {serial_seconds:.2f}s ({n_pages / serial_seconds:.0f} pages/s)")
+
+    results = {"files": len(files), "pages": n_pages, "serial_seconds": round(serial_seconds, 3), "parallel": {}}
+    for pages_per_task in (8, 32, 10_000):  # 10_000 = one task per file
+        loader = ParallelPDFLoader(pages_per_task=pages_per_task)
+        start = time.perf_counter()
+        documents = {path.name: doc for path, doc, error in loader.iter_documents(files) if error is None}
+        seconds = time.perf_counter() - start
+        identical = all(documents.get(name, {}).get("text") == text for name, text in serial.items())
+        print(f"🚀 Parallel ({loader.max_workers} workers, {pages_per_task} pages/task): {seconds:.2f}s "
+              f"({n_pages / seconds:.0f} pages/s, {serial_seconds / seconds:.2f}x) identical text: {identical}")
+        results["parallel"][pages_per_task] = {"seconds": round(seconds, 3), "identical": identical}
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/pdf_loading_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    test_page_ranges()
+    main()
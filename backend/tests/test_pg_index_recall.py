@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import json
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from psycopg2 import sql
+from backend.app.dependencies import get_vector_db
+from backend.indexing.postgres_client import format_dense, format_sparse
+from backend.models.embedding_client import embed_query_batch, sparse_to_lists
+from backend.tests.test_search_simple import queries
+
+TOP_K = 15
+EF_SEARCH_VALUES = [16, 40, 100, 200]
+
+# column, operator, cast
+MODES = {
+    "dense": ("dense_vector", "<=>", "vector"),
+    "sparse": ("sparse_vector", "<#>", "sparsevec"),
+}
+
+
+def top_k_ids(db, mode, query_vec, exact=False, ef_search=None):
+    """Returns (ids, seconds) for a plain ORDER BY <distance> LIMIT k scan."""
+    column, op, cast = MODES[mode]
+    query = sql.SQL("SELECT id FROM {table} ORDER BY {col} " + op + " %s::" + cast + " LIMIT %s").format(
+        table=sql.Identifier(db.table_name), col=sql.Identifier(column)
+    )
+
+    def _run(conn):
+        with conn.cursor() as cur:
+            if exact:
+                cur.execute("SET enable_indexscan = off;")
+            if ef_search:
+                cur.execute("SET hnsw.ef_search = %s;", [ef_search])
+            try:
+                start = time.time()
+                cur.execute(query, [query_vec, TOP_K])
+                ids = [r[0] for r in cur.fetchall()]
+                return ids, time.time() - start
+            finally:
+                cur.execute("RESET enable_indexscan; RESET hnsw.ef_search;")
+
+    return db.pool.run(_run)
+
+
+def main():
+    print(f"🧪 STARTING PGVECTOR RECALL vs LATENCY BENCHMARK (k={TOP_K})")
+    print("============================================================")
+
+    db = get_vector_db("postgres").client
+    db.build_indexes()
+    print(f"📦 Indexes: {json.dumps(db.index_status(), indent=2)}")
+
+    vecs = embed_query_batch(queries)
+    query_vecs = {
+        "dense": [format_dense(v["dense"]) for v in vecs],
+        "sparse": [format_sparse(*sparse_to_lists(v["sparse"])) for v in vecs],
+    }
+
+    report = {"top_k": TOP_K, "queries": len(queries), "results": []}
+    print(f"{'Mode':<8} | {'ef_search':<10} | {'Recall@k':<9} | {'Avg ms':<8}")
+    print("-" * 60)
+
+    for mode in MODES:
+        exact = [top_k_ids(db, mode, q, exact=True) for q in query_vecs[mode]]
+        exact_ms = 1000 * sum(t for _, t in exact) / len(exact)
+        print(f"{mode:<8} | {'exact':<10} | {1.0:<9.3f} | {exact_ms:<8.2f}")
+        report["results"].append({"mode": mode, "ef_search": None, "recall": 1.0, "avg_ms": round(exact_ms, 2)})
+
+        for ef in EF_SEARCH_VALUES:
+            ann = [top_k_ids(db, mode, q, ef_search=ef) for q in query_vecs[mode]]
+            recalls = [
+                len(set(a_ids) & set(e_ids)) / len(e_ids)
+                for (a_ids, _), (e_ids, _) in zip(ann, exact) if e_ids
+            ]
+            recall = sum(recalls) / len(recalls) if recalls else 0.0
+            ann_ms = 1000 * sum(t for _, t in ann) / len(ann)
+            print(f"{mode:<8} | {ef:<10} | {recall:<9.3f} | {ann_ms:<8.2f}")
+            report["results"].append({"mode": mode, "ef_search": ef, "recall": round(recall, 4), "avg_ms": round(ann_ms, 2)})
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/pg_index_recall_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
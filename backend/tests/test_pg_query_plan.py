@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+import numpy as np
+from psycopg2 import sql
+from backend.app.dependencies import get_vector_db
+from backend.indexing.postgres_client import (
+    build_filter_clause,
+    format_dense,
+    format_sparse,
+    hybrid_search_args,
+    hybrid_search_sql,
+    prefix_column,
+)
+
+
+def _random_query(seed: int = 0):
+    """Synthetic query vectors: the plan shape does not depend on the embedder."""
+    rng = np.random.default_rng(seed)
+    dense = rng.standard_normal(1024).astype(np.float32)
+    dense /= np.linalg.norm(dense)
+    indices = sorted(rng.choice(250002, size=12, replace=False).tolist())
+    values = rng.random(12).round(4).tolist()
+    return format_dense(dense), format_sparse(indices, values)
+
+
+def _index_names(plan: dict) -> set:
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def explain_hybrid(db, filters: dict = None, n_queries: int = 1, prefetch_dims: int = 0) -> dict:
+    """EXPLAIN (FORMAT JSON) of the hybrid RRF query, with seq scans discouraged as on a large table."""
+    dense_strs, sparse_strs = zip(*[_random_query(i) for i in range(n_queries)])
+    where_sql, filter_args = build_filter_clause(filters)
+    query = sql.SQL("EXPLAIN (FORMAT JSON) ") + hybrid_search_sql(db.table_name, where_sql, prefetch_dims=prefetch_dims)
+    args = hybrid_search_args(
+        list(dense_strs), list(sparse_strs), filter_args, 15,
+        prefetch_limit=db.prefetch_limit if prefetch_dims else None
+    )
+
+    def _explain(conn):
+        with conn.cursor() as cur:
+            # Tiny test tables make a seq scan "cheaper"; production-size tables do not
+            cur.execute("SET enable_seqscan = off;")
+            try:
+                cur.execute(query, args)
+                return cur.fetchone()[0][0]["Plan"]
+            finally:
+                cur.execute("RESET enable_seqscan;")
+
+    return db.pool.run(_explain)
+
+
+def test_hybrid_query_uses_vector_indexes():
+    db = get_vector_db("postgres").client
+    db.build_indexes()
+
+    plan = explain_hybrid(db)
+    used = _index_names(plan)
+    print(f"   Indexes used: {sorted(used)}")
+
+    assert f"{db.table_name}_dense_hnsw" in used, f"dense leg is not using HNSW:\n{json.dumps(plan, indent=2)}"
+    assert f"{db.table_name}_sparse_hnsw" in used, f"sparse leg is not using HNSW:\n{json.dumps(plan, indent=2)}"
+
+
+def test_batched_hybrid_query_uses_vector_indexes():
+    db = get_vector_db("postgres").client
+    used = _index_names(explain_hybrid(db, n_queries=4))
+    assert f"{db.table_name}_dense_hnsw" in used
+    assert f"{db.table_name}_sparse_hnsw" in used
+
+
+def test_two_stage_dense_leg_uses_prefix_index():
+    db = get_vector_db("postgres").client
+    if not db.prefetch_dims:
+        print("   ⏭️ retrieval.dense_prefetch.dims is 0: two-stage plan not checked")
+        return
+    used = _index_names(explain_hybrid(db, prefetch_dims=db.prefetch_dims))
+    assert f"{db.table_name}_{prefix_column(db.prefetch_dims)}_hnsw" in used, f"prefix leg is not using HNSW: {used}"
+    assert f"{db.table_name}_sparse_hnsw" in used
+
+
+if __name__ == "__main__":
+    print("🧪 STARTING POSTGRES QUERY PLAN TEST")
+    test_hybrid_query_uses_vector_indexes()
+    test_batched_hybrid_query_uses_vector_indexes()
+    test_two_stage_dense_leg_uses_prefix_index()
+    print("✅ Hybrid query plan uses the HNSW indexes.")
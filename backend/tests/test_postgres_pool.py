@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import get_vector_db
+from backend.tests.test_search_simple import queries
+
+THREADS = 16
+
+
+def main():
+    print(f"🧪 STARTING POSTGRES POOL TEST ({THREADS} threads sharing one PostgresVectorDB)")
+    print("============================================================")
+
+    client = get_vector_db("postgres")
+    db = client.client
+    print(f"✅ Pool ready: min={db.pool.min_size}, max={db.pool.max_size} | Ping: {db.ping()}")
+
+    # Bypass the result cache so every call really hits Postgres
+    def run(q):
+        hits = db.search(q, limit=3)
+        neighbours = db.fetch_windows([(h.doc_id, h.chunk_index, h.chunk_index + 2) for h in hits])
+        return len(hits), len(neighbours)
+
+    start = time.time()
+    errors = 0
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        futures = [pool.submit(run, q) for q in queries]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:
+                errors += 1
+                print(f"   ❌ {e}")
+    elapsed = time.time() - start
+
+    prepared = sum(len(v) for v in db.pool._prepared.values())
+    print(f"✅ {len(queries)} searches in {elapsed:.2f}s | errors: {errors} | prepared statements: {prepared}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.models.batching import MicroBatcher, length_buckets, percentile
+
+QUERIES_PER_CALLER = 10
+CONCURRENCY = [1, 4, 16, 32]
+
+
+def test_length_buckets():
+    """Similar lengths share a pass; a long outlier gets its own; every index appears once."""
+    buckets = length_buckets([10, 12, 11, 40, 45, 200, 9], max_padding=0.3)
+    assert sorted(i for b in buckets for i in b) == list(range(7))
+    assert [5] in buckets
+    assert sorted(buckets[0]) == [0, 1, 2, 6]
+    assert length_buckets([5] * 7, max_padding=0.3, max_size=3) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def run_load(encode, queries, concurrency):
+    """`concurrency` callers each encode QUERIES_PER_CALLER single queries back to back."""
+    latencies, lock = [], threading.Lock()
+
+    def caller(worker_id):
+        for i in range(QUERIES_PER_CALLER):
+            # Unique text per call: measures the encoder, not the query-embedding cache
+            text = f"{queries[(worker_id + i) % len(queries)]} #{worker_id}-{i}"
+            start = time.perf_counter()
+            encode([text])
+            with lock:
+                latencies.append(1000 * (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(caller, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries_per_sec": round(concurrency * QUERIES_PER_CALLER / elapsed, 1),
+    }
+
+
+def main():
+    """One forward pass per search (batch of one) vs the shared query batcher, under concurrent load."""
+    from backend.core.config_loader import settings
+    from backend.models.embedding_client import _encode_query_texts, embed_query_batch
+    from backend.tests.test_search_simple import queries
+
+    print("🧪 STARTING QUERY BATCHING BENCHMARK")
+    print("============================================================")
+
+    r = settings.retrieval
+    batcher = MicroBatcher(
+        lambda texts: _encode_query_texts(texts, r.query_batching_max_padding),
+        max_batch_size=r.query_batching_max_batch_size,
+        max_wait_ms=r.query_batching_max_wait_ms,
+        max_queue=r.query_batching_max_queue,
+        name="query-encoder-bench",
+    )
+    modes = {"per-call": _encode_query_texts, "batched": batcher.run}
+    embed_query_batch(["warmup"])  # Load BGE-M3 before timing
+
+    report = {"queries_per_caller": QUERIES_PER_CALLER, "results": []}
+    print(f"{'Mode':<10} | {'Callers':<7} | {'p50 ms':<8} | {'p99 ms':<8} | {'Queries/s':<9}")
+    print("-" * 55)
+    for concurrency in CONCURRENCY:
+        for mode, encode in modes.items():
+            row = run_load(encode, queries, concurrency)
+            print(f"{mode:<10} | {concurrency:<7} | {row['p50_ms']:<8} | {row['p99_ms']:<8} | {row['queries_per_sec']:<9}")
+            report["results"].append({"mode": mode, "concurrency": concurrency, **row})
+
+    report["batcher_stats"] = batcher.stats()
+    print(f"📊 Batcher: {report['batcher_stats']}")
+    batcher.close()
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/query_batching_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
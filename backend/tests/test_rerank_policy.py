@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import services, get_vector_db
+from backend.retrieval.rerank_policy import RerankPolicy
+from backend.tests.test_search_simple import queries
+
+LIMIT = 5
+
+# name -> policy overrides (the baseline reranks 15 candidates for every query, like before the policy)
+POLICIES = {
+    "baseline": {"budgets": {"short": 15, "default": 15, "long": 15}, "chars_per_token": 1000.0},
+    "budgets": {},
+    "budgets+early_exit": {"early_exit_gap": 0.3},
+}
+
+
+def test_early_exit_scores():
+    """Early-exit hits get normalized fused scores on copies: the (possibly cached) input hits are untouched."""
+    policy = RerankPolicy(early_exit_gap=0.3)
+    hits = [SimpleNamespace(id=i, payload={"text": f"doc {i}"}, score=s) for i, s in enumerate([0.032, 0.016, 0.008])]
+    [ranked] = policy.rerank(None, ["short query"], [hits], limit=3)
+    assert [h.score for h in ranked] == [1.0, 0.5, 0.25]
+    assert [h.score for h in hits] == [0.032, 0.016, 0.008]
+    assert policy.metrics.recent(1)[0]["score_source"] == "fused"
+
+
+def run(db, policy: RerankPolicy):
+    db.client.rerank_policy = policy
+    start = time.time()
+    results = db.client.search_many(queries, limit=LIMIT)
+    return results, time.time() - start
+
+
+def main():
+    """Rerank cost vs top-1 agreement with the baseline, per policy."""
+    print("🧪 STARTING RERANK POLICY BENCHMARK")
+    print("============================================================")
+
+    test_early_exit_scores()
+    services.warmup()
+    db = get_vector_db()
+    db.result_cache = None  # Measure the backend, not the cache
+    original_policy = db.client.rerank_policy
+
+    report = {"provider": db.provider, "queries": len(queries), "results": []}
+    baseline_top1 = None
+    print(f"{'Policy':<20} | {'Total (s)':<9} | {'Reranked':<8} | {'Early exits':<11} | {'Top-1 agree':<11}")
+    print("-" * 72)
+
+    try:
+        for name, overrides in POLICIES.items():
+            policy = RerankPolicy(**overrides)
+            results, seconds = run(db, policy)
+            top1 = [hits[0].id if hits else None for hits in results]
+            if baseline_top1 is None:
+                baseline_top1 = top1
+            agree = sum(a == b for a, b in zip(top1, baseline_top1)) / len(queries)
+
+            decisions = policy.metrics.recent(len(queries))
+            reranked = sum(d["reranked"] for d in decisions)
+            exits = sum(d["early_exit"] for d in decisions)
+            print(f"{name:<20} | {seconds:<9.2f} | {reranked:<8} | {exits:<11} | {agree:<11.2f}")
+            report["results"].append({
+                "policy": name,
+                "seconds": round(seconds, 3),
+                "reranked_pairs": reranked,
+                "early_exits": exits,
+                "top1_agreement": round(agree, 4),
+                "summary": policy.metrics.summary(),
+            })
+    finally:
+        db.client.rerank_policy = original_policy
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/rerank_policy_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
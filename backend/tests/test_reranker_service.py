@@ -0,0 +1,217 @@
+import os
+import sys
+import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.models.batching import MicroBatcher, percentile
+
+PAIRS_PER_REQUEST = 15
+REQUESTS_PER_CALLER = 8
+CONCURRENCY = [1, 4, 16, 32]
+
+
+def test_micro_batcher_fan_out():
+    """Concurrent callers are coalesced into fewer calls and each gets its own results back, in order."""
+    calls = []
+
+    def process(items):
+        calls.append(len(items))
+        time.sleep(0.005)
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(process, max_batch_size=64, max_wait_ms=20)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            inputs = [list(range(i * 10, i * 10 + 5)) for i in range(8)]
+            outputs = list(pool.map(batcher.run, inputs))
+        assert outputs == [[x * 2 for x in xs] for xs in inputs]
+        assert len(calls) < len(inputs)
+        assert batcher.stats()["requests"] == len(inputs)
+    finally:
+        batcher.close()
+
+
+def test_micro_batcher_arun_backpressure():
+    """arun() on a full queue waits without blocking the event loop."""
+    import asyncio
+
+    def process(items):
+        time.sleep(0.02)
+        return [x + 1 for x in items]
+
+    async def scenario(batcher):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        outputs = await asyncio.gather(*[batcher.arun([i]) for i in range(8)])
+        tick_task.cancel()
+        return outputs, ticks
+
+    batcher = MicroBatcher(process, max_batch_size=1, max_wait_ms=1, max_queue=1)
+    try:
+        outputs, ticks = asyncio.run(scenario(batcher))
+        assert outputs == [[i + 1] for i in range(8)]
+        assert ticks >= 10  # ~160 ms of batches: the loop kept running while callers waited
+    finally:
+        batcher.close()
+
+
+def test_worker_guards():
+    """The worker only binds to loopback unless allowed, and never runs without a shared secret."""
+    from backend.models.reranker_service import AUTHKEY_ENV, _authkey, _is_loopback, serve
+
+    assert _is_loopback("127.0.0.1") and _is_loopback("::1") and _is_loopback("localhost")
+    assert not _is_loopback("0.0.0.0") and not _is_loopback("10.0.0.5") and not _is_loopback("reranker.internal")
+    try:
+        serve("0.0.0.0:6390")
+        raise AssertionError("serve() accepted a non-loopback address")
+    except ValueError:
+        pass
+
+    saved = os.environ.pop(AUTHKEY_ENV, None)
+    try:
+        _authkey()
+        raise AssertionError("_authkey() accepted a missing secret")
+    except ValueError:
+        pass
+    finally:
+        if saved is not None:
+            os.environ[AUTHKEY_ENV] = saved
+
+
+def test_worker_survives_bad_handshakes():
+    """A raw TCP probe or a client with the wrong key must not take the worker down."""
+    import socket
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    from backend.models.reranker_service import AUTHKEY_ENV, serve
+
+    os.environ.setdefault(AUTHKEY_ENV, "test-secret")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    threading.Thread(target=serve, args=(f"127.0.0.1:{port}",), daemon=True).start()
+
+    deadline = time.time() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()  # Connect + close, no handshake
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+    try:
+        Client(("127.0.0.1", port), authkey=b"wrong key").close()
+        raise AssertionError("the worker accepted a wrong authkey")
+    except AuthenticationError:
+        pass
+
+    # "stats" is answered without loading the model
+    with Client(("127.0.0.1", port), authkey=os.environ[AUTHKEY_ENV].encode("utf-8")) as conn:
+        conn.send_bytes(json.dumps(["stats", 512, None]).encode("utf-8"))
+        status, _ = json.loads(conn.recv_bytes())
+    assert status == "ok"
+
+
+def load_pairs():
+    """Real (query, chunk) pairs: the fused candidates of the benchmark queries."""
+    from backend.app.dependencies import get_vector_db
+    from backend.models.reranker_client import rerank_text
+    from backend.tests.test_search_simple import queries
+
+    db = get_vector_db()
+    requests = []
+    for query in queries:
+        hits = db.search(query, limit=PAIRS_PER_REQUEST)
+        if hits:
+            requests.append([[query, rerank_text(h.payload)] for h in hits])
+    return requests
+
+
+def run_load(predict, requests, concurrency):
+    """`concurrency` callers each send REQUESTS_PER_CALLER rerank requests back to back."""
+    latencies, lock = [], threading.Lock()
+
+    def caller(worker_id):
+        for i in range(REQUESTS_PER_CALLER):
+            pairs = requests[(worker_id + i) % len(requests)]
+            start = time.perf_counter()
+            predict(pairs)
+            with lock:
+                latencies.append(1000 * (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(caller, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    pairs = sum(len(requests[(w + i) % len(requests)]) for w in range(concurrency) for i in range(REQUESTS_PER_CALLER))
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "pairs_per_sec": round(pairs / elapsed, 1),
+    }
+
+
+def main():
+    """Per-call predict() vs the micro-batching reranker service under concurrent load."""
+    from backend.models.reranker_client import get_reranker, predict_bucketed
+    from backend.models.reranker_service import RemoteReranker, RerankerService
+
+    print("🧪 STARTING RERANKER SERVICE BENCHMARK")
+    print("============================================================")
+
+    requests = load_pairs()
+    model = get_reranker(max_length=512)
+    service = RerankerService(max_length=512)
+    modes = {
+        "per-call": lambda pairs: predict_bucketed(model, pairs),
+        "thread": service.predict,
+    }
+    test_micro_batcher_arun_backpressure()
+    test_worker_guards()
+    test_worker_survives_bad_handshakes()
+    try:
+        remote = RemoteReranker(max_length=512)
+        remote.predict([["warmup", "warmup"]])
+        modes["process"] = remote.predict
+    except (ConnectionError, ValueError):
+        print("ℹ️ No reranker worker running (or RERANKER_SERVICE_AUTHKEY unset): skipping process mode "
+              "(python -m backend.models.reranker_service serve)")
+
+    predict_bucketed(model, requests[0])  # Warm up kernels before timing
+    report = {"pairs_per_request": PAIRS_PER_REQUEST, "requests_per_caller": REQUESTS_PER_CALLER, "results": []}
+    print(f"{'Mode':<10} | {'Callers':<7} | {'p50 ms':<8} | {'p99 ms':<8} | {'Pairs/s':<8}")
+    print("-" * 55)
+    for concurrency in CONCURRENCY:
+        for mode, predict in modes.items():
+            row = run_load(predict, requests, concurrency)
+            print(f"{mode:<10} | {concurrency:<7} | {row['p50_ms']:<8} | {row['p99_ms']:<8} | {row['pairs_per_sec']:<8}")
+            report["results"].append({"mode": mode, "concurrency": concurrency, **row})
+
+    report["service_stats"] = service.stats()
+    print(f"📊 Thread service: {report['service_stats']}")
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{output_dir}/reranker_service_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
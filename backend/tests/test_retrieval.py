@@ -1,5 +1,5 @@
 from backend.indexing.dense_index import DenseIndexer
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 
 def test_query_manual(query: str):
     print(f"\n🔎 Testing Query: '{query}'")
@@ -8,7 +8,7 @@ def test_query_manual(query: str):
     # 1. Initialize (Loads BGE-M3 model again - takes a few seconds)
     try:
         indexer = DenseIndexer()
-        client = VectorDBClient()
+        client = get_vector_db()
     except Exception as e:
         print(f"❌ Initialization Failed: {e}")
         return
@@ -7,7 +7,7 @@ from datetime import datetime
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 
 # ==========================================
 # 📝 DEFINE YOUR TEST QUESTIONS HERE
@@ -91,7 +91,7 @@ def run_batch_test():
 
     # 1. Initialize System (Both Indexers)
     try:
-        client = VectorDBClient()
+        client = get_vector_db()
         print(f"✅ Hybrid System Initialized (Provider: {client.provider.upper()}).")
     except Exception as e:
         print(f"❌ System Init Failed: {e}")
@@ -101,18 +101,14 @@ def run_batch_test():
     total_score = 0
     total_retrieved = 0
 
-    # 2. Loop Through Questions
+    # 2. Run All Questions As One Batch
     start_time = time.time()
-    
-    for i, question in enumerate(queries):
-        print(f"🔍 [{i+1}/10] Querying: {question[:50]}...", end="\r")
-        
-        # A. Hybrid Search (Dense + Sparse)
-        search_hits = client.search(
-            query_text=question,
-            limit=2
-        )
-        
+
+    # A. Hybrid Search (Dense + Sparse): one embedding pass, one DB round-trip, one rerank call
+    print(f"🔍 Querying {len(queries)} questions in one batch...")
+    all_hits = client.search_many(queries, limit=2)
+
+    for i, (question, search_hits) in enumerate(zip(queries, all_hits)):
         # Format Hits for JSON
         hits_data = []
         for hit in search_hits:
@@ -136,7 +132,7 @@ def run_batch_test():
             "retrieved_chunks": hits_data
         })
 
-    print(f"\n✅ Completed 10 queries in {time.time() - start_time:.2f} seconds.")
+    print(f"\n✅ Completed {len(queries)} queries in {time.time() - start_time:.2f} seconds.")
 
     # 3. Save to JSON
     output_dir = "data/eval_results"
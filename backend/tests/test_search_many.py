@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import sys
+from datetime import datetime
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+
+from backend.app.dependencies import services, get_vector_db
+from backend.models.embedding_client import get_query_embedding_cache
+from backend.tests.test_search_simple import queries
+
+BATCH_SIZE = 32
+LIMIT = 3
+
+
+def _clear_caches(client):
+    """Both runs must pay for embeddings, DB and reranking, so start cold."""
+    cache = get_query_embedding_cache()
+    if cache is not None:
+        cache.clear()
+    if client.result_cache is not None:
+        client.result_cache.clear()
+
+
+def run_serial(client, batch):
+    start = time.time()
+    results = [client.client.search(q, limit=LIMIT) for q in batch]
+    return results, time.time() - start
+
+
+def run_batched(client, batch):
+    start = time.time()
+    results = client.client.search_many(batch, limit=LIMIT)
+    return results, time.time() - start
+
+
+def main():
+    print(f"🧪 STARTING search_many BENCHMARK (batch of {BATCH_SIZE} vs serial loop)")
+    print("============================================================")
+
+    services.warmup()
+    client = get_vector_db()
+    batch = (queries * ((BATCH_SIZE // len(queries)) + 1))[:BATCH_SIZE]
+
+    _clear_caches(client)
+    serial_results, serial_time = run_serial(client, batch)
+
+    _clear_caches(client)
+    batch_results, batch_time = run_batched(client, batch)
+
+    # Same top hit per query (ids), otherwise the speedup is meaningless
+    mismatches = 0
+    for a, b in zip(serial_results, batch_results):
+        if [h.id for h in a[:1]] != [h.id for h in b[:1]]:
+            mismatches += 1
+
+    speedup = serial_time / batch_time if batch_time else 0.0
+    print("-" * 60)
+    print(f"{'Mode':<12} | {'Total (s)':<10} | {'Queries/s':<10}")
+    print("-" * 60)
+    print(f"{'serial':<12} | {serial_time:<10.2f} | {BATCH_SIZE / serial_time:<10.2f}")
+    print(f"{'search_many':<12} | {batch_time:<10.2f} | {BATCH_SIZE / batch_time:<10.2f}")
+    print("-" * 60)
+    print(f"🚀 Speedup: {speedup:.2f}x | Top-1 mismatches: {mismatches}/{BATCH_SIZE}")
+
+    output_dir = "data/eval_results"
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{output_dir}/search_many_benchmark_{timestamp}.json"
+
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": timestamp,
+            "provider": client.provider,
+            "batch_size": BATCH_SIZE,
+            "serial_seconds": round(serial_time, 3),
+            "batched_seconds": round(batch_time, 3),
+            "speedup": round(speedup, 2),
+            "top1_mismatches": mismatches,
+        }, f, indent=4, ensure_ascii=False)
+
+    print(f"📂 Results saved to: {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,14 +12,9 @@ from datetime import datetime
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from backend.indexing.vector_store import VectorDBClient
-from langchain_core.output_parsers import StrOutputParser
-from backend.indexing.vector_store import VectorDBClient
+from backend.app.dependencies import get_vector_db
 from backend.core.config_loader import settings
-from sentence_transformers import CrossEncoder
-
-import psycopg2
-from psycopg2 import sql
+from backend.retrieval.context_builder import ContextBuilder
 
 
 def clean_reasoning(text: str) -> str:
@@ -99,168 +94,15 @@ queries = [
         # "Calculate the difference in the Maximum Rent allowance (Article 3) between a 'Couple with 2 children' and a 'Couple with 4 children'. Return the difference as a positive number."
     ]
 
-def merge_text_chunks(chunks, overlap_hint=200):
-    """
-    Merges a list of text chunks by removing the overlapping text at the boundaries.
-    """
-    if not chunks:
-        return ""
-    
-    merged = chunks[0]
-    
-    for next_chunk in chunks[1:]:
-        # We look for the overlap in the start of the next_chunk
-        # We assume the overlap is roughly 'overlap_hint' size, but we scan a bit wider
-        scan_len = min(len(next_chunk), overlap_hint + 50) 
-        prefix = next_chunk[:scan_len]
-        
-        # We scan the end of the current 'merged' text for this prefix
-        # We look for the longest matching suffix
-        best_overlap_len = 0
-        
-        # We try to match from largest possible overlap down to a reasonable minimum (e.g. 10 chars)
-        # to avoid false positives on small words like "the ".
-        for i in range(scan_len, 10, -1):
-            candidate = prefix[:i]
-            if merged.endswith(candidate):
-                best_overlap_len = i
-                break
-        
-        if best_overlap_len > 0:
-            # Append only the non-overlapping part
-            merged += next_chunk[best_overlap_len:]
-        else:
-            # Fallback: Just join with a newline if no overlap found
-            merged += "\n" + next_chunk
-            
-    return merged
-
-def retrieve_window_context(db_client, query, top_k=3, window_size=2, reranker=CrossEncoder('BAAI/bge-reranker-v2-m3', max_length=4096, device="cuda")):
+def retrieve_window_context(db_client, query, top_k=3, window_size=2, reranker=None):
     """
-    FALLBACK METHOD: Uses Postgres Primary Key 'id' to find neighbors.
-    Assumes chunks were inserted sequentially (ID 100 -> ID 101 -> ID 102).
+    Window retrieval: expands every hit to its following chunks in the same document
+    (see backend.retrieval.context_builder.ContextBuilder).
     """
-    print(f"   🛠️  Using HACKY ID-based Window Retrieval (Size={window_size})...")
-    
-    # 1. Standard Vector Search
-    initial_results = db_client.search(query, limit=top_k)
-    if not initial_results:
-        return [], []
-
-    # 2. Collect IDs to fetch
-    # We need to map {Original_ID: [List of Neighbor IDs]}
-    id_map = {} 
-    all_ids_to_fetch = []
-
-    for hit in initial_results:
-        # We assume the Vector DB 'id' matches the Postgres Primary Key 'id'
-        # If your vector store uses UUIDs but Postgres uses Ints, this might fail.
-        try:
-            center_id = int(hit.id) 
-        except (TypeError, ValueError):
-            print(f"   ⚠️ Skipping hit: ID '{hit.id}' is not an integer.")
-            continue
-            
-        # Calculate the range: center_id to center_id + window_size
-        neighbor_ids = list(range(center_id, center_id + window_size + 1))
-        
-        id_map[center_id] = neighbor_ids
-        all_ids_to_fetch.extend(neighbor_ids)
-
-    # Remove duplicates
-    all_ids_to_fetch = list(set(all_ids_to_fetch))
-
-    if not all_ids_to_fetch:
-        print("   ❌ No valid integer IDs found in vector results.")
-        return [], []
-
-    # 3. Query Postgres for these IDs
-    table_name = settings.retrieval.vector_store_collection # "slm_rag_contextual_V3"
-    fetched_content_map = {} # ID -> Content
-
-    query_sql = sql.SQL("SELECT id, content, metadata->>'source' FROM {} WHERE id IN ({})").format(
-        sql.Identifier(table_name),
-        sql.SQL(', ').join(sql.Placeholder() for _ in all_ids_to_fetch)
-    )
-
-    try:
-        with psycopg2.connect(
-            host=settings.retrieval.postgres_host,
-            user=settings.retrieval.postgres_user,
-            password=settings.retrieval.postgres_password or "mysecretpassword",
-            dbname=settings.retrieval.postgres_db,
-            port=settings.retrieval.postgres_port
-        ) as conn:
-            with conn.cursor() as cur:
-                cur.execute(query_sql, all_ids_to_fetch)
-                rows = cur.fetchall()
-                for r in rows:
-                    # r[0]=id, r[1]=content, r[2]=source
-                    fetched_content_map[r[0]] = (r[1], r[2])
-                    
-    except Exception as e:
-        print(f"   ❌ DB Fetch Error: {e}")
-        return [], []
-
-    # 4. Reconstruct Contexts
-    final_contexts = []
-    final_sources = []
-
-    for hit in initial_results:
-        try:
-            center_id = int(hit.id)
-            target_ids = id_map.get(center_id, [])
-            
-            # Sort IDs to ensure text order is correct
-            target_ids.sort()
-            
-            merged_text = []
-            detected_source = "Unknown"
-            
-            for tid in target_ids:
-                if tid in fetched_content_map:
-                    content, source = fetched_content_map[tid]
-                    merged_text.append(content)
-                    if source: detected_source = source
-            
-            if merged_text:
-                clean_text = merge_text_chunks(merged_text, overlap_hint=200)
-                final_contexts.append(clean_text)
-                final_sources.append(detected_source)
-            else:
-                # Fallback if ID fetch failed
-                final_contexts.append(hit.payload.get("search_content", ""))
-                final_sources.append(hit.payload.get("metadata", {}).get("source", "Unknown"))
-                
-        except:
-            continue
-
-    # 5. Re-Ranking (NEW)
-    if reranker and final_contexts:
-        print("   ⚖️  Re-ranking merged contexts...")
-        start_rerank = time.time()
-        
-        # Prepare pairs for the Cross-Encoder: [Query, Document Text]
-        pairs = [[query, doc_text] for doc_text in final_contexts]
-        
-        try:
-            scores = reranker.predict(pairs)
-            
-            # Zip everything together: (Score, Context, Source)
-            scored_results = list(zip(scores, final_contexts, final_sources))
-            
-            # Sort descending by Score
-            scored_results.sort(key=lambda x: x[0], reverse=True)
-            
-            # Unzip back into lists
-            final_contexts = [x[1] for x in scored_results]
-            final_sources = [x[2] for x in scored_results]
-            
-            print(f"   📊 Re-ranking took {time.time() - start_rerank:.4f}s")
-        except Exception as e:
-            print(f"   ⚠️ Re-ranking failed: {e}. Returning original order.")
-
-    return final_contexts, final_sources
+    print(f"   🛠️  Using (doc_id, chunk_index) Window Retrieval (Size={window_size})...")
+    builder = ContextBuilder(db_client, window_before=0, window_after=window_size, reranker=reranker)
+    contexts = builder.build(query, top_k=top_k)
+    return [c["text"] for c in contexts], [c["source"] for c in contexts]
 
 
 def main():
@@ -274,7 +116,7 @@ def main():
     # The factory will automatically pick 'qdrant' or 'postgres' based on 
     # the VECTOR_DB_PROVIDER environment variable or default.
     try:
-        db_client = VectorDBClient()
+        db_client = get_vector_db()
         print(f"✅ Connected to Provider: {db_client.provider.upper()}")
     except Exception as e:
         print(f"❌ Failed to connect to VectorDB: {e}")
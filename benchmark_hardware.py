@@ -4,7 +4,12 @@ import psutil
 import requests
 import gc
 import sys
-from sentence_transformers import CrossEncoder, SentenceTransformer
+import yaml
+from pathlib import Path
+
+from backend.models.runtime import SUPPORTED_BACKENDS, configure_threads
+from backend.models.embedding_client import build_sentence_transformer, build_sparse_model
+from backend.models.reranker_client import build_reranker
 
 # ==========================================
 # ⚙️ USER CONFIGURATION
@@ -15,6 +20,11 @@ OLLAMA_MODEL_NAME = "qwen3:8b"
 # 👇 CHANGED: Pointing to the chat endpoint
 OLLAMA_API_URL = "http://localhost:11434/api/chat"
 
+# Where the winning backends are written (merged over configs/base.yaml by config_loader)
+HARDWARE_CONFIG_PATH = Path("configs/hardware.yaml")
+# CPU threads used for the cpu / cpu-int8 / onnx runs (0 = torch default)
+CPU_THREADS = psutil.cpu_count(logical=False) or 0
+
 # Test Data
 TEST_QUERY = "What are the specific conditions for financial aid?"
 TEST_DOC_TEXT = """
@@ -40,42 +50,97 @@ def clear_vram():
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
 
-def benchmark_model(model_class, model_name, device, task_name):
-    print(f"   👉 Testing on {device.upper()}...", end="", flush=True)
+def available_backends():
+    """All backends this machine can run (cuda only if a GPU is present)."""
+    return [b for b in SUPPORTED_BACKENDS if b != "cuda" or torch.cuda.is_available()]
+
+# Each task: (loader(backend) -> model, run(model, docs) -> None)
+TASKS = {
+    "dense": (
+        lambda backend: build_sentence_transformer(MODEL_EMBEDDING_NAME, backend),
+        lambda model, docs: model.encode(docs, batch_size=32, normalize_embeddings=True),
+    ),
+    "sparse": (
+        lambda backend: build_sparse_model(MODEL_EMBEDDING_NAME, backend),
+        lambda model, docs: model.encode(docs, batch_size=32, return_dense=False, return_sparse=True),
+    ),
+    "reranker": (
+        lambda backend: build_reranker(MODEL_RERANKER_NAME, 512, backend),
+        lambda model, docs: model.predict([(TEST_QUERY, doc) for doc in docs], batch_size=32),
+    ),
+}
+
+def benchmark_backend(task_name, backend):
+    """
+    Loads the model for `task_name` on `backend`, warms it up and times one batch.
+    Returns a dict with load time, batch latency (ms/doc) and throughput (docs/sec).
+    """
+    print(f"   👉 {task_name:<8} on {backend.upper():<9}...", end="", flush=True)
+    loader, run = TASKS[task_name]
     try:
         clear_vram()
         # 1. Load
         start_load = time.time()
-        if model_class == SentenceTransformer:
-            model = model_class(model_name, device=device)
-        else:
-            model = model_class(model_name, device=device)
+        model = loader(backend)
         load_time = time.time() - start_load
 
         # 2. Warmup
-        if model_class == SentenceTransformer:
-            model.encode("warmup", convert_to_tensor=True)
-        else:
-            model.predict([("warmup", "warmup")])
+        run(model, ["warmup"])
 
         # 3. Benchmark Run
         start_run = time.time()
-        if model_class == SentenceTransformer:
-            model.encode(TEST_DOCS, batch_size=32, convert_to_tensor=True)
-        else:
-            pairs = [(TEST_QUERY, doc) for doc in TEST_DOCS]
-            model.predict(pairs, batch_size=32)
-        
+        run(model, TEST_DOCS)
         duration = time.time() - start_run
+
         ms_per_doc = (duration * 1000) / BATCH_SIZE
-        print(f" DONE. (Load: {load_time:.2f}s | Run: {duration:.2f}s | Speed: {ms_per_doc:.2f} ms/doc)")
-        
+        docs_per_sec = BATCH_SIZE / duration if duration > 0 else float('inf')
+        print(f" DONE. (Load: {load_time:.2f}s | Run: {duration:.2f}s | {ms_per_doc:.2f} ms/doc | {docs_per_sec:.1f} docs/s)")
+
         del model
-        return duration, ms_per_doc
+        return {"load_s": load_time, "run_s": duration, "ms_per_doc": ms_per_doc, "docs_per_sec": docs_per_sec}
 
     except Exception as e:
         print(f" FAILED. ({str(e)})")
-        return float('inf'), float('inf')
+        return None
+
+def print_comparison_table(results):
+    """Side-by-side latency / throughput table: one row per task, one column per backend."""
+    backends = available_backends()
+    header = f"{'TASK':<10}" + "".join(f"{b.upper():>22}" for b in backends)
+    print(header)
+    print("-" * len(header))
+    for task_name, per_backend in results.items():
+        row = f"{task_name:<10}"
+        for b in backends:
+            r = per_backend.get(b)
+            cell = f"{r['ms_per_doc']:.1f}ms | {r['docs_per_sec']:.0f}/s" if r else "FAILED"
+            row += f"{cell:>22}"
+        print(row)
+
+def pick_fastest(per_backend):
+    """Backend with the best throughput, or 'cpu' if everything failed."""
+    ok = {b: r for b, r in per_backend.items() if r}
+    if not ok:
+        return "cpu"
+    return max(ok, key=lambda b: ok[b]["docs_per_sec"])
+
+def write_hardware_config(embedder_backend, reranker_backend, num_threads):
+    """
+    Writes the chosen backends as a partial config.
+    config_loader merges configs/hardware.yaml on top of configs/base.yaml.
+    """
+    config = {
+        "retrieval": {
+            "embedder": {"backend": embedder_backend},
+            "reranker": {"backend": reranker_backend},
+            "inference": {"num_threads": num_threads},
+        }
+    }
+    HARDWARE_CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(HARDWARE_CONFIG_PATH, "w") as f:
+        f.write("# Generated by benchmark_hardware.py - delete to fall back to configs/base.yaml\n")
+        yaml.safe_dump(config, f, sort_keys=False)
+    return config
 
 def test_ollama_chat():
     """Checks Ollama speed using the CHAT API."""
@@ -121,25 +186,17 @@ if __name__ == "__main__":
     print(f" - GPU: {torch.cuda.get_device_name(0) if torch.cuda.is_available() else 'NONE'}")
     print(f"==================================================\n")
 
-    results = {}
+    configure_threads(CPU_THREADS)
 
-    # --- ROUND 1: EMBEDDING ---
-    print("--- ROUND 1: Embedding (BGE-M3) ---")
-    cpu_time_emb, cpu_speed_emb = benchmark_model(SentenceTransformer, MODEL_EMBEDDING_NAME, "cpu", "Embedding")
-    
-    if torch.cuda.is_available():
-        gpu_time_emb, gpu_speed_emb = benchmark_model(SentenceTransformer, MODEL_EMBEDDING_NAME, "cuda", "Embedding")
-    else:
-        gpu_time_emb, gpu_speed_emb = float('inf'), float('inf')
+    # --- ROUND 1 + 2: EMBEDDING & RERANKER ACROSS BACKENDS ---
+    results = {}
+    for task_name in TASKS:
+        print(f"--- {task_name.upper()} ---")
+        results[task_name] = {backend: benchmark_backend(task_name, backend) for backend in available_backends()}
+        print()
 
-    # --- ROUND 2: RERANKER ---
-    print("\n--- ROUND 2: Reranker (BGE-Reranker) ---")
-    cpu_time_rerank, cpu_speed_rerank = benchmark_model(CrossEncoder, MODEL_RERANKER_NAME, "cpu", "Reranker")
-    
-    if torch.cuda.is_available():
-        gpu_time_rerank, gpu_speed_rerank = benchmark_model(CrossEncoder, MODEL_RERANKER_NAME, "cuda", "Reranker")
-    else:
-        gpu_time_rerank, gpu_speed_rerank = float('inf'), float('inf')
+    print("📊 LATENCY / THROUGHPUT BY BACKEND")
+    print_comparison_table(results)
 
     # --- ROUND 3: OLLAMA CHAT ---
     test_ollama_chat()
@@ -150,9 +207,9 @@ if __name__ == "__main__":
         try:
             print("Attempting to load BOTH models into VRAM...", end="")
             clear_vram()
-            m1 = SentenceTransformer(MODEL_EMBEDDING_NAME, device="cuda")
+            m1 = build_sparse_model(MODEL_EMBEDDING_NAME, "cuda")
             print(f" Emb Loaded ({get_vram_usage():.2f}GB)...", end="")
-            m2 = CrossEncoder(MODEL_RERANKER_NAME, device="cuda")
+            m2 = build_reranker(MODEL_RERANKER_NAME, 512, "cuda")
             print(f" Reranker Loaded ({get_vram_usage():.2f}GB)...", end="")
             print(" ✅ FITS!")
             fits_in_vram = True
@@ -169,18 +226,27 @@ if __name__ == "__main__":
     print("🏆  FINAL CONFIGURATION RECOMMENDATION")
     print("="*50)
 
-    # 1. Embedding Decision
-    emb_device = "cuda" if (gpu_time_emb < cpu_time_emb and fits_in_vram) else "cpu"
-    
+    # 1. Embedding Decision (dense + sparse share one backend setting)
+    emb_scores = {}
+    for backend in available_backends():
+        dense, sparse = results["dense"].get(backend), results["sparse"].get(backend)
+        if dense and sparse:
+            emb_scores[backend] = {"docs_per_sec": 1.0 / (1.0 / dense["docs_per_sec"] + 1.0 / sparse["docs_per_sec"])}
+    emb_device = pick_fastest(emb_scores)
+
     # 2. Reranker Decision
-    rerank_device = "cuda" if (gpu_time_rerank < cpu_time_rerank and fits_in_vram) else "cpu"
-    
+    rerank_device = pick_fastest(results["reranker"])
+
+    # Both on GPU only if they actually fit together
+    if emb_device == "cuda" and rerank_device == "cuda" and not fits_in_vram:
+        rerank_device = pick_fastest({b: r for b, r in results["reranker"].items() if b != "cuda"})
+
     print(f"Based on your hardware speeds:")
     print(f"1. EMBEDDING MODEL: [{emb_device.upper()}]")
     print(f"2. RERANKER MODEL:  [{rerank_device.upper()}]")
     print(f"3. OLLAMA (CHAT):   [GPU/CUDA]")
-    
-    print("\n👇 COPY THIS INTO YOUR CONFIG 👇")
-    print(f"device_embedding = '{emb_device}'")
-    print(f"device_reranker  = '{rerank_device}'")
-    print("="*50)
\ No newline at end of file
+
+    threads = 0 if (emb_device == "cuda" and rerank_device == "cuda") else CPU_THREADS
+    write_hardware_config(emb_device, rerank_device, threads)
+    print(f"\n💾 Config written to {HARDWARE_CONFIG_PATH} (loaded automatically on next start)")
+    print("="*50)
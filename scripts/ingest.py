@@ -1,22 +1,22 @@
 import os
 import sys
 import asyncio
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Add project root to sys.path
 # sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-from backend.ingestion.loaders.pdf_loader import PDFLoader
-from backend.ingestion.pipeline.chunking import Chunker
+from backend.ingestion.pipeline.chunking import build_chunker
 from backend.ingestion.pipeline.contextual_enrichment import ContextualEnricher
-from backend.indexing.dense_index import DenseIndexer
-from backend.indexing.sparse_index import SparseIndexer
+from backend.ingestion.pipeline.streaming import IngestionPipeline, print_report
+from backend.models.embedding_cache import get_embedding_cache
 
 # Load Environment Variables
 load_dotenv()
 
-async def main():
+async def main(args):
     print("🚀 STARTING INGESTION PIPELINE (2025 Architecture)")
     print("============================================================")
 
@@ -32,8 +32,8 @@ async def main():
         return
 
     # Initialize Components
-    loader = PDFLoader()
-    chunker = Chunker(chunk_size=1024, chunk_overlap=200)
+    # Token-sized chunks with exact offsets + page numbers (data_pipeline.chunking)
+    chunker = build_chunker()
     
     # Initialize Enricher
     try:
@@ -43,94 +43,24 @@ async def main():
         enricher = None
         print(f"⚠️ Contextual Enricher skipped: {e}")
 
-    # Initialize BOTH Indexers
-    dense_indexer = DenseIndexer()   # Creates the Point
-    sparse_indexer = SparseIndexer() # Adds Keywords to the Point
-
     # 2. PROCESS FILES
-    for pdf_file in pdf_files:
-        print(f"\n📄 Processing: {pdf_file.name}")
-        
-        # A. LOAD
-        try:
-            raw_text = loader.load_file(pdf_file)
-            if not raw_text:
-                print("   ⚠️ Loader returned empty text.")
-                continue
-        except Exception as e:
-            print(f"   ❌ Failed to load: {e}")
-            continue
-
-        # B. CHUNK
-        # Pass filename as metadata "source" to avoid 'unknown' duplicates
-        chunks = chunker.chunk_text(raw_text, metadata={"source": pdf_file.name})
-        print(f"   ✂️ Generated {len(chunks)} chunks.")
-
-        # C. ENRICH (SOTA Neighbor Window)
-        if enricher:
-            print("   👨‍🏫 Enriching chunks (using Neighbor Window strategy)...")
-            
-            tasks = []
-            window_size = 3  # How many chunks before/after to include
-            
-            for i, chunk in enumerate(chunks):
-                # Calculate window indices
-                start_i = max(0, i - window_size)
-                end_i = min(len(chunks), i + window_size + 1)
-                
-                # Join the text of the neighbors to form the context
-                neighbor_text = "\n---\n".join([c["text"] for c in chunks[start_i:end_i]])
-                
-                # Add task
-                tasks.append(enricher.enrich_chunk(chunk["text"], neighbor_text))
-
-            # Run Batches
-            batch_size = 10 
-            for i in range(0, len(tasks), batch_size):
-                batch_tasks = tasks[i : i + batch_size]
-                batch_chunks = chunks[i : i + batch_size]
-                
-                # Run parallel
-                enriched_texts = await asyncio.gather(*batch_tasks)
-                
-                # Save results
-                for j, result_text in enumerate(enriched_texts):
-                    batch_chunks[j]["search_content"] = result_text
-                    batch_chunks[j]["display_content"] = batch_chunks[j]["text"]
-                
-                print(f"      Processed {min(i + batch_size, len(chunks))}/{len(chunks)} chunks...", end="\r")
-            
-            print("\n   ✅ Enrichment Complete.")
-        else:
-            # Fallback
-            for c in chunks:
-                c["search_content"] = c["text"]
-                c["display_content"] = c["text"]
-
-        # D. INDEXING (Hybrid)
-        if chunks:
-            # Step 1: Dense Vectors (Upsert - Creates the Point)
-            # This MUST run first to create the point ID
-            print("   🧠 Step 1: Generating Dense Vectors...")
-            try:
-                dense_indexer.index_chunks(chunks)
-            except Exception as e:
-                print(f"   ❌ Dense Indexing Failed: {e}")
-                continue
-
-            # Step 2: Sparse Vectors (Update - Adds to the Point)
-            # This adds the keyword data to the existing point
-            print("   🧠 Step 2: Generating Sparse Vectors...")
-            try:
-                sparse_indexer.index_chunks(chunks)
-            except Exception as e:
-                print(f"   ❌ Sparse Indexing Failed: {e}")
-                continue
-            
-            print(f"   ✅ File '{pdf_file.name}' Fully Indexed (Hybrid)!")
+    # Streaming pipeline: loading, chunking, enrichment (neighbour window), dense + sparse
+    # encoding (one BGE-M3 pass) and upserts overlap, with bounded queues in between.
+    # Only new / changed files are processed (data_pipeline.manifest); --dry-run shows the plan
+    pipeline = IngestionPipeline(chunker=chunker, enricher=enricher)
+    print(f"📄 Syncing {len(pdf_files)} PDFs with {pipeline.db.provider.upper()}...")
+    report = await asyncio.to_thread(pipeline.sync, pdf_files, args.full, args.dry_run)
+    print_report(report)
 
     print("\n" + "=" * 60)
+    cache = get_embedding_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"🗃️ Embedding cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {stats['hit_rate']:.0%})")
     print("🎉 INGESTION COMPLETE!")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest data/pdfs (only new or changed files, see data_pipeline.manifest).")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which files would be ingested / removed")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every file, even unchanged ones")
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file